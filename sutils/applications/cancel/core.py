@@ -5,9 +5,9 @@ import sys
 
 def get_jobs():
     """Returns a sorted list of queued or running jobs belonging to the current
-    user.
+    user. squeue is always called, jobs are never cancelled from a snapshot.
     """
-    res = slurm.squeue_user()
+    res = slurm.squeue_user(fresh=True)
     #if test.testmode():
     #    return list(srange(3))
     joblist = res.get_ids()
@@ -13,7 +13,7 @@ class TestGetJobs(unittest.TestCase):
         mock_squeue.return_value = core.slurm.SqueueResult(squeue_stdout)
         core.get_jobs()
 
-        mock_squeue.assert_called_once_with()
+        mock_squeue.assert_called_once_with(fresh=True)
 
     @patch("sutils.applications.cancel.core.slurm.squeue_user", Mock())
     def test_returns_joblist(self):
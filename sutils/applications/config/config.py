@@ -2,6 +2,9 @@ from ...config.iniconfig import write_default
 from . import core
 
 def run(options):
+    if len(options['command']) > 0:
+        core.run_db_command(options['command'], options['older_than'])
+        return
     if options['create'] is not None:
         write_default(options['create'])
     if options['diff'] is not None:
@@ -1,6 +1,9 @@
 from ...config import iniconfig
+from ...core import jobdb
+from ...core.core import db_dir
 
 import copy
+import sys
 
 def check_compatibility(file1, file2):
     """Compare two config files for compatibility.
@@ -82,3 +85,19 @@ def print_diff(file1, file2):
         
         if i < total-1:
             print("") # newline for aesthetics
+
+def run_db_command(command, older_than=None):
+    """Run the job database maintenance `command` (see `jobdb`) and print the removed jobs per campaign."""
+    if command == ['db', 'compact']:
+        result = jobdb.compact(db_dir)
+    elif command == ['db', 'prune']:
+        if older_than is None:
+            print("Error! `db prune` requires --older-than DAYS.")
+            sys.exit(1)
+        result = jobdb.prune(db_dir, older_than)
+    else:
+        print("Unknown command: {} (use `db compact` or `db prune --older-than DAYS`)".format(" ".join(command)))
+        sys.exit(1)
+
+    for campaign, removed in result:
+        print("{}: {} superseded job(s) removed".format(campaign, removed))
@@ -5,3 +5,8 @@ group = parser.add_mutually_exclusive_group() \
             .add_argument('-c', '--create', metavar='FILE', type=str, help='Create new default configuration file.')  \
             .add_argument('-d', '--diff', metavar=('FILE1', 'FILE2'), nargs=2, help='Print difference between FILE1 and FILE2.')
 
+
+parser.add_argument('command', nargs='*', metavar='COMMAND',
+                    help='Job database maintenance: `db compact` removes superseded jobs of all campaigns, '
+                         '`db prune --older-than DAYS` only those submitted more than DAYS ago.') \
+      .add_argument('--older-than', metavar='DAYS', type=float, default=None, help='Age in days for `db prune`.')
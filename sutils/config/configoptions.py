@@ -9,7 +9,15 @@ general_group = configparse.ConfigSection('general') \
                 .add_option('par_in_dirname', cfgtypes.StringListType, []) \
                 .add_option('overwrite_dir', cfgtypes.BoolType, False) \
                 .add_option('submit_as', cfgtypes.StringType, 'sbatch') \
+                .add_option('render_mode', cfgtypes.StringType, 'file') \
+                .add_option('markers', cfgtypes.StringType, 'none') \
+                .add_option('job_comment', cfgtypes.BoolType, False) \
                 .add_option('cmd_arguments', cfgtypes.StringType, '') \
+                .add_option('array_throttle', cfgtypes.IntType, 0) \
+                .add_option('max_array_size', cfgtypes.IntType, 0) \
+                .add_option('max_parallel_submits', cfgtypes.IntType, 1) \
+                .add_option('stage_workers', cfgtypes.IntType, 8) \
+                .add_option('follow_interval', cfgtypes.IntType, 60) \
                 .add_option('jobname_prefix', cfgtypes.StringType, 'j') \
                 .add_option('logfile_name', cfgtypes.StringType, 'ssubmit.log') \
                 .add_option('write_parameter_info', cfgtypes.BoolType, 'True') \
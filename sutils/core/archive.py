@@ -0,0 +1,83 @@
+"""Archive of the script files submitted over stdin.
+
+With `render_mode = stdin` the rendered script of a job is piped to sbatch and
+never written to the job directory. For provenance, all scripts of a campaign
+are collected in the compressed archive `ssubmit_scripts.jsonl.gz` instead, with
+the entry `<dirname>/<script name>` for every job. A job that is submitted again
+adds a new entry with the same name, the last one is the most recent.
+
+The archive is append-only: every script is written as a separate gzip member
+holding one JSON line, the concatenation is a valid gzip file (`zcat` works).
+There is no index that is only written at the end, so all scripts that were
+written before a crash or Ctrl-C stay readable, a truncated last member is
+skipped. Every member is appended with one write under an exclusive `fcntl`
+lock, so parallel ssubmit processes of one campaign can share the archive.
+"""
+import gzip
+import json
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    # no POSIX locks, rely on appending with a single write
+    fcntl = None
+
+ARCHIVE_NAME = "ssubmit_scripts.jsonl.gz"
+
+
+class ScriptArchive(object):
+    """
+    Appends rendered scripts to the archive file, which is opened on first use.
+    """
+    def __init__(self, path=ARCHIVE_NAME):
+        self._path = path
+        self._file = None
+
+    def add(self, name, text):
+        """Add the script `text` as entry `name`, the entry is on disk on return."""
+        if self._file is None:
+            self._file = open(self._path, 'ab')
+        line = json.dumps({'name': name, 'script': text}) + "\n"
+        member = gzip.compress(line.encode('utf-8'))
+        if fcntl is not None:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+        try:
+            self._file.write(member)
+            self._file.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_entries(path):
+    """Yield the entries of the archive `path` in the order they were added."""
+    with open(path, 'rb') as infile:
+        data = infile.read()
+    while len(data) > 0:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            text = decompressor.decompress(data)
+        except zlib.error:
+            break
+        if not decompressor.eof:
+            # truncated by a crash while writing
+            break
+        yield json.loads(text.decode('utf-8'))
+        data = decompressor.unused_data
+
+
+def read_script(path, name):
+    """Return the most recent script with entry `name` from the archive `path`."""
+    script = None
+    for entry in read_entries(path):
+        if entry['name'] == name:
+            script = entry['script']
+    if script is None:
+        raise KeyError(name)
+    return script
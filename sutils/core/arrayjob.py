@@ -0,0 +1,94 @@
+"""Submission of parameter sweeps as SLURM job arrays.
+
+Instead of starting one `sbatch` process for every parameter point, all points
+of a submission range are submitted as one (or a few) `sbatch --array` jobs.
+
+* The per-point directories and scripts are rendered as usual.
+* For every array chunk a task table is written, which lists the job
+  directories, one per line. Line `i` belongs to array task `i`.
+* A small dispatcher script maps `SLURM_ARRAY_TASK_ID` to the job directory,
+  changes into it and runs the rendered script there. The output is written
+  to `slurm-<array ID>_<task>.out` in the job directory, the form in which
+  squeue, sacct and the job database list array tasks, such that sstatus
+  finds it like the output of a regular job.
+
+Array task IDs must be smaller than the cluster's MaxArraySize, so the range is
+split into chunks of at most that many tasks.
+"""
+import os
+
+DISPATCHER_NAME = "ssubmit_array.sh"
+TABLE_NAME = "ssubmit_array_{first:d}-{last:d}.tbl"
+
+# options that are set by the dispatcher itself or only make sense per job
+_IGNORED_OPTIONS = ['--array', '--job-name', '--output', '--error', '-a', '-J', '-o', '-e']
+
+
+def split_chunks(items, max_array_size):
+    """Split `items` in consecutive chunks of at most `max_array_size` entries."""
+    if max_array_size < 1:
+        raise ValueError("Invalid MaxArraySize: {}".format(max_array_size))
+
+    return [items[i:i+max_array_size] for i in range(0, len(items), max_array_size)]
+
+def get_array_spec(ntasks, throttle=None):
+    """Return the argument of `sbatch --array` for tasks 0...ntasks-1.
+
+    If `throttle` is a positive number, at most this many tasks run at once.
+    """
+    spec = "0-{:d}".format(ntasks - 1)
+    if throttle:
+        spec += "%{:d}".format(throttle)
+    return spec
+
+def get_sbatch_header(script_path, wildcards):
+    """Return the `#SBATCH` lines of the template script that apply to all tasks.
+
+    Lines containing one of the `wildcards` and options that are managed by the
+    dispatcher (job name, output files, array range) are dropped.
+    """
+    header = []
+    with open(script_path, 'r') as infile:
+        for line in infile:
+            sline = line.strip()
+            if not sline.startswith('#SBATCH'):
+                continue
+            if any([w in sline for w in wildcards]):
+                continue
+            option = sline[len('#SBATCH'):].strip().split('=')[0].split()[0] \
+                        if len(sline) > len('#SBATCH') else ''
+            if option in _IGNORED_OPTIONS:
+                continue
+            header.append(sline)
+
+    return header
+
+def write_dispatcher(path, script_name, header=(), jobname=None):
+    """Write the dispatcher script to `path`.
+
+    The dispatcher takes the path of a task table as its only argument.
+    """
+    with open(path, 'w') as outfile:
+        outfile.write("#!/bin/bash\n")
+        for line in header:
+            outfile.write(line + "\n")
+        if jobname:
+            outfile.write("#SBATCH --job-name={}\n".format(jobname))
+        outfile.write("#SBATCH --output=/dev/null\n")
+        outfile.write("\n")
+        outfile.write("# generated by ssubmit: runs the job of array task SLURM_ARRAY_TASK_ID\n")
+        outfile.write('table="$1"\n')
+        outfile.write('dirname=$(sed -n "$((SLURM_ARRAY_TASK_ID + 1))p" "$table")\n')
+        outfile.write('cd "$dirname" || exit 1\n')
+        # SLURM_JOB_ID of a task is a plain job ID, name the output by <array ID>_<task>
+        outfile.write('exec bash {} > "slurm-${{SLURM_ARRAY_JOB_ID}}_${{SLURM_ARRAY_TASK_ID}}.out" 2>&1\n'.format(script_name))
+
+def write_task_table(path, dirnames):
+    """Write the (absolute) job directories to the task table `path`."""
+    with open(path, 'w') as outfile:
+        for dirname in dirnames:
+            outfile.write(os.path.realpath(dirname) + "\n")
+
+def get_task_id(array_id, task):
+    """Return the SLURM job ID of a single array task."""
+    return "{}_{:d}".format(array_id, task)
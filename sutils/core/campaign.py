@@ -0,0 +1,115 @@
+"""Identification of the jobs of a campaign in SLURM.
+
+ssubmit gives every campaign a random ID, stored with the time of the first
+submission in the file `ssubmit.campaign` in the campaign directory. Each job
+is submitted with the comment
+
+    ssubmit:<campaign ID>:<index>
+
+where the index is the linear index of the parameter point. For a job array
+with consecutive indices, the comment `ssubmit:<campaign ID>:<index>+` holds
+the index of task 0, task `t` belongs to the index `<index> + t`.
+
+sstatus reads the comments of all jobs of the user from one call to squeue
+and one call to sacct (for jobs that have finished since the campaign was
+created), so no job database or output file is needed to find the jobs.
+"""
+import json
+import os
+import time
+import uuid
+
+CAMPAIGN_NAME = "ssubmit.campaign"
+COMMENT_PREFIX = "ssubmit"
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class Campaign(object):
+    """
+    ID and creation time of a campaign.
+    """
+    def __init__(self, campaign_id, created):
+        self._id = campaign_id
+        self._created = created
+
+    def get_id(self):
+        return self._id
+
+    def get_created(self):
+        """Return the creation time in the format of `sacct --starttime`."""
+        return self._created
+
+    def get_comment(self, index, array=False):
+        """Return the job comment of the job with linear index `index` (of task 0 with `array`)."""
+        return "{}:{}:{:d}{}".format(COMMENT_PREFIX, self._id, int(index), "+" if array else "")
+
+    def parse_comment(self, comment, job_id):
+        """
+        Return the linear index of the job `job_id` with `comment`, None if it
+        does not belong to the campaign.
+        """
+        fields = comment.strip().split(':')
+        if len(fields) != 3 or fields[0] != COMMENT_PREFIX or fields[1] != self._id:
+            return None
+
+        index = fields[2]
+        if index.endswith('+'):
+            # array task: <array ID>_<task ID>
+            task = str(job_id).split('_')
+            if len(task) != 2 or not task[1].isdigit() or not index[:-1].isdigit():
+                return None
+            return int(index[:-1]) + int(task[1])
+        if not index.isdigit():
+            return None
+        return int(index)
+
+
+def load(path=CAMPAIGN_NAME):
+    """Return the Campaign stored in `path`, None if there is none."""
+    try:
+        with open(path, 'r') as infile:
+            data = json.load(infile)
+        return Campaign(data['id'], data['created'])
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+def create(path=CAMPAIGN_NAME):
+    """Return the Campaign stored in `path`, a new one is created if there is none."""
+    campaign = load(path)
+    if campaign is None:
+        campaign = Campaign(uuid.uuid4().hex[:12], time.strftime(TIME_FORMAT))
+        with open(path, 'w') as outfile:
+            json.dump({'id': campaign.get_id(), 'created': campaign.get_created()}, outfile)
+            outfile.write("\n")
+    return campaign
+
+
+class JobMap(object):
+    """
+    Maps the linear indices of a campaign to the most recent job, from the
+    job IDs and comments listed by squeue and sacct.
+    """
+    def __init__(self, campaign):
+        self._campaign = campaign
+        self._jobs = dict()     # index -> (sort key, job ID)
+
+    def add(self, job_ids, comments):
+        for job_id, comment in zip(job_ids, comments):
+            index = self._campaign.parse_comment(comment, job_id)
+            if index is None:
+                continue
+            try:
+                key = tuple(int(i) for i in str(job_id).split('_'))
+            except ValueError:
+                continue
+            if index not in self._jobs or key > self._jobs[index][0]:
+                self._jobs[index] = (key, str(job_id))
+
+    def get(self, index):
+        """Return the ID of the most recent job with linear index `index`, None if there is none."""
+        entry = self._jobs.get(int(index))
+        return None if entry is None else entry[1]
+
+    def __len__(self):
+        return len(self._jobs)
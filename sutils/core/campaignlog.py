@@ -0,0 +1,108 @@
+"""Buffered log of a campaign.
+
+The log file is opened once and kept open, lines are collected in memory and
+written when `FLUSH_BYTES` have been collected, `FLUSH_INTERVAL` seconds have
+passed since the last write, or when the logger is closed. The same holds for
+the output to the screen.
+
+Besides the human-readable log, one JSON record per job is appended to a
+separate file, e.g.
+
+    {"index": 3, "dirname": "U1_L2", "status": "submitted", "job_id": "123456",
+     "render_time": 0.0012, "submit_time": 0.0841}
+"""
+import atexit
+import json
+import os
+import sys
+import time
+
+RECORDS_NAME = "ssubmit.jobs.jsonl"
+
+FLUSH_BYTES = 64*1024   # size of the buffered text that triggers a write
+FLUSH_INTERVAL = 2.0    # maximal time in seconds between two writes
+
+
+class CampaignLogger(object):
+    """
+    Writes log lines to `path` and the screen, and job records to `records_path`.
+    If `path` or `records_path` is None, the respective output is dropped.
+    """
+    def __init__(self, path=None, records_path=None, to_screen=True,
+                 flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL):
+        self._path = path
+        self._records_path = records_path
+        self._to_screen = to_screen
+        self._flush_bytes = flush_bytes
+        self._flush_interval = flush_interval
+
+        self._logfile = None
+        self._recordfile = None
+        self._log_lines = []
+        self._screen_lines = []
+        self._records = []
+        self._size = 0
+        self._last_flush = time.time()
+
+        # the buffers must not get lost if the program ends without close
+        atexit.register(self.close)
+
+    def write(self, logstring, to_screen=True, new=False):
+        """Log a line. With `new`, a separator is written first if the log file is not empty."""
+        if self._path is not None:
+            if new and (len(self._log_lines) > 0 or self._logfile is not None or os.path.exists(self._path)):
+                self._log_lines.append("\n" + "-"*80 + "\n\n")
+            self._log_lines.append(logstring + "\n")
+            self._size += len(logstring) + 1
+
+        if to_screen and self._to_screen:
+            self._screen_lines.append(logstring + "\n")
+            self._size += len(logstring) + 1
+
+        self._check_flush()
+
+    def record(self, **fields):
+        """Add a machine-readable record, e.g. of a single job."""
+        if self._records_path is None:
+            return
+        line = json.dumps(fields) + "\n"
+        self._records.append(line)
+        self._size += len(line)
+
+        self._check_flush()
+
+    def _check_flush(self):
+        if self._size >= self._flush_bytes or time.time() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered output."""
+        if len(self._log_lines) > 0:
+            if self._logfile is None:
+                self._logfile = open(self._path, 'a')
+            self._logfile.write("".join(self._log_lines))
+            self._logfile.flush()
+            self._log_lines = []
+
+        if len(self._records) > 0:
+            if self._recordfile is None:
+                self._recordfile = open(self._records_path, 'a')
+            self._recordfile.write("".join(self._records))
+            self._recordfile.flush()
+            self._records = []
+
+        if len(self._screen_lines) > 0:
+            sys.stdout.write("".join(self._screen_lines))
+            sys.stdout.flush()
+            self._screen_lines = []
+
+        self._size = 0
+        self._last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        for f in [self._logfile, self._recordfile]:
+            if f is not None:
+                f.close()
+        self._logfile = None
+        self._recordfile = None
@@ -2,16 +2,31 @@ from __future__ import division, print_function
 import subprocess
 import numpy as np
 import sys, os
-import logging
 from sutils.utils import ini, common, util
 from .. import version
+from ..slurm_interface import api as slurm
+from . import arrayjob
+from . import submitpool
+from . import template
+from . import manifest
+from . import follow
+from . import journal
+from . import archive
+from . import campaignlog
+from . import statecache
+from . import outfiles
+from . import statusgrid
+from . import markers
+from . import statusexport
+from . import campaign
+from . import jobdb
 #import ini
 #import lacommon
 #import common
 import shutil
 import glob
 import time
-import pickle
+from concurrent import futures
 #import util
 
 PY_VER = sys.version
@@ -33,7 +48,6 @@ COPYRIGHT_RANGE = "{}-{}".format(COPYRIGHT_YEARS[0], COPYRIGHT_YEARS[-1])
 db_dir = os.path.expanduser(os.path.join('~','.ssubmit'))
 util.assert_dir(db_dir)
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 
@@ -182,6 +196,20 @@ class JobStatusCounter(Jobs):
     def get_cancelled(self):
         return self._cancelled
 
+    def add(self, values):
+        """
+        Count the JobStatusMessage values of many jobs at once.
+        """
+        counts = np.bincount(np.asarray(values, dtype=int), minlength=len(JobStatusMessage.str_list))
+
+        self._running += counts[JobStatusMessage.running]
+        self._pending += counts[JobStatusMessage.pending]
+        self._cancelled += counts[JobStatusMessage.cancelled]
+        self._failed += counts[JobStatusMessage.failed]
+        self._success += counts[JobStatusMessage.completed]
+        self._total += counts[[JobStatusMessage.running, JobStatusMessage.pending, JobStatusMessage.cancelled,
+                               JobStatusMessage.failed, JobStatusMessage.completed]].sum()
+
 
 # Here the actual program begins
 
@@ -200,6 +228,7 @@ class ParameterIterator(object):
         self._dformat_str = None
         self._pformat_str = None
         self._pformat_list_all = None
+        self._pformat_ids_all = None
 
         self.setup_default_settings()
         root_path = "." if root_path is None else root_path
@@ -261,6 +290,9 @@ class ParameterIterator(object):
         settings.update([['script_path', 'slurm.sh']])
         settings.update([['config_path', 'config.ini']])
         settings.update([['submit_as', 'sbatch']])
+        settings.update([['render_mode', 'file']])
+        settings.update([['markers', 'none']])
+        settings.update([['job_comment', False]])
         settings.update([['overwrite_dir', False]])
         settings.update([['test_mode', True]])
         settings.update([['jobname_prefix', '']])
@@ -268,6 +300,13 @@ class ParameterIterator(object):
         settings.update([['cmd_arguments', '']])
         settings.update([['write_parameter_info', True]])
         settings.update([['use_index', False]])
+        settings.update([['array_throttle', 0]])
+        settings.update([['max_array_size', 0]])
+        settings.update([['max_parallel_submits', 1]])
+        settings.update([['stage_workers', 8]])
+        settings.update([['phase', 'all']])
+        settings.update([['follow', 0]])
+        settings.update([['follow_interval', 60]])
 
         self._settings = settings
     
@@ -400,9 +439,16 @@ class ParameterIterator(object):
 
         if all:
             self._pformat_str_all = format_str
+            self._pformat_ids_all = format_ids
         else:
             self._pformat_str = format_str
     
+    def get_pformat_values(self, plist):
+        """
+        Return the values of all parameters as strings, formatted like in `get_pformat_str`.
+        """
+        return [fid.format(*plist).strip() for fid in self._pformat_ids_all]
+
     def get_pformat_str(self, plist, all=False):
 
         if all:
@@ -440,126 +486,61 @@ class ParameterIterator(object):
 
 
 class JobDB(object):
-    
-    _db_path = os.path.join(db_dir, 'jobs.db')
+    """
+    Access to the job database of the campaign (see `jobdb`). The shard is
+    selected by the config file and opened on first use, jobs are stored by
+    the campaign directory, which is the current working directory, and the
+    linear index of the parameter point.
+    """
 
     def __init__(self):
-        
-        # initialize as False
-        # creating an empty db file updates value to True
-        self._isempty = self.isempty()
+        self._db = None
+        self._campaign_dir = os.path.realpath(os.getcwd())
 
-        if not self.check_job_db():
-            self.create_empty_job_db()
-        else:
-            pass
-
-    def create_empty_job_db(self):
-        """
-        Create an empty database file in the `db_path` location.
-        """
-        #with open('jobs.db', 'wb') as db:
-        #    pass
-        new_db = []
-        db_file = open(self._db_path, 'wb')
-
-        pickle.dump(new_db, db_file, -1)
+        # jobs of the campaign, read once on first lookup
+        self._job_lookup = None
 
-        db_file.flush()
-        db_file.close()
+    def get_job_db(self):
+        if self._db is None:
+            self._db = jobdb.open_shard(db_dir, self._settings.get('config_path'), self._campaign_dir)
+        return self._db
 
-        self._isempty = True
-    
-    def update_job_db(self, plist, dirname, job_id):
+    def update_job_db(self, job_idx, dirname, job_id, plist=None):
         """
-        Update job database with parameter list, directory name, job index and a time stamp.
+        Add a submitted job to the job database. Jobs are written in batches,
+        `close_job_db` writes the remaining ones.
         """
+        self.get_job_db().add_job(self._campaign_dir, job_idx, dirname, job_id, plist)
+        self._job_lookup = None
 
-        submit_time = time.time()
-        #with open('jobs.db', 'ab') as db:
-        #    db.write(".{},{},{}".format(dirname, job_idx, submit_time))
-
-        # read old data
-        db_file = open(self._db_path, 'rb')
-        db_data = pickle.load(db_file)
-        db_file.close()
-
+    def get_job_lookup(self):
+        if self._job_lookup is None:
+            self._job_lookup = self.get_job_db().load_campaign(self._campaign_dir)
+        return self._job_lookup
 
-        # write new data
-        db_data.append([plist, dirname, job_id, submit_time])
-        db_file = open(self._db_path, 'wb')
-        pickle.dump(db_data, db_file, -1)
-        db_file.flush()
-        db_file.close()
-
-        # database is no longer empty
-        self._isempty = False
-    
-    def check_job_db(self):
+    def find_in_job_db(self, job_idx, dirname=None, plist=None):
         """
-        Check if job database file exists.
+        Return the ID of the most recent job with linear index `job_idx` (and
+        directory `dirname`), or with the parameter values `plist`. Raises
+        KeyError if there is no such job.
         """
-        return True if util.fexists(self._db_path) else False
-    
-    def isempty(self):
-        """
-        Check if empty flag attribute is set.
-        """
-        if self.check_job_db():
-            with open(self._db_path, 'rb') as db_file:
-                db_data = pickle.load(db_file)
-            return len(db_data) == 0
-        return True
-    
-    def read_job_db(self):
-        """
-        Read the job database file. Returns empty job array if database file 
-        does not exist or database is empty.
-        """
-        
-        # check if database file exists and is not empty
-        if self.check_job_db() and not self.isempty():
-            """
-            db_list = []
-            with open('jobs.db', 'rb') as db:
-                for line in db:
-                    db_list += line.split('.')
-            
-            njobs = len(db_list)
-            times = np.zeros(njobs)
-            dirnames = np.zeros(njobs)
-            job_idx = np.zeros(njobs)
-
-            for i,itm in enumerate(db_list):
-                data = itm.split(',')
-                dirnames[i] = data[0]
-                job_idx[i] = data[1]
-                times[i] = data[2]
-            
-            self.job_db = np.vstack([dirnames, job_idx, times])
-            """
-            db_file = open(self._db_path, 'rb')
-            #for line in db_file:
-            #    print(line)
-            #db_data = [[]]
-            db_data = pickle.load(db_file)
-            db_file.close()
-            return np.vstack(db_data)
-        else:
-            # database is empty, return empty job array
-            return np.vstack([[]])
+        job_id = self.get_job_lookup().get(job_idx, dirname, plist)
+        if job_id is None:
+            raise KeyError(job_idx)
+        return job_id
 
-    def find_in_job_db(self, plist, ret='all'):
-        job_db = self.read_job_db()
+    def lookup_many(self, indices):
+        """Return a dict linear index -> ID of the most recent job, for the indices in the job database."""
+        return self.get_job_lookup().lookup_many(indices)
 
-        db_entry = job_db[np.where(job_db[:, 0] == plist)[0]]
+    def update_job_states(self, states):
+        """Store the states of the jobs in `states`, a list of (job ID, state)."""
+        if len(states) > 0:
+            self.get_job_db().set_states(states)
 
-        if ret == 'id':
-            return db_entry[2]
-        elif ret == 'dirname':
-            return db_entry[1]
-        elif ret == 'all':
-            return db_entry
+    def close_job_db(self):
+        if self._db is not None:
+            self._db.close()
 
 
 
@@ -592,9 +573,6 @@ class Submitter(ParameterIterator, JobDB):
                                       # above resets _supdate to None.
                                       # maybe separate mode determination and processing input
                                       # in run mode? Or have process_input() return supdate?
-            
-            # load the job database
-            self._job_db = self.read_job_db()
 
             # setup the correct settings.
             # this is done in order: default > ini > commandline
@@ -607,6 +585,42 @@ class Submitter(ParameterIterator, JobDB):
 
             self._job_count = Jobs()
 
+            # jobs collected for submission as job array
+            self._array_jobs = []
+
+            # pool for parallel submission and header lines of jobs that are still running
+            self._pool = None
+            self._job_headers = dict()
+
+            # templates are compiled on first use
+            self._templates = None
+
+            # copy of the script file with status markers for `render_mode = env`, written on first use
+            self._marked_script = None
+
+            # ID of the campaign in the job comments, created on first use
+            self._campaign = None
+
+            # manifest of staged jobs, only used by `ssubmit launch`
+            self._manifest = None
+
+            # IDs of the jobs submitted and indices of the jobs that failed in the
+            # current call to submit_range
+            self._new_job_ids = []
+            self._failed_idx = []
+
+            # journal of the campaign, opened by iterate
+            self._journal = None
+
+            # archive of the scripts submitted over stdin, opened on first use
+            self._archive = None
+
+            # buffered log file and job records
+            self._logger = campaignlog.CampaignLogger(self._logfile_name, campaignlog.RECORDS_NAME)
+
+            # time spent rendering each job, for the job records
+            self._render_times = dict()
+
             # create array with indices of parameters in directory names
             self.create_par_in_dirname_inds()
 
@@ -673,6 +687,15 @@ class Submitter(ParameterIterator, JobDB):
                 elif argv[i].strip() == '-h':
                     self._mode = 'help'
                     return
+                elif argv[i].strip() in ['stage', 'launch']:
+                    supdate.update([['phase', argv[i].strip()]])
+                elif argv[i].strip() == '--follow':
+                    if argc >= i+1:
+                        supdate.update([['follow', int(argv[i+1])]])
+                    else:
+                        raise RuntimeError("Option --follow requires the maximal number of queued jobs.")
+                    i += 2
+                    continue
                 else:
                     try:
                         num = int(argv[i])
@@ -688,6 +711,10 @@ class Submitter(ParameterIterator, JobDB):
                 supdate.update([['start_index', num_set[0]]])
                 supdate.update([['num_submits', num_set[1]]])
 
+            # only `ssubmit launch` and `ssubmit --follow` work without numbers
+            if len(num_set) == 0 and supdate.get('phase') != 'launch' and not supdate.get('follow') and self._mode == 'run':
+                self._mode = 'help'
+
             self._supdate = supdate
 
 
@@ -713,8 +740,17 @@ class Submitter(ParameterIterator, JobDB):
         help_msg += "\n>> ssubmit <s> <n>\nSubmit the jobs with indices s...s+n-1\n"
         help_msg += "<s> = start index\n"
         help_msg += "<n> = number of submits\n"
+        help_msg += "\n>> ssubmit stage [<s>] <n>\nCreate the directories and files of the jobs with indices s...s+n-1, don't submit\n"
+        help_msg += "\n>> ssubmit launch [<n>]\nSubmit the next n (default all) staged jobs that have not been submitted yet\n" \
+                    "(as job arrays with `submit_as = array`)\n"
+        help_msg += "\nWith `render_mode = env` all jobs share the script file, which reads the parameters\nfrom the environment variables <NAME>_VAL and JOBNAME.\n"
+        help_msg += "With `render_mode = stdin` the rendered script is piped to sbatch and only kept in {}.\n".format(archive.ARCHIVE_NAME)
+        help_msg += "With `markers = file` or `markers = database` the script records when the job starts and ends\n" \
+                    "in {} (job directory) or {} (campaign directory), which sstatus reads.\n".format(markers.MARKER_NAME, markers.DATABASE_NAME)
+        help_msg += "\n>> ssubmit --follow <k> [[<s>] <n>]\nKeep up to k jobs in the queue until all jobs (default: all, or continue a previous run) are submitted\n"
         help_msg += "\n-f <path>   (default <path>=./config.ini)\n" + " "*12 + "Path to the .ini configuration file.\n"
         help_msg += "\n-F <path>   (default <path>=.)\n" + " "*12 + "Save default config.ini file to the path.\n"
+        help_msg += "\nSet `submit_as = array` in the config file to submit all jobs as one job array.\n"
         
         
         sys.stdout.write(help_msg)
@@ -727,6 +763,148 @@ class Submitter(ParameterIterator, JobDB):
         parameters.
         """
 
+        # record the progress, unless nothing is submitted
+        if self._settings.get('phase') == 'all' and not self._settings.get('test_mode'):
+            self._journal = journal.Journal()
+
+        try:
+            # submit previously staged jobs
+            if self._settings.get('phase') == 'launch':
+                self.launch()
+                return
+
+            # keep the queue filled until all jobs are submitted
+            if self._settings.get('follow'):
+                self.follow()
+                return
+
+            first, last = self.get_range()
+
+            # only create the directories and files
+            if self._settings.get('phase') == 'stage':
+                self.stage(first, last)
+                return
+
+            # log number of jobs to submit 
+            self.log("Submitting jobs {first} to {last} of {total}:\n".format(first=first, last=last, total=self._params.get_maxnum()), new=True)
+
+            self.submit_range(first, last)
+        finally:
+            self.close_job_db()
+            if self._journal is not None:
+                self._journal.close()
+            if self._archive is not None:
+                self._archive.close()
+
+    def submit_range(self, first, last):
+        """
+        Submit the jobs first...last (starting at 1).
+        Returns the IDs of the jobs that were submitted successfully.
+        """
+        self.start_pool()
+
+        # do the iteration, call execute for every job
+        for job_idx, cur_p in enumerate(self._params[first-1:last]):
+            header = "{}. Submitting job for ".format(first+job_idx) + self._pformat_str.format(*cur_p) + " | indices: " + self._dformatlist_str.format(*self._params.get_inds_per_ax(first-1+job_idx))
+            if self._pool is None:
+                self.log(header)
+            else:
+                # keep the logfile ordered, log together with the result
+                self._job_headers[first-1+job_idx] = header
+            self.execute(first-1+job_idx, cur_p)
+
+        # jobs in array mode are only submitted once all directories are ready
+        if self._settings.get('submit_as') == 'array':
+            self.submit_array()
+
+        self.finish_pool()
+        self.invalidate_queue(self._new_job_ids)
+
+        new_job_ids, self._new_job_ids = self._new_job_ids, []
+        return new_job_ids
+
+    def invalidate_queue(self, job_ids):
+        """
+        Remove the shared squeue snapshots once after jobs `job_ids` have been
+        submitted, sstatus and sterminate must not read an old queue.
+        """
+        if len(job_ids) > 0 and not self._settings.get('test_mode'):
+            slurm.invalidate_snapshots()
+
+    def follow(self):
+        """
+        Keep up to `follow` jobs of the range pending or running, until all jobs
+        have been submitted. The progress is saved after every poll, a new call
+        without start index continues a previous run.
+        """
+        max_active = self._settings.get('follow')
+
+        state = None
+        if 'start_index' not in self._settings:
+            state = follow.FollowState.load()
+            if state is None:
+                self._settings.update([['start_index', 1], ['num_submits', self._params.get_maxnum()]])
+        if state is None:
+            state = follow.FollowState(*self.get_range())
+        first = state.next
+
+        self.log("Following jobs {first} to {last} of {total}, keeping up to {num} jobs in the queue:\n".format(
+            first=first, last=state.last, total=self._params.get_maxnum(), num=max_active), new=True)
+
+        try:
+            while not state.is_done():
+                queued_ids = self.get_queued_ids()
+                if queued_ids is not None:
+                    state.update_active(queued_ids)
+
+                    # top up, skipped and failed jobs don't occupy the queue
+                    while state.get_free(max_active) > 0:
+                        for first_job, last_job in get_runs(state.take(state.get_free(max_active))):
+                            state.active += [str(j) for j in self.submit_range(first_job, last_job)]
+
+                        # SLURM rejects jobs, e.g. over the submit limit: retry with the next poll
+                        failed, self._failed_idx = [j + 1 for j in self._failed_idx], []
+                        if len(failed) > 0:
+                            state.retry += failed
+                            self.log("> {} submission(s) failed, retrying with the next poll.\n".format(len(failed)))
+                            break
+
+                # in test mode nothing is submitted, a real run starts from scratch
+                if not self._settings.get('test_mode'):
+                    state.save()
+                # in test mode nothing is queued, so there is nothing to wait for
+                if not state.is_done() and not self._settings.get('test_mode'):
+                    # show the progress of this poll before waiting
+                    self._logger.flush()
+                    time.sleep(self._settings.get('follow_interval'))
+        except KeyboardInterrupt:
+            if not self._settings.get('test_mode'):
+                state.save()
+            self.log("\nInterrupted. Run `ssubmit --follow {}` to continue.".format(max_active))
+
+        # finalize reports the jobs submitted by this call
+        self._settings.update([['start_index', first], ['num_submits', state.next - first]])
+
+    def get_queued_ids(self):
+        """
+        Return the IDs of the queued jobs of the user from a single call to squeue,
+        None if squeue failed.
+        """
+        if self._settings.get('test_mode'):
+            # nothing is submitted, so nothing is queued
+            return []
+        try:
+            # the queue changes with every submission, don't use a shared snapshot
+            return slurm.squeue_user(array=True, fresh=True).get_ids()
+        except (RuntimeError, OSError) as e:
+            self.log("WARNING: Could not read the queue ({}).".format(str(e).strip()))
+            return None
+
+    def get_range(self):
+        """
+        Return the first and last job (starting at 1) to submit.
+        """
+
         # get first and last index from settings
         first = self._settings.get('start_index')
         last = first + self._settings.get('num_submits') - 1
@@ -737,14 +915,201 @@ class Submitter(ParameterIterator, JobDB):
             last = first + num - 1
             self.log("INFO: Highest specified job out of range ({}/{}). Overriding.\n".format(first+self._settings.get('num_submits')-1, self._params.get_maxnum()))
             self._settings.update([['num_submits', num]])
-        
-        # log number of jobs to submit 
-        self.log("Submitting jobs {first} to {last} of {total}:\n".format(first=first, last=last, total=self._params.get_maxnum()), new=True)
 
-        # do the iteration, call execute for every job
-        for job_idx, cur_p in enumerate(self._params[first-1:last]):
-            self.log("{}. Submitting job for ".format(first+job_idx) + self._pformat_str.format(*cur_p) + " | indices: " + self._dformatlist_str.format(*self._params.get_inds_per_ax(first-1+job_idx)))
-            self.execute(first-1+job_idx, cur_p)
+        return first, last
+
+    def start_pool(self):
+        """
+        Create the pool for parallel submission if requested.
+        """
+        max_parallel = self._settings.get('max_parallel_submits')
+        if self._settings.get('submit_as') == 'sbatch' and max_parallel > 1:
+            self._pool = submitpool.SubmitPool(self.run_sbatch, max_parallel)
+
+    def finish_pool(self):
+        """
+        Wait for the remaining parallel submissions and process their results.
+        """
+        if self._pool is not None:
+            for (job_idx, cur_p, dirname), result in self._pool.drain():
+                self.process_result(job_idx, cur_p, dirname, result)
+            self._pool.shutdown()
+            self._pool = None
+
+    def stage(self, first, last):
+        """
+        Create the directories and render the files of the jobs first...last
+        in parallel and record them in the manifest. Nothing is submitted.
+        """
+        self.log("Staging jobs {first} to {last} of {total}:\n".format(first=first, last=last, total=self._params.get_maxnum()), new=True)
+
+        # compile the templates before the worker threads use them
+        self.get_templates()
+
+        staged = manifest.Manifest()
+        with futures.ThreadPoolExecutor(max_workers=self._settings.get('stage_workers')) as executor:
+            results = executor.map(self.stage_job, range(first-1, last), self._params[first-1:last])
+
+            # results are returned in job-index order
+            for job_idx, cur_p, dirname, digest in results:
+                self.log("{}. Staging job for ".format(job_idx+1) + self._pformat_str.format(*cur_p) + " | indices: " + self._dformatlist_str.format(*self._params.get_inds_per_ax(job_idx)))
+                if digest is None:
+                    self.log("> Directory existed and overwrite is disabled. Skipping this value.\n")
+                    self._job_count.skipped()
+                else:
+                    staged.add_staged(job_idx, dirname, cur_p, digest)
+                    self._job_count.success()
+                    self.log("> Staged in {}.\n".format(dirname))
+
+        staged.close()
+
+    def stage_job(self, job_idx, cur_p):
+        """
+        Create the directory and render the files of a single job.
+        Returns the job, its directory and the content hash, which is None if the job was skipped.
+        """
+        dirname = self.get_dirname(cur_p, job_idx)
+
+        # create directory if it doesn't exist, returns True if directory existed
+        existed = util.assert_dir(dirname)
+        if existed and not self._settings.get('overwrite_dir'):
+            return job_idx, cur_p, dirname, None
+
+        digest = manifest.new_hash()
+        self.render_job(dirname, cur_p, digest, script=self.get_render_mode() == 'file')
+
+        return job_idx, cur_p, dirname, digest.hexdigest()
+
+    def launch(self):
+        """
+        Submit the staged jobs from the manifest that have not been submitted yet.
+        """
+        self._manifest = manifest.Manifest()
+        pending = self._manifest.get_pending()
+        if 'num_submits' in self._settings:
+            pending = pending[:self._settings.get('num_submits')]
+        self._settings.update([['num_submits', len(pending)]])
+
+        self.log("Launching {} staged jobs:\n".format(len(pending)), new=True)
+
+        self.start_pool()
+
+        for entry in pending:
+            job_idx, cur_p, dirname = entry['staged'], entry['params'], entry['dirname']
+            header = "{}. Launching job in {}".format(job_idx+1, dirname)
+            if self._pool is None:
+                self.log(header)
+            else:
+                self._job_headers[job_idx] = header
+            if self._settings.get('submit_as') == 'array':
+                # the script is staged in the directory, submit later with the whole array
+                self._array_jobs.append([job_idx, cur_p, dirname])
+                self.log("> Added to job array.\n")
+            else:
+                self.queue_submission(job_idx, cur_p, dirname, self.get_sbatch_args(dirname, cur_p),
+                                      self.get_script_input(dirname, cur_p))
+
+        if self._settings.get('submit_as') == 'array':
+            self.submit_array()
+
+        self.finish_pool()
+        self.invalidate_queue(self._new_job_ids)
+        self._manifest.close()
+
+    def queue_submission(self, job_idx, cur_p, dirname, args, script=None):
+        """
+        Submit a rendered job with the sbatch arguments `args`, in parallel if the pool is active.
+        If `script` is given, it is passed to sbatch over stdin.
+        """
+        args = self.get_comment_args(job_idx) + args
+        if self._pool is None:
+            self.process_result(job_idx, cur_p, dirname, self.run_sbatch(args, script))
+        else:
+            self._pool.submit([job_idx, cur_p, dirname], args, script)
+            self.process_completed()
+
+    def get_campaign(self):
+        """
+        Return the Campaign of the job comments, None if `job_comment` is disabled
+        or in test mode, where no campaign file is created.
+        """
+        if not self._settings.get('job_comment') or self._settings.get('test_mode'):
+            return None
+        if self._campaign is None:
+            self._campaign = campaign.create()
+        return self._campaign
+
+    def get_comment_args(self, job_idx, array=False):
+        """
+        Return the sbatch arguments that store the campaign ID and the linear
+        index `job_idx` (of task 0 with `array`) in the job comment.
+        """
+        cur_campaign = self.get_campaign()
+        if cur_campaign is None:
+            return []
+        return ['--comment', cur_campaign.get_comment(job_idx, array)]
+
+    def get_render_mode(self):
+        """
+        Return how the script file of a job is passed to sbatch:
+
+        * 'file'  : rendered to the job directory
+        * 'env'   : the original script file, parameters as environment variables
+        * 'stdin' : rendered in memory and piped to sbatch
+
+        The dispatcher of job arrays needs the script in each directory, so job
+        arrays always use 'file'.
+        """
+        render_mode = self._settings.get('render_mode')
+        if render_mode not in ['file', 'env', 'stdin']:
+            raise RuntimeError("Invalid render_mode: {}".format(render_mode))
+        if self._settings.get('submit_as') != 'sbatch':
+            return 'file'
+        return render_mode
+
+    def get_script_input(self, dirname, plist):
+        """
+        Return the rendered script of a job for `render_mode = stdin` and add
+        it to the script archive, None in all other modes.
+        """
+        if self.get_render_mode() != 'stdin':
+            return None
+
+        templates = self.get_templates()
+        script = templates.get_script().render(templates.get_values(self.get_replace_items(dirname, plist)))
+
+        if self._archive is None:
+            self._archive = archive.ScriptArchive()
+        self._archive.add(os.path.join(dirname, os.path.basename(self._settings.get('script_path'))), script)
+
+        return script
+
+    def get_sbatch_args(self, dirname, plist):
+        """
+        Return the arguments of sbatch for a job whose files have been rendered.
+        """
+        render_mode = self.get_render_mode()
+        if render_mode == 'file':
+            filename = os.path.basename(self._settings.get('script_path'))
+            return ['-D', dirname, os.path.join(dirname, filename)]
+        elif render_mode == 'stdin':
+            # sbatch reads the script from stdin
+            return ['--chdir', dirname]
+
+        # pass the parameters and the jobname as environment variables
+        names = get_wildcard_list(self._params)
+        jobname = self._settings.get('jobname_prefix') + dirname
+        values = self.get_pformat_values(plist) + [jobname]
+
+        exports = []
+        for name, value in zip(names, values):
+            # sbatch splits the list of variables at commas
+            if ',' in value:
+                raise RuntimeError("Value of {} contains a comma and cannot be exported: {}".format(name, value))
+            exports.append("{}={}".format(name, value))
+
+        return ['--chdir', dirname, '--job-name', jobname, '--export', "ALL," + ",".join(exports),
+                self.get_shared_script_path()]
 
     def get_num_jobs(self, start, num):
         """
@@ -766,9 +1131,7 @@ class Submitter(ParameterIterator, JobDB):
         Print final information about success to logfile.
         """
 
-        # get first and last index from settings
-        first = self._settings.get('start_index')
-        last = first + self._settings.get('num_submits') - 1
+        phase = self._settings.get('phase')
 
         # get number of submits from settings
         num_submits = self._settings.get('num_submits')
@@ -789,109 +1152,353 @@ class Submitter(ParameterIterator, JobDB):
         # compose and log the summary string
         self.log("\nSummary:")
         self.log(get_underline("Summary:"))
-        self.log("Submission of {} {} completed {} errors.".format(num_submits, job_str, err_str))
+        self.log("{} of {} {} completed {} errors.".format("Staging" if phase == 'stage' else "Submission", num_submits, job_str, err_str))
         self.log("\n{:8s}: {:3d}".format("Success", self._job_count.get_success()))
         self.log("{:8s}: {:3d}".format("Skipped", self._job_count.get_skipped()))
         self.log("{:8s}: {:3d}\n".format("Failed", self._job_count.get_fail()))
 
+        if phase == 'launch':
+            self.log("Staged jobs not yet submitted: {}".format(len(self._manifest.get_pending())))
+            self._logger.close()
+            return
+        elif phase == 'stage':
+            self.log("Run `ssubmit launch` to submit the staged jobs.")
+
+        # get first and last index from settings
+        first = self._settings.get('start_index')
+        last = first + self._settings.get('num_submits') - 1
+
         # log the next job index
         if last >= self._params.get_maxnum():
             self.log("All {} jobs submitted.".format(self._params.get_maxnum()))
         else:
             self.log("Next job: {}".format(last+1))
 
+        self._logger.close()
+
     def execute(self, job_idx, cur_p):
         
         # get directory name
         dirname = self.get_dirname(cur_p, job_idx)
 
-        # create directory if it doesn't exist, returns True if directory existed
-        retval = util.assert_dir(dirname)
+        # state of the job from a previous run, e.g. before a crash
+        state = self.get_journal_state(job_idx, dirname)
+
+        if state == journal.SUBMITTED and not self._settings.get('overwrite_dir'):
+            # already has a job ID, skip without touching the directory
+            retval = True
+        else:
+            # create directory if it doesn't exist, returns True if directory existed
+            retval = util.assert_dir(dirname)
+
+            # rendered or failed jobs have not been submitted yet
+            if state in [journal.RENDERED, journal.FAILED]:
+                retval = False
 
         # else if settings.get('overwrite')
         if (not retval) or self._settings.get('overwrite_dir'):
 
             # if settings.get('submit_as') is 'sbatch'
             if self._settings.get('submit_as') == 'sbatch':
-                retval, message = self.submit_sbatch(dirname, cur_p)
+                start = time.time()
+                self.render_job(dirname, cur_p, script=self.get_render_mode() == 'file')
+                script = self.get_script_input(dirname, cur_p)
+                self._render_times[job_idx] = time.time() - start
+                if self._journal is not None:
+                    self._journal.add_rendered(job_idx, dirname)
+                self.queue_submission(job_idx, cur_p, dirname, self.get_sbatch_args(dirname, cur_p), script)
+                return
+            elif self._settings.get('submit_as') == 'array':
+                # render now, submit later with the whole array
+                start = time.time()
+                self.render_job(dirname, cur_p)
+                self._render_times[job_idx] = time.time() - start
+                if self._journal is not None:
+                    self._journal.add_rendered(job_idx, dirname)
+                self._array_jobs.append([job_idx, cur_p, dirname])
+                self.log("> Added to job array.\n")
+                return
             else:
-                raise NotImplementedError
- 
-            if retval:
-                self._job_count.success()
+                raise NotImplementedError("submit_as = {}".format(self._settings.get('submit_as')))
+        else:
+            result = None
+
+        if self._pool is None:
+            self.process_result(job_idx, cur_p, dirname, result)
+        else:
+            self._pool.add_result([job_idx, cur_p, dirname], result)
+            self.process_completed()
+
+    def get_journal_state(self, job_idx, dirname):
+        """
+        Return the state of a job in the journal, None if it is not known.
+        """
+        if self._journal is None:
+            return None
+        return self._journal.get_state(job_idx, dirname)
 
-                # add job to job database
-                job_id = message.strip().split()[-1]
-                self.update_job_db(cur_p, os.path.realpath(dirname), job_id)
+    def process_completed(self):
+        """
+        Process the results of parallel submissions that are done, in job-index order.
+        """
+        for (job_idx, cur_p, dirname), result in self._pool.completed():
+            self.process_result(job_idx, cur_p, dirname, result)
+
+    def process_result(self, job_idx, cur_p, dirname, result):
+        """
+        Count and log the result of a submission and add the job to the database.
+        `result` is a SubmitResult or None if the job was skipped.
+        """
+        if job_idx in self._job_headers:
+            self.log(self._job_headers.pop(job_idx))
 
-                self.log("> Submission succeeded. ({})\n".format(message))
+        if result is None:
+            if self.get_journal_state(job_idx, dirname) == journal.SUBMITTED:
+                self.log("> Already submitted as job {}. Skipping this value.\n".format(self._journal.get_job_id(job_idx)))
             else:
-                self._job_count.failed()
+                self.log("> Directory existed and overwrite is disabled. Skipping this value.\n")
+            self._job_count.skipped()
+            self.record_job(job_idx, dirname, 'skipped')
+            return
+
+        if self._settings.get('test_mode'):
+            self.log("> Test mode active, not submitting.")
+
+        if result.is_success():
+            self._job_count.success()
+
+            # add job to job database
+            job_id = result.job_id
+            if not self._settings.get('test_mode'):
+                self.update_job_db(job_idx, os.path.realpath(dirname), job_id, cur_p)
 
-                self.log("> Submission failed. ({})\n".format(message))
+            if self._manifest is not None and not self._settings.get('test_mode'):
+                self._manifest.add_launched(job_idx, job_id)
+            if self._journal is not None:
+                self._journal.add_submitted(job_idx, dirname, job_id)
+
+            self._new_job_ids.append(job_id)
+            self.record_job(job_idx, dirname, 'submitted', job_id, result)
+
+            self.log("> Submission succeeded. ({})\n".format(result))
         else:
-            self.log("> Directory existed and overwrite is disabled. Skipping this value.\n")
-            self._job_count.skipped()
+            self._job_count.failed()
+            self._failed_idx.append(job_idx)
+            if self._journal is not None:
+                self._journal.add_failed(job_idx, dirname, result.error)
+            self.record_job(job_idx, dirname, 'failed', result=result)
+
+            self.log("> Submission failed. ({})\n".format(result))
+
+    def record_job(self, job_idx, dirname, status, job_id=None, result=None):
+        """
+        Add the machine-readable record of a job to the log.
+        """
+        record = dict(index=int(job_idx), dirname=dirname, status=status,
+                      job_id=None if job_id is None else str(job_id),
+                      render_time=self._render_times.pop(job_idx, None))
+        if result is not None:
+            record.update(submit_time=result.elapsed, cluster=result.cluster,
+                          array_range=result.array_range, warnings=result.warnings)
+            if not result.is_success():
+                record.update(error=result.error)
+
+        self._logger.record(**record)
 
     def submit_sbatch(self, dirname, plist):
         
-        # create wildcard list
-        wildcard_list = get_wildcard_list(self._params)
+        self.render_job(dirname, plist, script=self.get_render_mode() == 'file')
 
-        # name and path of the script file
-        filename = os.path.basename(self._settings.get('script_path'))
-        filepath = os.path.join(dirname, filename)
+        return self.run_sbatch(self.get_sbatch_args(dirname, plist), self.get_script_input(dirname, plist))
+
+    def submit_array(self):
+        """
+        Submit all jobs collected by `execute` or `launch` as job arrays.
+
+        The jobs are split in chunks of at most MaxArraySize tasks, each chunk is
+        submitted by a single call to `sbatch --array`.
+        """
+        if len(self._array_jobs) == 0:
+            return
+
+        max_array_size = self._settings.get('max_array_size')
+        if not max_array_size:
+            if self._settings.get('test_mode'):
+                max_array_size = slurm.DEFAULT_MAX_ARRAY_SIZE
+            else:
+                max_array_size = slurm.get_max_array_size()
+
+        # the dispatcher maps array task IDs to job directories
+        header = arrayjob.get_sbatch_header(self._settings.get('script_path'), get_wildcard_list(self._params))
+        arrayjob.write_dispatcher(arrayjob.DISPATCHER_NAME, os.path.basename(self._settings.get('script_path')),
+                                  header, self._settings.get('jobname_prefix') + "array")
+
+        for chunk in arrayjob.split_chunks(self._array_jobs, max_array_size):
+            first, last = chunk[0][0] + 1, chunk[-1][0] + 1
+            table_path = arrayjob.TABLE_NAME.format(first=first, last=last)
+            arrayjob.write_task_table(table_path, [dirname for job_idx, cur_p, dirname in chunk])
+
+            spec = arrayjob.get_array_spec(len(chunk), self._settings.get('array_throttle'))
+
+            # the comment maps task t to the index of task 0 plus t, if the indices are consecutive
+            comment_args = []
+            if chunk[-1][0] - chunk[0][0] == len(chunk) - 1:
+                comment_args = self.get_comment_args(chunk[0][0], array=True)
+
+            result = self.run_sbatch(comment_args + ['--array', spec, arrayjob.DISPATCHER_NAME, table_path])
+            if self._settings.get('test_mode'):
+                self.log("> Test mode active, not submitting.")
+
+            if result.is_success():
+                array_id = result.job_id
+                for task, (job_idx, cur_p, dirname) in enumerate(chunk):
+                    self._job_count.success()
+                    if not self._settings.get('test_mode'):
+                        self.update_job_db(job_idx, os.path.realpath(dirname), arrayjob.get_task_id(array_id, task), cur_p)
+                    self._new_job_ids.append(arrayjob.get_task_id(array_id, task))
+                    if self._manifest is not None and not self._settings.get('test_mode'):
+                        self._manifest.add_launched(job_idx, arrayjob.get_task_id(array_id, task))
+                    if self._journal is not None:
+                        self._journal.add_submitted(job_idx, dirname, arrayjob.get_task_id(array_id, task))
+                    self.record_job(job_idx, dirname, 'submitted', arrayjob.get_task_id(array_id, task), result)
+
+                self.log("> Submission of job array {}-{} succeeded. ({})\n".format(first, last, result))
+            else:
+                for job_idx, cur_p, dirname in chunk:
+                    self._job_count.failed()
+                    self._failed_idx.append(job_idx)
+                    if self._journal is not None:
+                        self._journal.add_failed(job_idx, dirname, result.error)
+                    self.record_job(job_idx, dirname, 'failed', result=result)
+
+                self.log("> Submission of job array {}-{} failed. ({})\n".format(first, last, result))
 
+        self._array_jobs = []
+
+    def get_templates(self):
+        """
+        Return the compiled templates of the script file and the other files.
+        The files are read and parsed only once per run.
+        """
+        if self._templates is None:
+            other_files = self._settings.get('other_files') if 'other_files' in self._settings else []
+            self._templates = template.TemplateSet(self._settings.get('script_path'), other_files,
+                                                   get_wildcard_list(self._params), self.get_marker_script())
+        return self._templates
+
+    def get_marker_script(self):
+        """
+        Return the lines that set the status markers of a job (see `markers`),
+        None if `markers = none`.
+        """
+        marker_class = markers.get_marker_class(self._settings.get('markers'))
+        if marker_class is None:
+            return None
+        return marker_class.get_script(os.getcwd())
+
+    def get_shared_script_path(self):
+        """
+        Return the path of the script file that is submitted for all jobs with
+        `render_mode = env`. With status markers, this is a copy of the script
+        file with the markers, written once.
+        """
+        script_path = os.path.realpath(self._settings.get('script_path'))
+        insert = self.get_marker_script()
+        if insert is None:
+            return script_path
+
+        if self._marked_script is None:
+            self._marked_script = os.path.realpath(markers.MARKED_SCRIPT_PREFIX + os.path.basename(script_path))
+            with open(script_path, 'r', newline='') as infile:
+                text = infile.read()
+            with open(self._marked_script, 'w', newline='') as outfile:
+                outfile.write(markers.inject(text, insert))
+        return self._marked_script
+
+    def get_replace_items(self, dirname, plist):
+        """
+        Return the strings that replace the wildcards, i.e. the parameter values and the jobname.
+        """
         # create jobname
         jobname = self._settings.get('jobname_prefix') + dirname
 
-        # copy-replace script file
-        #print(self._pformat_list_all)
-        #print(plist)
         #replace_items = [fstr.format(p) for fstr, p in zip(self._pformat_list_all, plist)] #.append(jobname)
         replace_items = [str(p) for p in plist]
         replace_items.append(jobname)
-        #print(replace_items)
-        util.copy_replace(self._settings.get('script_path'), filepath, wildcard_list, replace_items)
-        # make sure copying was successful
-        if not os.access(filepath, os.F_OK):
-            print("There was a problem copying the script file. Exiting.")
-            sys.exit(1)
+
+        return replace_items
+
+    def render_job(self, dirname, plist, digest=None, script=True):
+        """
+        Copy the script file and other files to `dirname` and replace the wildcards.
+        Returns the path of the script file.
+
+        If a hash object `digest` is given, it is updated with the content of all files.
+        If `script` is False, only the other files are written.
+        """
+        templates = self.get_templates()
+        values = templates.get_values(self.get_replace_items(dirname, plist))
+
+        # name and path of the script file
+        filename = os.path.basename(self._settings.get('script_path'))
+        filepath = os.path.join(dirname, filename)
+
+        # render script file
+        rendered = []
+        if script:
+            try:
+                rendered.append(templates.get_script().write(filepath, values))
+            except IOError:
+                print("There was a problem copying the script file. Exiting.")
+                sys.exit(1)
+        else:
+            filepath = os.path.realpath(self._settings.get('script_path'))
 
         # copy also other files and replace occurrences of parameters
-        if 'other_files' in self._settings:
-            for filename in self._settings.get('other_files'):
-                tmp_filename = os.path.basename(filename)
-                tmp_filepath = os.path.join(dirname, tmp_filename)
-                util.copy_replace(filename, tmp_filepath, wildcard_list, replace_items)
+        for other in templates.get_others():
+            tmp_filepath = os.path.join(dirname, os.path.basename(other.get_path()))
+            rendered.append(other.write(tmp_filepath, values))
+
+        # hash the written text, nothing is rendered twice
+        if digest is not None:
+            for text in rendered:
+                digest.update(text.encode('utf-8'))
+
+        return filepath
+
+    def run_sbatch(self, args, script=None):
+        """
+        Call sbatch with the `cmd_arguments` from the settings followed by `args`.
+        If `script` is given, it is written to the stdin of sbatch.
+        Returns a SubmitResult.
+
+        This is called from the worker threads of the submission pool, so it must
+        not log or change any state.
+        """
 
+        array_range = args[args.index('--array') + 1] if '--array' in args else None
+
+        start = time.time()
         if not self._settings.get('test_mode'):
-            # submit script file
+            # submit script file, only the job ID (and cluster) is printed to stdout
             cmd_args = self._settings.get('cmd_arguments')
             if cmd_args == "":
-                cmd_list = ["sbatch", '-D', dirname, filepath]
+                cmd_list = ["sbatch", "--parsable"] + args
+            else:
+                cmd_list = ["sbatch", "--parsable", cmd_args] + args
+            if script is None:
+                p = subprocess.Popen(cmd_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out_str, err_str = p.communicate()
             else:
-                cmd_list = ["sbatch", cmd_args, '-D', dirname, filepath]
-            p = subprocess.Popen(cmd_list, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-            out_str, err_str = p.communicate()
-            p.wait()
+                p = subprocess.Popen(cmd_list, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out_str, err_str = p.communicate(script.encode('utf-8'))
+            returncode = p.wait()
         else:
             # pretend submission was successful
-            self.log("> Test mode active, not submitting.")
-            out_str = "JOB 1 SUBMITTED"
-        
-        message = out_str.decode('utf-8').strip()
+            out_str, err_str, returncode = b"1", b"", 0
 
-        # determine if submission was successful
-        if "FAILED" in message.upper():
-            retval = False
-        elif "SUBMITTED" in message.upper():
-            retval = True
-        else:
-            retval = False
-
-        # return message
-        return retval, message
+        return slurm.parse_sbatch_parsable(returncode, out_str.decode('utf-8'), err_str.decode('utf-8'),
+                                           time.time() - start, array_range)
     
     def submit_srun(self, dirname, plist):
         
@@ -899,14 +1506,7 @@ class Submitter(ParameterIterator, JobDB):
     
     def log(self, logstring, to_screen=True, new=False):
         
-        log_exists = util.fexists(self._logfile_name)
-        with open(self._logfile_name, 'a') as logfile:
-            if new and log_exists:
-                logfile.write("\n" + "-"*80 + "\n\n")
-            logfile.write(logstring + "\n")
-        
-        if to_screen:
-            sys.stdout.write(logstring + "\n")
+        self._logger.write(logstring, to_screen, new)
 
 
 
@@ -934,13 +1534,64 @@ class StatusChecker(ParameterIterator, JobDB):
         # F : failed
         # P : pending
         self._include = 'A'
+
+        # bypass the shared squeue snapshot
+        self._fresh = False
+
+        # refresh interval in seconds, 0 to check only once
+        self._watch = 0
+
+        # parameter names of the status summary, None to print one line per job
+        self._summary = None
+
+        # machine-readable output format (see `statusexport`), None for the formatted table
+        self._format = None
         self.process_input(argv)
 
         if self._mode == 'run':
             ParameterIterator.__init__(self)
             JobDB.__init__(self)
-            self._job_db = self.read_job_db()
             self._job_count = JobStatusCounter()
+
+            # buffered output to the screen
+            self._logger = campaignlog.CampaignLogger()
+
+            # job ID -> state of the queued jobs, read once from squeue, and
+            # whether squeue succeeded
+            self._queue = None
+            self._queue_ok = False
+
+            # accounting data of finished jobs from previous runs
+            self._cache = statecache.StateCache()
+
+            # latest output file per job directory, scanned once on first use
+            self._outfiles = outfiles.OutfileIndex('.')
+
+            # status markers per job directory, read once on first use
+            self._markers = None
+
+            # campaign ID in the job comments, None if the jobs were submitted without
+            self._campaign = campaign.load()
+
+            # linear index -> job ID from the job comments of the queued and of the
+            # finished jobs, and accounting data of the campaign
+            self._job_map = None
+            self._accounting_map = None
+            self._queue_comments = None
+            self._campaign_accounting = None
+
+            # job ID, parameters, directory and status of the checked jobs
+            self._rows = []
+
+            # JobStatusMessage values of all checked jobs, counted in finalize
+            self._status_values = []
+
+            # status per parameter point and the rows still to be looked up in sacct (summary mode)
+            self._grid = None
+            self._grid_rows = []
+
+            # writer of the machine-readable output, created on first use
+            self._writer = None
             if self._src_mode == 'file':
                 self.setup_default_settings()
                 self.update_ini_settings()
@@ -964,7 +1615,26 @@ class StatusChecker(ParameterIterator, JobDB):
         include = ''
         while (i <= argc):
             cur_arg = argv[i].strip()
-            if cur_arg[0] == '-' and len(cur_arg) > 1:
+            if cur_arg == '--fresh':
+                self._fresh = True
+            elif cur_arg == '--watch':
+                self._watch = 10
+                if i+1 <= argc and argv[i+1].strip().isdigit():
+                    self._watch = int(argv[i+1])
+                    i += 1
+            elif cur_arg == '--format':
+                if i+1 > argc:
+                    raise RuntimeError("Option --format needs one of {}".format(", ".join(statusexport.FORMATS)))
+                self._format = argv[i+1].strip().lower()
+                if self._format not in statusexport.FORMATS:
+                    raise RuntimeError("Invalid format: {} (use one of {})".format(self._format, ", ".join(statusexport.FORMATS)))
+                i += 1
+            elif cur_arg == '--summary':
+                self._summary = []
+                if i+1 <= argc and not argv[i+1].startswith('-'):
+                    self._summary = [name.strip() for name in argv[i+1].split(',') if len(name.strip()) > 0]
+                    i += 1
+            elif cur_arg[0] == '-' and len(cur_arg) > 1:
                 if 'a' in cur_arg:
                     # use job database
                     self._src_mode = 'all'
@@ -1011,6 +1681,9 @@ class StatusChecker(ParameterIterator, JobDB):
                 raise RuntimeError("Unrecognized commandline option {}".format(argv[i]))
             i += 1
 
+        if self._format is not None and (self._watch or self._summary is not None):
+            raise RuntimeError("Option --format can not be combined with --watch or --summary")
+
 
     def display_help(self):
         """
@@ -1043,6 +1716,13 @@ class StatusChecker(ParameterIterator, JobDB):
         help_msg += "-P" + " "*10 + "Show pending jobs.\n"
 
         help_msg += "\n-c" + " "*10 + "Clear job database.\n"
+        help_msg += "\n--fresh" + " "*5 + "Call squeue instead of using the output shared by recent sutils commands.\n"
+        help_msg += "\n--watch [s]" + " "*1 + "Refresh the jobs that have not finished every s seconds (default 10).\n"
+        help_msg += "\n--summary [p1[,p2]]\n" + " "*12 + "Print the number of jobs per status for every value of the parameter p1 (default all\n" \
+                    + " "*12 + "parameters) instead of one line per job. With p1,p2 print the fraction of completed\n" \
+                    + " "*12 + "and failed jobs per pair of values.\n"
+        help_msg += "\n--format f" + " "*2 + "Write one record per job as f = json (one object per line), csv or tsv instead of the\n" \
+                    + " "*12 + "formatted table. Other messages are written to stderr.\n"
 
         
         
@@ -1051,95 +1731,166 @@ class StatusChecker(ParameterIterator, JobDB):
     
     def find_last_job(self, dirname):
         """
-        Return the highest job index from outfiles in the directory `dirname`.
+        Return the highest job ID from outfiles in the directory `dirname`.
         """
-        filelist = glob.glob(os.path.join(dirname, "*.out"))
-        job_id_list = [int(name.split('.')[0].split('-')[1]) for name in filelist]
-
-        return max(job_id_list) if len(job_id_list) > 0 else None
+        return self._outfiles.get_job_id(dirname)
     
-    def check_accounting(self, job_id):
-        
-        raise NotImplementedError("StatusChecker.check_accounting")
-
-        p = subprocess.Popen(['sacct', '-j', str(job_id)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        p.wait()
+    def check_accounting(self, job_ids):
+        """
+        Return the accounting data of jobs that are no longer in the queue,
+        with a few calls to sacct, as an SacctResult. Returns None if sacct
+        failed.
+        """
         try:
-            sacct_outstr = p.communicate()[0].split('\n')[2]
-            #print sacct_outstr
+            return slurm.sacct(job_ids)
+        except (RuntimeError, OSError) as e:
+            self.log("Unexpected error: " + str(e).strip())
+            return None
 
-            job_no = sacct_outstr.split()[0]
-            slurm_status = sacct_outstr.split()[5]
+    def get_queue(self):
+        """
+        Return a dict job ID -> state of all queued jobs of the user.
+        squeue is called only once, all jobs are looked up in this snapshot.
+        """
+        if self._queue is None:
+            try:
+                if self._campaign is not None:
+                    # the same call lists the job comments
+                    res = slurm.squeue_comments(fresh=self._fresh)
+                    self._queue_comments = res.comment
+                else:
+                    res = slurm.squeue_user(array=True, fresh=self._fresh)
+                self._queue = dict(zip([str(j) for j in res.get_ids()], res.status))
+                self._queue_ok = True
+            except (RuntimeError, OSError) as e:
+                self.log("Unexpected error: " + str(e).strip())
+                self._queue = dict()
+                self._queue_comments = []
+                self._queue_ok = False
+
+        return self._queue
+
+    def get_campaign_accounting(self):
+        """
+        Return the accounting data of all jobs of the user since the campaign
+        was created, from a single call to sacct.
+        """
+        if self._campaign_accounting is None:
+            try:
+                self._campaign_accounting = slurm.sacct_user(self._campaign.get_created())
+            except (RuntimeError, OSError) as e:
+                self.log("Unexpected error: " + str(e).strip())
+                self._campaign_accounting = slurm.SacctResult("")
 
-            if slurm_status.lower() == 'cancelled':
-                self._job_count.cancelled()
-            elif slurm_status.lower() == 'failed':
-                self._job_count.failed()
-            elif slurm_status.lower() == 'running':
-                self._job_count.running()
-            elif slurm_status.lower() == 'pending':
-                self._job_count.pending()
+        return self._campaign_accounting
 
-            #print sacct_outstr
+    def find_in_comments(self, job_idx, dirname, plist=None):
+        """
+        Return the ID of the most recent job with linear index `job_idx` from
+        the job comments, None if it is not found or the campaign has no ID.
 
-        except:
-            slurm_status = "job ID not found"
-        
-        #self._pformat_str.format(*cur_p)
+        Queued jobs are found in the comments listed by squeue. A job that has
+        left the queue and whose state is cached is taken from the job
+        database, sacct is only called for the comments of the other jobs
+        whose directory `dirname` exists.
+        """
+        if self._campaign is None:
+            return None
 
-        #self.log(std_string + "job {0} {1}".format(job_id, slurm_status))
+        if self._job_map is None:
+            queue = self.get_queue()
+            self._job_map = campaign.JobMap(self._campaign)
+            self._job_map.add(list(queue.keys()), self._queue_comments)
 
-        return slurm_status
+        job_id = self._job_map.get(job_idx)
+        if job_id is not None:
+            return job_id
 
-    def check_squeue(self, job_id):
-        p = subprocess.Popen(['squeue', '-h', '-j', str(job_id)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        p_outstr, p_errstr = p.communicate()
         try:
-            p_outline = p_outstr.split('\n')[0] # this should be the line containing the job info
-        except IndexError:
-            return JobStatusMessage(JobStatusMessage.not_found_in_queue)
-        
-        p.wait()
+            job_id = self.find_in_job_db(job_idx, None, plist)
+            if self._cache.get(job_id) is not None:
+                return job_id
+        except KeyError:
+            pass
 
-        if 'invalid job id' in p_errstr.lower():
-            slurm_status = JobStatusMessage(JobStatusMessage.not_found_in_queue)
-        elif len(p_errstr.strip()) > 0:
-            print("Unexpected error: " + p_errstr.strip())
-        else:
-            #print(p_outline, p_outstr, p_errstr)
-            job_no = p_outline.split()[0].strip()
-            slurm_status = p_outline.split()[4].strip()
+        if not self._outfiles.has_dir(dirname):
+            return None
+
+        if self._accounting_map is None:
+            accounting = self.get_campaign_accounting()
+            self._accounting_map = campaign.JobMap(self._campaign)
+            self._accounting_map.add(accounting.jobid, accounting.comment)
+
+        return self._accounting_map.get(job_idx)
 
-            if slurm_status == 'R':
-                self._job_count.running()
-                slurm_status = JobStatusMessage(JobStatusMessage.running)
-            elif slurm_status == 'PD':
-                self._job_count.pending()
-                slurm_status = JobStatusMessage(JobStatusMessage.pending)
+    def refresh(self):
+        """Forget the snapshots of squeue and sacct, the next lookups call them again."""
+        self._queue = None
+        self._queue_comments = None
+        self._campaign_accounting = None
+        self._job_map = None
+        self._accounting_map = None
+
+    def check_squeue(self, job_id):
+        slurm_status = self.get_queue().get(str(job_id))
+
+        if slurm_status is None:
+            slurm_status = JobStatusMessage(JobStatusMessage.not_found_in_queue)
+        elif slurm_status == 'R':
+            slurm_status = JobStatusMessage(JobStatusMessage.running)
+        elif slurm_status == 'PD':
+            slurm_status = JobStatusMessage(JobStatusMessage.pending)
 
         return slurm_status
 
     
     def check_outfile(self, job_id):
         raise NotImplementedError("StatusChecker.check_outfile")
+
+    def get_marker_mode(self):
+        return self._settings.get('markers', 'none')
+
+    def get_marker(self, dirname, job_id):
+        """
+        Return the status marker set by the job `job_id` in `dirname`, None if
+        the job has not set a marker. All markers are read on the first call.
+        """
+        if self._markers is None:
+            mode = self.get_marker_mode()
+            dirnames = self._outfiles.get_dirnames() if mode == 'file' else []
+            self._markers = markers.load(mode, '.', dirnames)
+
+        marker = self._markers.get(os.path.normpath(dirname))
+        if marker is None or not marker.matches(job_id):
+            return None
+        return marker
+
+    def check_marker(self, dirname, job_id):
+        """
+        Return the status of a job from its marker if the job has ended,
+        None if SLURM has to be asked.
+        """
+        marker = self.get_marker(dirname, job_id)
+        if marker is None:
+            return None
+        if marker.get_value() == markers.Status.completed:
+            return JobStatusMessage(JobStatusMessage.completed, data={'exitcode': "0:0"})
+        elif marker.get_value() == markers.Status.failed:
+            return JobStatusMessage(JobStatusMessage.failed, "exit {}".format(marker.get_exitcode()),
+                                    {'exitcode': "{}:0".format(marker.get_exitcode())})
+        return None
     
     def find_in_dir(self, plist, job_idx):
         """
         Find job ID from out files in subdirectory corresponding to `plist`.
         """
         dirname = self.get_dirname(plist, job_idx)
-        if not os.access(dirname, os.F_OK):
-            if False:
-                print("Directory not found: " + dirname + ", plist={}, job_idx={}".format(plist, job_idx))
+        if not self._outfiles.has_dir(dirname):
             raise MissingDirectoryError(dirname)
-        outfiles = glob.glob(os.path.join(dirname, "slurm-*.out"))
 
-        try:
-            job_id = int(sorted(outfiles)[-1].split(".")[0].split('-')[1])
-        except IndexError:
+        job_id = self._outfiles.get_job_id(dirname)
+        if job_id is None:
             raise MissingOutfileError('')
-            
 
         return job_id
 
@@ -1159,7 +1910,7 @@ class StatusChecker(ParameterIterator, JobDB):
             #raise NotImplementedError("option -d")
 
             # get list of subdirectories
-            dirlist = sorted(util.listdirs('.'))
+            dirlist = self._outfiles.get_dirnames()
 
             # iterate over list
             for idx, directory in enumerate(dirlist):
@@ -1173,7 +1924,7 @@ class StatusChecker(ParameterIterator, JobDB):
                         linear_idx = self._params.get_number(plist) # linear index of the parameters
                     self.execute(linear_idx, plist)
                 except InvalidDirectoryNameError:
-                    print("Ignoring {}".format(directory))
+                    self.log("Ignoring {}".format(directory))
                 
             
         elif self._src_mode == "file":
@@ -1182,6 +1933,10 @@ class StatusChecker(ParameterIterator, JobDB):
             # use base class method
             ParameterIterator.iterate(self)
 
+        # keep the parameters and jobs in memory and refresh only the status
+        if self._watch and self._summary is None and self._format is None:
+            self.watch()
+
     def execute(self, job_idx, plist):
         """
         Call the status checks and print outputs to screen.
@@ -1194,45 +1949,245 @@ class StatusChecker(ParameterIterator, JobDB):
         skip_misses = True  # setting this skips output for directories, which have not been created yet
         skip = False        # indicates if output is to be skipped for this job_idx
 
-        # find job in job_db
-        try:
-            #idx = np.where(self._job_db[0] == os.path.realpath(dirname))[0]
-            #job_id = self._job_db[1, idx]
-            job_id = self.find_in_job_db(plist, 'id')
-        except:
+        # find job in the job comments, then in job_db
+        job_id = self.find_in_comments(job_idx, dirname, plist)
+        if job_id is None:
             try:
-                job_id = self.find_in_dir(plist, job_idx)
-            except MissingDirectoryError:
-                job_id = -1
-                status = JobStatusMessage(JobStatusMessage.dir_not_found)
-                skip = True
-            except MissingOutfileError:
-                job_id = -1
-                status = JobStatusMessage(JobStatusMessage.outfile_not_found)
-
-        # if job ID could be retrieved
-        if status is None:
-            status = self.check_squeue(job_id)
-            if status == 0:
-                try:
-                    status = self.check_accounting(job_id)
-                except NotImplementedError:
-                    pass
-            
-            if status == 0:
+                job_id = self.find_in_job_db(job_idx, os.path.realpath(dirname), plist)
+            except KeyError:
                 try:
-                    status = self.check_outfile(job_id)
-                except NotImplementedError:
-                    pass
+                    job_id = self.find_in_dir(plist, job_idx)
+                except MissingDirectoryError:
+                    job_id = -1
+                    status = JobStatusMessage(JobStatusMessage.dir_not_found)
+                    skip = True
+                except MissingOutfileError:
+                    job_id = -1
+                    status = JobStatusMessage(JobStatusMessage.outfile_not_found)
+
+        # jobs that have set a final status marker need no SLURM query
+        if status is None:
+            status = self.check_marker(dirname, job_id)
 
-        sep = " "*4
+        # if job ID could be retrieved, finished jobs are taken from the cache
+        if status is None:
+            data = self._cache.get(job_id)
+            if data is not None:
+                status = get_accounting_status(data)
+            else:
+                status = self.check_squeue(job_id)
+
+        if self._format is not None:
+            self._rows.append([job_id, job_idx, dirname, status, plist])
+            if len(self._rows) >= statusexport.CHUNK_SIZE:
+                self.export_rows()
+            return
+
+        if self._summary is not None:
+            self.add_to_grid(job_idx, job_id, dirname, status)
+            return
+
+        # the jobs are printed once the finished jobs have been looked up in sacct
         if not skip:
-            pstr = self.get_pformat_str(plist)
-            self.log("{job_id:6d}{sep}{parameters:10}{sep}{dirname:10}{sep}{status}".format(job_id=job_id, sep=sep, parameters=pstr, dirname=dirname,status=str(status)))
+            self._rows.append([job_id, self.get_pformat_str(plist), dirname, status])
+
+    def resolve_accounting(self, rows):
+        """
+        Look up the jobs of `rows` that have left the queue in the accounting
+        data and update their status.
+        """
+        missing = [row for row in rows if is_missing_status(row[3])]
+        left_queue = list(missing)
+
+        # the jobs of the campaign have already been listed by sacct
+        if self._campaign is not None and len(missing) > 0:
+            accounting = self.get_campaign_accounting()
+            for row in missing:
+                data = accounting.get(row[0])
+                if data is not None and len(data['state']) > 0:
+                    row[3] = get_accounting_status(data)
+                    self._cache.add(row[0], data)
+            missing = [row for row in missing if is_missing_status(row[3])]
+
+        if len(missing) > 0:
+            accounting = self.check_accounting([row[0] for row in missing])
+            if accounting is not None:
+                for row in missing:
+                    data = accounting.get(row[0])
+                    if data is not None and len(data['state']) > 0:
+                        row[3] = get_accounting_status(data)
+                        self._cache.add(row[0], data)
+                missing = [row for row in missing if is_missing_status(row[3])]
+
+            # with status markers, a job that is known neither to squeue nor to sacct
+            # and has no marker and output file never started
+            if accounting is not None and self._queue_ok and self.get_marker_mode() != 'none':
+                for row in missing:
+                    if self.get_marker(row[2], row[0]) is None and str(self._outfiles.get_job_id(row[2])) != str(row[0]):
+                        row[3] = JobStatusMessage(JobStatusMessage.cancelled, "before start")
+
+        self._cache.close()
+
+        # store the states reported by sacct in the job database
+        self.update_job_states([(row[0], row[3].get_state()) for row in left_queue \
+                                if isinstance(row[3], JobStatusMessage) and len(row[3].get_data().get('state', '')) > 0])
+
+    def format_row(self, row):
+        job_id, pstr, dirname, status = row
+        sep = " "*4
+        return "{job_id:>6}{sep}{parameters:10}{sep}{dirname:10}{sep}{status}".format(job_id=str(job_id), sep=sep, parameters=pstr, dirname=dirname, status=str(status))
+
+    def print_rows(self):
+        """
+        Print the status of all jobs.
+        """
+        self.resolve_accounting(self._rows)
+
+        for row in self._rows:
+            if isinstance(row[3], JobStatusMessage):
+                self._status_values.append(row[3].get_value())
+            self.log(self.format_row(row))
+
+        self._rows = []
+
+    def watch(self):
+        """
+        Print the status of all jobs, then refresh the jobs that have not finished
+        every `_watch` seconds and print only the rows that changed and a summary.
+        Runs until all jobs have finished or it is interrupted.
+        """
+        rows = self._rows
+        self.print_rows()
+        self.log(get_status_summary(rows))
+        self._logger.flush()
+
+        try:
+            while True:
+                active = [row for row in rows if row[0] != -1 and not is_final_status(row[3])]
+                if len(active) == 0:
+                    self.log("All jobs finished.")
+                    break
+
+                time.sleep(self._watch)
+
+                # take new snapshots of the queue and of the accounting data
+                self.refresh()
+                old = [str(row[3]) for row in active]
+                for row in active:
+                    row[3] = self.check_squeue(row[0])
+                self.resolve_accounting(active)
+
+                for row, old_status in zip(active, old):
+                    if str(row[3]) != old_status:
+                        self.log(self.format_row(row))
+                self.log(get_status_summary(rows))
+                self._logger.flush()
+        except KeyboardInterrupt:
+            pass
+
+        self._status_values = [row[3].get_value() for row in rows if isinstance(row[3], JobStatusMessage)]
+
+    def get_grid(self):
+        if self._grid is None:
+            self._grid = statusgrid.StatusGrid(self._params.get_names(),
+                                               [self._params.get_values_ax(name) for name in self._params.get_names()],
+                                               JobStatusMessage.str_list)
+        return self._grid
+
+    def get_grid_value(self, status):
+        if isinstance(status, JobStatusMessage):
+            return status.get_value()
+        return self.get_grid().other
+
+    def add_to_grid(self, job_idx, job_id, dirname, status):
+        """
+        Store the status of a job in the status grid. Jobs that have left the
+        queue are kept as rows, with the linear index in place of the parameter
+        string, until they have been looked up in sacct.
+        """
+        if isinstance(status, JobStatusMessage) and status.get_value() == JobStatusMessage.not_found_in_queue:
+            self._grid_rows.append([job_id, job_idx, dirname, status])
+        else:
+            self.get_grid().set(job_idx, self.get_grid_value(status))
+
+    def print_summary(self):
+        """
+        Print the number of jobs per status, as a function of the parameters
+        given with `--summary`.
+        """
+        grid = self.get_grid()
+        self.resolve_accounting(self._grid_rows)
+        for row in self._grid_rows:
+            grid.set(row[1], self.get_grid_value(row[3]))
+        self._grid_rows = []
+
+        states = grid.states[grid.states != statusgrid.UNCHECKED]
+        self._status_values = states[states != grid.other]
+
+        self.log("{} jobs | {}".format(len(states), grid.format_counts()))
+        names = self._summary
+        if len(names) == 0:
+            # all parameters with more than one value
+            names = [name for name in self._params.get_names() if len(self._params.get_values_ax(name)) > 1]
+
+        if len(self._summary) == 2:
+            self.log("")
+            self.log(grid.format_fraction(JobStatusMessage.completed, names[0], names[1]))
+            if np.any(states == JobStatusMessage.failed):
+                self.log("")
+                self.log(grid.format_fraction(JobStatusMessage.failed, names[0], names[1]))
+        else:
+            for name in names:
+                self.log("")
+                self.log(grid.format_histogram(name))
+
+    def export_rows(self):
+        """
+        Write the records of the collected jobs in the machine-readable format
+        and forget them. Rows hold the linear index in place of the parameter
+        string and the parameter values as fifth entry.
+        """
+        if self._writer is None:
+            self._writer = statusexport.StatusWriter(self._format, self._params.get_names())
+
+        self.resolve_accounting(self._rows)
+
+        values = []
+        for job_id, job_idx, dirname, status, plist in self._rows:
+            if isinstance(status, JobStatusMessage):
+                values.append(status.get_value())
+                state = status.get_state()
+                data = status.get_data()
+            else:
+                state = str(status)
+                data = dict()
+            self._writer.write(job_idx, self._params.get_inds_per_ax(job_idx), plist, dirname,
+                               None if job_id == -1 else job_id, state,
+                               data.get('exitcode'), data.get('elapsed'))
+
+        self._writer.flush()
+        self._job_count.add(values)
+        self._rows = []
+
+    def finalize(self):
+        if self._format is not None:
+            self.export_rows()
+        elif self._summary is not None:
+            self.print_summary()
+        else:
+            self.print_rows()
+        self._job_count.add(self._status_values)
+        self._cache.close()
+        self.close_job_db()
+        self._logger.close()
 
     def log(self, logstring):
+        if self._format is not None:
+            # keep stdout machine-readable
+            print(logstring, file=sys.stderr)
+            return
 
-        sys.stdout.write(logstring + "\n")
+        self._logger.write(logstring)
 
 
 class JobStatusMessage(object):
@@ -1244,6 +2199,7 @@ class JobStatusMessage(object):
     pending = 5
     cancelled = 6
     failed = 7
+    completed = 8
 
     str_list = ["ID not found in queue",
                 "ID not found",
@@ -1253,15 +2209,43 @@ class JobStatusMessage(object):
                 "pending",
                 "cancelled",
                 "failed",
+                "completed",
     ]
 
-    def __init__(self, value):
-        if value < 8:
+    # names of the values in machine-readable output
+    state_list = ["NOT_IN_QUEUE",
+                  "NOT_FOUND",
+                  "NO_DIRECTORY",
+                  "NO_OUTFILE",
+                  "RUNNING",
+                  "PENDING",
+                  "CANCELLED",
+                  "FAILED",
+                  "COMPLETED",
+    ]
+
+    def __init__(self, value, details='', data=None):
+        if value < len(JobStatusMessage.str_list):
             self._value = value
         else:
             raise ValueError("Invalid status")
+        self._details = details
+        self._data = dict() if data is None else data
     
+    def get_value(self):
+        return self._value
+
+    def get_data(self):
+        """Return the accounting data of the job, as far as known (see `get_accounting_status`)."""
+        return self._data
+
+    def get_state(self):
+        """Return the SLURM state from the accounting data, or the name of the value."""
+        return self._data.get('state') or JobStatusMessage.state_list[self._value]
+
     def __str__(self):
+        if self._details:
+            return JobStatusMessage.str_list[self._value] + " (" + self._details + ")"
         return JobStatusMessage.str_list[self._value]
 
 class DataProcessor(ParameterIterator):
@@ -1337,6 +2321,58 @@ def get_wildcard_list(params):
 
     return wildcard_list
 
+def is_final_status(status):
+    """
+    Check if a job with `status` has finished, i.e. its status does not change any more.
+    """
+    return isinstance(status, JobStatusMessage) and \
+        status.get_value() in [JobStatusMessage.completed, JobStatusMessage.failed, JobStatusMessage.cancelled]
+
+def get_status_summary(rows):
+    """
+    Return a line with the time and the number of jobs per status.
+    """
+    values = [row[3].get_value() for row in rows if isinstance(row[3], JobStatusMessage)]
+    counts = np.bincount(np.asarray(values, dtype=int), minlength=len(JobStatusMessage.str_list))
+    summary = ", ".join(["{}: {}".format(JobStatusMessage.str_list[i], c) for i, c in enumerate(counts) if c > 0])
+    return "[{}] {} jobs | {}".format(time.strftime("%H:%M:%S"), len(rows), summary)
+
+def get_runs(indices):
+    """Split `indices` into runs of consecutive indices, returns a sorted list of (first, last)."""
+    runs = []
+    for i in sorted(indices):
+        if len(runs) > 0 and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return [tuple(r) for r in runs]
+
+def is_missing_status(status):
+    """Check if `status` is that of a job which has left the queue and has not been looked up yet."""
+    return isinstance(status, JobStatusMessage) and status.get_value() == JobStatusMessage.not_found_in_queue
+
+def get_accounting_status(data):
+    """
+    Return the JobStatusMessage of a job from its accounting data (see `slurm_interface.api.SacctResult.get`).
+    States without a JobStatusMessage are returned as string.
+    """
+    state = data['state']
+    details = "exit {}, elapsed {}".format(data['exitcode'], data['elapsed'])
+    if data['maxrss'] > 0:
+        details += ", MaxRSS {:.1f}M".format(data['maxrss'] / 1024.**2)
+
+    if state == 'COMPLETED':
+        return JobStatusMessage(JobStatusMessage.completed, details, data)
+    elif state == 'CANCELLED':
+        return JobStatusMessage(JobStatusMessage.cancelled, details, data)
+    elif state in ['FAILED', 'TIMEOUT', 'NODE_FAIL', 'OUT_OF_MEMORY', 'BOOT_FAIL', 'DEADLINE', 'PREEMPTED']:
+        return JobStatusMessage(JobStatusMessage.failed, state.lower() + ", " + details, data)
+    elif state == 'RUNNING':
+        return JobStatusMessage(JobStatusMessage.running, data=data)
+    elif state == 'PENDING':
+        return JobStatusMessage(JobStatusMessage.pending, data=data)
+    return state
+
 def get_version():
     return VERSION
 
@@ -0,0 +1,74 @@
+"""Progress of `ssubmit --follow`.
+
+In follow mode ssubmit keeps up to K jobs of the campaign pending or running.
+Once per poll interval it takes one snapshot of the user's queue and submits
+the next jobs of the range until K jobs are in the queue again.
+
+The progress is stored in the file `ssubmit.follow` in the campaign directory:
+
+    {"next": 17, "last": 100, "active": ["123456", "123457"], "retry": [12]}
+
+`next` is the next job to submit (starting at 1), `last` the last job of the
+range, `active` the IDs of the submitted jobs that were still in the queue and
+`retry` the jobs whose submission failed. Failed jobs are submitted again with
+the next poll, before any new job of the range.
+The file is replaced atomically, so a restarted `ssubmit --follow K` continues
+exactly where the previous one stopped.
+"""
+import json
+import os
+
+STATE_NAME = "ssubmit.follow"
+
+
+class FollowState(object):
+    """
+    Next job, last job and active job IDs of a followed submission.
+    """
+    def __init__(self, first, last, active=(), retry=()):
+        self.next = first
+        self.last = last
+        self.active = [str(j) for j in active]
+        self.retry = [int(j) for j in retry]
+
+    def is_done(self):
+        """Check if all jobs have been submitted and have left the queue."""
+        return self.next > self.last and len(self.active) == 0 and len(self.retry) == 0
+
+    def update_active(self, queued_ids):
+        """Keep only the active jobs that are still in the queue."""
+        queued_ids = set([str(j) for j in queued_ids])
+        self.active = [j for j in self.active if j in queued_ids]
+
+    def get_free(self, max_active):
+        """Return the number of jobs that can be submitted now."""
+        return max(0, min(max_active - len(self.active), len(self.retry) + self.last - self.next + 1))
+
+    def take(self, num):
+        """
+        Return the jobs to submit next, at most `num`: first the jobs to retry,
+        then the next jobs of the range.
+        """
+        jobs, self.retry = self.retry[:num], self.retry[num:]
+        num_new = min(num - len(jobs), self.last - self.next + 1)
+        jobs += list(range(self.next, self.next + num_new))
+        self.next += num_new
+        return jobs
+
+    def save(self, path=STATE_NAME):
+        """Write the state atomically."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as outfile:
+            json.dump({'next': self.next, 'last': self.last, 'active': self.active, 'retry': self.retry}, outfile)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=STATE_NAME):
+        """Read the state, returns None if there is no state file."""
+        if not os.access(path, os.F_OK):
+            return None
+        with open(path, 'r') as infile:
+            data = json.load(infile)
+        return FollowState(data['next'], data['last'], data['active'], data.get('retry', []))
@@ -0,0 +1,438 @@
+"""Job database of the user.
+
+Jobs submitted by ssubmit are recorded per campaign, in a SQLite shard
+`~/.ssubmit/jobs/<hash>.sqlite` where the hash is taken from the real path of
+the config file of the campaign. Each shard has the tables
+
+    campaigns (id, path, created)
+    jobs      (id, campaign, idx, dirname, job_id, parameters, state, submit_time)
+
+where `path` is the real path of the campaign directory, `idx` the linear
+index of the parameter point and `parameters` the parameter values as JSON.
+The jobs are indexed by campaign and linear index, by job ID and by state.
+A command only opens the shard of the campaign it operates on.
+
+The index file `~/.ssubmit/jobs/index.json` maps the shards to the config
+file and directory of their campaign, for maintenance with `sconfig db`:
+
+    compact                 remove superseded jobs of all campaigns
+    prune --older-than N    remove superseded jobs submitted more than N days
+                            ago
+
+A job is superseded when a later job with the same linear index was
+submitted, e.g. after a resubmission.
+
+Several ssubmit processes may write to the same shard at once, also from
+different login nodes sharing the home directory. Each write transaction
+holds an exclusive `fcntl` lock on `<shard>.lock` (POSIX locks also work on
+NFS) and starts with `BEGIN IMMEDIATE`, readers wait up to `BUSY_TIMEOUT`
+seconds for a writer. The index is updated under a lock on `index.json.lock`
+and merged with the entries on disk, so no campaign is lost.
+
+New jobs are collected in memory and written in one transaction per
+`BATCH_SIZE` jobs and when the database is closed.
+
+sstatus reads the jobs of its campaign with one query into a `JobLookup`,
+which finds the most recent job by linear index or by parameter values in
+constant time.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no POSIX locks, rely on the locking of SQLite
+    fcntl = None
+
+SHARD_DIR = "jobs"
+SHARD_SUFFIX = ".sqlite"
+INDEX_NAME = "index.json"
+
+BATCH_SIZE = 256    # number of jobs written per transaction
+
+BUSY_TIMEOUT = 60.  # seconds to wait for the lock of another process
+
+PARAM_DECIMALS = 9  # parameter values that agree to this many decimals are equal
+
+SUBMITTED = 'submitted'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    campaign INTEGER NOT NULL REFERENCES campaigns(id),
+    idx INTEGER NOT NULL,
+    dirname TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    parameters TEXT,
+    state TEXT NOT NULL,
+    submit_time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_campaign_idx ON jobs (campaign, idx);
+CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs (job_id);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+class FileLock(object):
+    """
+    Exclusive lock on the file `path`, held within a `with` block. The lock
+    waits for other processes and is reentrant within one process.
+    """
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0 and fcntl is not None:
+            self._file = open(self._path, 'a')
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *args):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def to_json(plist):
+    """Return the parameter values as JSON list, numpy types are converted."""
+    values = []
+    for v in plist:
+        values.append(v.tolist() if hasattr(v, 'tolist') else v)
+    return json.dumps(values)
+
+
+def canonical_parameters(plist, decimals=PARAM_DECIMALS):
+    """
+    Return the parameter values as hashable tuple, numbers are rounded to
+    `decimals` such that values which differ by rounding errors are equal.
+    """
+    key = []
+    for v in plist:
+        v = v.tolist() if hasattr(v, 'tolist') else v
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            v = round(float(v), decimals) + 0.  # + 0. turns -0.0 into 0.0
+        key.append(v if isinstance(v, (float, str)) else str(v))
+    return tuple(key)
+
+
+class JobLookup(object):
+    """
+    The most recent job per linear index and per parameter values of one
+    campaign, from the rows (index, directory, job ID, parameters as JSON)
+    in the order of submission.
+    """
+    def __init__(self, rows):
+        self._by_index = dict()     # index -> (directory, job ID)
+        self._by_params = dict()    # canonical parameters -> job ID
+        for index, dirname, job_id, parameters in rows:
+            self._by_index[index] = (dirname, job_id)
+            if parameters is not None:
+                self._by_params[canonical_parameters(json.loads(parameters))] = job_id
+
+    def get(self, index, dirname=None, plist=None):
+        """
+        Return the ID of the most recent job with linear index `index` (and
+        directory `dirname`), or with the parameter values `plist` if the
+        index does not match, e.g. after the parameters have been changed.
+        Returns None if there is no such job.
+        """
+        entry = self._by_index.get(int(index))
+        if entry is not None and (dirname is None or entry[0] == dirname):
+            return entry[1]
+        if plist is not None:
+            return self._by_params.get(canonical_parameters(plist))
+        return None
+
+    def lookup_many(self, indices):
+        """Return a dict linear index -> ID of the most recent job, for the indices that have a job."""
+        result = dict()
+        for index in indices:
+            entry = self._by_index.get(int(index))
+            if entry is not None:
+                result[index] = entry[1]
+        return result
+
+    def __len__(self):
+        return len(self._by_index)
+
+
+class JobDatabase(object):
+    """
+    Connection to the job database at `path`, opened on first use.
+    """
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self._path = path
+        self._batch_size = batch_size
+        self._conn = None
+        self._lock = FileLock(path + ".lock")
+        self._campaigns = dict()    # path -> campaign row ID
+        self._pending = []          # jobs not yet written
+
+    def connect(self):
+        if self._conn is None:
+            # transactions are started explicitly in `write`
+            self._conn = sqlite3.connect(self._path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            with self._lock:
+                self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def write(self, query, rows, many=False):
+        """
+        Run the write `query` with `rows` (a list of rows with `many`) in one
+        transaction under the lock of the shard. Returns the cursor.
+        """
+        conn = self.connect()
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.executemany(query, rows) if many else conn.execute(query, rows)
+            except:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return cursor
+
+    def get_campaign(self, path, create=True):
+        """Return the row ID of the campaign in the directory `path`, None if it is unknown and not created."""
+        path = os.path.realpath(path)
+        if path not in self._campaigns:
+            conn = self.connect()
+            row = conn.execute("SELECT id FROM campaigns WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                # another process may have added the campaign in the meantime
+                self.write("INSERT OR IGNORE INTO campaigns (path, created) VALUES (?, ?)", (path, time.time()))
+                row = conn.execute("SELECT id FROM campaigns WHERE path = ?", (path,)).fetchone()
+            self._campaigns[path] = row[0]
+        return self._campaigns[path]
+
+    def add_job(self, campaign_path, index, dirname, job_id, plist=None, state=SUBMITTED, submit_time=None):
+        """Record a submitted job. The job is written with the next batch."""
+        self._pending.append((self.get_campaign(campaign_path), int(index), dirname, str(job_id),
+                              None if plist is None else to_json(plist), state,
+                              time.time() if submit_time is None else submit_time))
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all collected jobs in one transaction."""
+        if len(self._pending) == 0:
+            return
+        self.write("INSERT INTO jobs (campaign, idx, dirname, job_id, parameters, state, submit_time) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending, many=True)
+        self._pending = []
+
+    def find_job(self, campaign_path, index, dirname=None):
+        """
+        Return the most recent job of the campaign with linear index `index`
+        as dict, None if there is none. With `dirname`, jobs of a different
+        directory (e.g. after the parameters have been changed) are ignored.
+        """
+        self.flush()
+        campaign = self.get_campaign(campaign_path, create=False)
+        if campaign is None:
+            return None
+
+        query = "SELECT job_id, dirname, parameters, state, submit_time FROM jobs WHERE campaign = ? AND idx = ?"
+        args = [campaign, int(index)]
+        if dirname is not None:
+            query += " AND dirname = ?"
+            args.append(dirname)
+        row = self.connect().execute(query + " ORDER BY id DESC LIMIT 1", args).fetchone()
+        if row is None:
+            return None
+        return {'job_id': row[0], 'dirname': row[1], 'parameters': row[2], 'state': row[3], 'submit_time': row[4]}
+
+    def load_campaign(self, campaign_path):
+        """Return a JobLookup of all jobs of the campaign, read with one query."""
+        self.flush()
+        campaign = self.get_campaign(campaign_path, create=False)
+        if campaign is None:
+            return JobLookup([])
+        return JobLookup(self.connect().execute("SELECT idx, dirname, job_id, parameters FROM jobs "
+                                                "WHERE campaign = ? ORDER BY id", (campaign,)))
+
+    def find_job_id(self, job_id):
+        """Return campaign path, linear index and directory of the job `job_id`, None if it is unknown."""
+        self.flush()
+        row = self.connect().execute("SELECT campaigns.path, jobs.idx, jobs.dirname FROM jobs "
+                                     "JOIN campaigns ON campaigns.id = jobs.campaign "
+                                     "WHERE jobs.job_id = ? ORDER BY jobs.id DESC LIMIT 1", (str(job_id),)).fetchone()
+        return row
+
+    def set_states(self, states):
+        """Set the state of many jobs in one transaction, `states` is a list of (job ID, state)."""
+        if len(states) == 0:
+            return
+        self.flush()
+        self.write("UPDATE jobs SET state = ? WHERE job_id = ?", [(s, str(j)) for j, s in states], many=True)
+
+    def count_jobs(self, campaign_path=None, state=None):
+        """Return the number of jobs, of one campaign and/or in one state."""
+        self.flush()
+        query = "SELECT COUNT(*) FROM jobs"
+        conditions, args = [], []
+        if campaign_path is not None:
+            campaign = self.get_campaign(campaign_path, create=False)
+            if campaign is None:
+                return 0
+            conditions.append("campaign = ?")
+            args.append(campaign)
+        if state is not None:
+            conditions.append("state = ?")
+            args.append(state)
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+        return self.connect().execute(query, args).fetchone()[0]
+
+    def drop_superseded(self, before=None):
+        """
+        Remove the jobs that have been superseded by a later job with the same
+        linear index, only those submitted before `before` if given. Returns
+        the number of removed jobs.
+        """
+        self.flush()
+        query = "DELETE FROM jobs WHERE id NOT IN (SELECT MAX(id) FROM jobs GROUP BY campaign, idx)"
+        args = []
+        if before is not None:
+            query += " AND submit_time < ?"
+            args.append(before)
+        return self.write(query, args).rowcount
+
+    def vacuum(self):
+        self.flush()
+        conn = self.connect()
+        with self._lock:
+            conn.execute("VACUUM")
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def get_shard_name(config_path):
+    """Return the file name of the shard of the campaign with the config file `config_path`."""
+    key = os.path.realpath(config_path).encode('utf-8')
+    return hashlib.sha1(key).hexdigest()[:16] + SHARD_SUFFIX
+
+
+class ShardIndex(object):
+    """
+    Index of the shards in the directory `root`, maps the shard names to the
+    config file and directory of the campaign.
+    """
+    def __init__(self, root):
+        self._root = root
+        self._path = os.path.join(root, INDEX_NAME)
+        self._lock = FileLock(self._path + ".lock")
+        self._entries = None
+
+    def load(self):
+        if self._entries is None:
+            try:
+                with open(self._path, 'r') as infile:
+                    self._entries = json.load(infile)
+            except (IOError, OSError, ValueError):
+                self._entries = dict()
+        return self._entries
+
+    def save(self):
+        """Write the index, replacing the file at once."""
+        tmp_path = "{}.{}.tmp".format(self._path, os.getpid())
+        with open(tmp_path, 'w') as outfile:
+            json.dump(self.load(), outfile, indent=1, sort_keys=True)
+            outfile.write("\n")
+        os.replace(tmp_path, self._path)
+
+    def update(self, name, entry):
+        """
+        Set the entry of the shard `name`. The index is read again under the
+        lock, changes of other processes are kept.
+        """
+        with self._lock:
+            self._entries = None
+            self.load()[name] = entry
+            self.save()
+
+    def register(self, config_path, campaign_path):
+        """Add the campaign to the index if it is new and return the path of its shard."""
+        name = get_shard_name(config_path)
+        entry = {'config': os.path.realpath(config_path), 'campaign': os.path.realpath(campaign_path)}
+        old = self.load().get(name)
+        if old is None or old.get('config') != entry['config'] or old.get('campaign') != entry['campaign']:
+            entry['created'] = time.time() if old is None else old.get('created', time.time())
+            self.update(name, entry)
+        return os.path.join(self._root, name)
+
+    def items(self):
+        """Return the shard names and entries, sorted by name."""
+        return sorted(self.load().items())
+
+    def get_path(self, name):
+        return os.path.join(self._root, name)
+
+
+def open_shard(db_dir, config_path, campaign_path):
+    """Return the JobDatabase of the campaign with the config file `config_path`."""
+    root = os.path.join(db_dir, SHARD_DIR)
+    if not os.path.isdir(root):
+        os.makedirs(root)
+    return JobDatabase(ShardIndex(root).register(config_path, campaign_path))
+
+
+def compact(db_dir):
+    """
+    Remove the superseded jobs from all shards and reclaim the space.
+    Returns a list of (campaign directory, number of removed jobs).
+    """
+    index = ShardIndex(os.path.join(db_dir, SHARD_DIR))
+    result = []
+    for name, entry in index.items():
+        if not os.path.exists(index.get_path(name)):
+            continue
+        db = JobDatabase(index.get_path(name))
+        try:
+            removed = db.drop_superseded()
+            db.vacuum()
+        finally:
+            db.close()
+        result.append((entry['campaign'], removed))
+    return result
+
+
+def prune(db_dir, older_than):
+    """
+    Remove the superseded jobs submitted more than `older_than` days ago. The
+    most recent job of every parameter point is always kept. Returns a list of
+    (campaign directory, number of removed jobs).
+    """
+    index = ShardIndex(os.path.join(db_dir, SHARD_DIR))
+    before = time.time() - 86400.*older_than
+    result = []
+    for name, entry in index.items():
+        path = index.get_path(name)
+        if not os.path.exists(path):
+            continue
+        db = JobDatabase(path)
+        try:
+            result.append((entry['campaign'], db.drop_superseded(before)))
+        finally:
+            db.close()
+    return result
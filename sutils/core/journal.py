@@ -0,0 +1,125 @@
+"""Submission journal of a campaign.
+
+Every state transition of a job is appended to the journal file
+`ssubmit.journal` in the campaign directory, one JSON record per line:
+
+    {"index": 3, "dirname": "U1_L2", "state": "rendered"}
+    {"index": 3, "dirname": "U1_L2", "state": "submitted", "job_id": "123456"}
+    {"index": 4, "dirname": "U1_L3", "state": "failed", "message": "..."}
+
+The index is the linear index of the parameter point, the last record of an
+index determines its state. When ssubmit is restarted after a crash, the journal
+is replayed once and jobs that already have a job ID are skipped without looking
+at their directories, while rendered or failed jobs are submitted again.
+
+Records are written to the operating system immediately after a submission, so
+they survive a crash of ssubmit. They are synced to disk in batches of
+`SYNC_EVERY` records and when the journal is closed.
+"""
+import json
+import os
+from collections import OrderedDict
+
+JOURNAL_NAME = "ssubmit.journal"
+
+SYNC_EVERY = 64     # number of records between two calls to fsync
+
+RENDERED = 'rendered'
+SUBMITTED = 'submitted'
+FAILED = 'failed'
+
+
+class Journal(object):
+    """
+    Reads and appends to the journal file.
+    """
+    def __init__(self, path=JOURNAL_NAME, sync_every=SYNC_EVERY):
+        self._path = path
+        self._sync_every = sync_every
+        self._entries = dict()      # index -> last record
+        self._file = None
+        self._unsynced = 0
+
+        if os.access(self._path, os.F_OK):
+            self.load()
+
+    def load(self):
+        """Replay the journal file."""
+        with open(self._path, 'r') as infile:
+            for line in infile:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # incomplete last line after a crash
+                    continue
+                self._entries[record['index']] = record
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self._path, 'a')
+        self._file.write(json.dumps(record) + "\n")
+        self._entries[record['index']] = record
+
+        self._unsynced += 1
+        if self._unsynced >= self._sync_every:
+            self.sync()
+
+    def add_rendered(self, index, dirname):
+        """Record a job whose files have been written."""
+        self._append(OrderedDict([
+            ('index', int(index)),
+            ('dirname', dirname),
+            ('state', RENDERED),
+        ]))
+
+    def add_submitted(self, index, dirname, job_id):
+        """Record a submitted job. The record is handed to the OS immediately."""
+        self._append(OrderedDict([
+            ('index', int(index)),
+            ('dirname', dirname),
+            ('state', SUBMITTED),
+            ('job_id', str(job_id)),
+        ]))
+        self._file.flush()
+
+    def add_failed(self, index, dirname, message):
+        """Record a job whose submission failed."""
+        self._append(OrderedDict([
+            ('index', int(index)),
+            ('dirname', dirname),
+            ('state', FAILED),
+            ('message', message),
+        ]))
+
+    def get_state(self, index, dirname):
+        """Return the state of a job, None if the job is not in the journal.
+
+        Records of a different directory (e.g. after the parameters have been
+        changed) are ignored.
+        """
+        record = self._entries.get(index)
+        if record is None or record['dirname'] != dirname:
+            return None
+        return record['state']
+
+    def get_job_id(self, index):
+        record = self._entries.get(index)
+        if record is None:
+            return None
+        return record.get('job_id')
+
+    def sync(self):
+        """Write all records to disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,107 @@
+"""Manifest of staged jobs.
+
+`ssubmit stage` creates the job directories and renders the files of all jobs
+of a range, and records each job in the manifest. `ssubmit launch` reads the
+manifest and only submits, without touching the job directories.
+
+The manifest is an append-only file with one JSON record per line:
+
+    {"staged": 3, "dirname": "U1_L2", "params": [1.0, 2.0], "hash": "..."}
+    {"launched": 3, "job_id": "123456"}
+
+The index is the linear index of the parameter point. A launch record marks the
+job as submitted, a later stage record for the same index (e.g. with
+`overwrite_dir = True`) makes it pending again. Since every launch is recorded
+immediately, `ssubmit launch` can be re-run after a crash and continues with
+the jobs that have not been submitted yet.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+MANIFEST_NAME = "ssubmit.manifest"
+
+
+def to_builtin(plist):
+    """Convert numpy scalars in the parameter list to builtin types."""
+    return [p.item() if hasattr(p, 'item') else p for p in plist]
+
+def new_hash():
+    """Return the hash object used for the content of the rendered files."""
+    return hashlib.sha1()
+
+
+class Manifest(object):
+    """
+    Reads and appends to the manifest file.
+    """
+    def __init__(self, path=MANIFEST_NAME):
+        self._path = path
+        self._staged = OrderedDict()    # index -> stage record
+        self._launched = dict()         # index -> job ID
+        self._file = None
+
+        if os.access(self._path, os.F_OK):
+            self.load()
+
+    def load(self):
+        """Replay the manifest file."""
+        with open(self._path, 'r') as infile:
+            for line in infile:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # incomplete last line after a crash
+                    continue
+                self._apply(record)
+
+    def _apply(self, record):
+        if 'staged' in record:
+            index = record['staged']
+            self._staged[index] = record
+            self._launched.pop(index, None)
+        elif 'launched' in record:
+            self._launched[record['launched']] = record['job_id']
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self._path, 'a')
+        self._file.write(json.dumps(record) + "\n")
+        self._apply(record)
+
+    def add_staged(self, index, dirname, plist, digest):
+        """Record a staged job."""
+        self._append(OrderedDict([
+            ('staged', int(index)),
+            ('dirname', dirname),
+            ('params', to_builtin(plist)),
+            ('hash', digest),
+        ]))
+
+    def add_launched(self, index, job_id):
+        """Record a submitted job. The record is written to disk immediately."""
+        self._append(OrderedDict([
+            ('launched', int(index)),
+            ('job_id', str(job_id)),
+        ]))
+        self.flush()
+
+    def get_pending(self):
+        """Return the stage records of jobs that have not been launched, sorted by index."""
+        return [self._staged[i] for i in sorted(self._staged) if i not in self._launched]
+
+    def get_job_id(self, index):
+        return self._launched.get(index)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
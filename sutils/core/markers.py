@@ -1,80 +1,58 @@
 """Markers set by jobs to communicate status of execution.
 
-Tracking the status of a job without communicating with the job directly is done as follows:
-
-* Before submitting, a line is added to the beginning of the bash script, which prints status "running"
-* Another line is added at the end, which prints "completed"
+Tracking the status of a job without communicating with SLURM is done as follows:
+
+* Before submitting, a block is added to the bash script after the `#SBATCH`
+  header, which records the status "running" when the job starts
+* A trap on EXIT records "completed" if the script exits with status 0 and
+  "failed" with the exit status otherwise
+* A trap on TERM (scancel, time limit) records "terminated"
+
+Each record holds the job ID, the ID `<array job ID>_<task ID>` of array
+tasks, the status and the exit status, separated by tabs. With a FileMarker
+the records are appended to `ssubmit.marker` in the job directory, with a
+DatabaseMarker to `ssubmit.markers` in the campaign directory, prefixed by
+the directory of the job. The last record of a job is its current status.
+With `render_mode = env` all jobs share one copy of the script file with the
+markers, `ssubmit_marked_<script name>`.
 
 The current status can be deduced as follows:
-* Check squeue. If job is found, use that status.
+* If the marker is "completed" or "failed", use that status.
+* Else check squeue. If job is found, use that status.
 * If job is not found:
-    * If status in file is "running", set status to "failed"
-    * If status in file is "completed", set status to "completed"
-    * If status in file is "", set status to "cancelled"
-
-In total there are five possible values for the status:
-* queued
-* running
-* completed
-* cancelled
-* failed
+    * If there is neither a marker nor an output file of the job, it was
+      cancelled before it started
+    * Otherwise ("running", "terminated" or no marker) ask sacct
 """
-import sutils.utils.util as util
-import hashlib
+import os
+from concurrent import futures
+
+MARKER_NAME = "ssubmit.marker"
+DATABASE_NAME = "ssubmit.markers"
+MARKED_SCRIPT_PREFIX = "ssubmit_marked_"   # copy of the shared script file with `render_mode = env`
 
-if util.is_python3():
-    import enum
+READ_WORKERS = 16   # number of threads reading marker files
 
 
 # Status classes
 ################################################################################################################
 
-if util.is_python3():
-    class Status(enum.Enum):
-        queued      = 0
-        running     = 1
-        completed   = 2
-        cancelled   = 3
-        failed      = 4
-else:
-    class Status(object):
-        queued      = 0
-        running     = 1
-        completed   = 2
-        cancelled   = 3
-        failed      = 4
-
-        _strings = ['queued', 'running', 'completed', 'cancelled', 'failed']
-        _hashkeys = []
-        for s in _strings:
-            m = hashlib.md5()
-            m.update(s)
-            _hashkeys.append(m.hexdigest)
-
-        @staticmethod
-        def to_str(status):
-            if status < 5:
-                return Status._strings[status]
-            else:
-                raise ValueError("Invalid input.")
-
-        @staticmethod
-        def to_crypt(status):
-            m = hashlib.md5()
-            m.update(status)
-            return m.hexdigest()
-        
-        @staticmethod
-        def decrypt(status):
-            try:
-                ind = Status._hashkeys.index(status)
-            except ValueError:
-                raise ValueError("Invalid status")
-            return ind
-
+class Status(object):
+    running     = 'running'
+    completed   = 'completed'
+    failed      = 'failed'
+    terminated  = 'terminated'
 
+    _strings = [running, completed, failed, terminated]
 
+    @staticmethod
+    def is_valid(status):
+        return status in Status._strings
 
+    @staticmethod
+    def is_final(status):
+        """Check if the status of a job is known without asking SLURM."""
+        return status in [Status.completed, Status.failed]
 
 
 # Marker classes
@@ -88,31 +66,182 @@ class AbstractMarker(object):
 
     def get_value(self):
         raise NotImplementedError
-    
+
     def set_value(self):
         raise NotImplementedError
 
 class Marker(AbstractMarker):
     """Base class for all markers."""
-    def __init__(self, value):
+    def __init__(self, value=None, job_id='', array_id='', exitcode=''):
         self._value = value
+        self._job_id = str(job_id)
+        self._array_id = str(array_id)
+        self._exitcode = str(exitcode)
 
     def get_value(self):
         return self._value
-    
-    def set_value(self, value):
-        # check if valid value
+
+    def set_value(self, value, job_id=None, array_id=None, exitcode=''):
+        if not Status.is_valid(value):
+            raise ValueError("Invalid status: {}".format(value))
         self._value = value
+        if job_id is not None:
+            self._job_id = str(job_id)
+        if array_id is not None:
+            self._array_id = str(array_id)
+        self._exitcode = str(exitcode)
+
+    def get_exitcode(self):
+        return self._exitcode
+
+    def matches(self, job_id):
+        """Check if the marker was set by the job `job_id` (plain or array task ID)."""
+        job_id = str(job_id)
+        return len(job_id) > 0 and job_id in [self._job_id, self._array_id]
+
+    def get_fields(self):
+        return [self._job_id, self._array_id, self._value, self._exitcode]
+
+    def parse(self, fields):
+        """Set the marker from the fields of a record, return False for invalid records."""
+        if len(fields) != 4 or not Status.is_valid(fields[2]):
+            return False
+        self._job_id, self._array_id, self._value, self._exitcode = fields
+        return True
 
 class FileMarker(Marker):
-    """Marker that writes and gets its value to and from a local file.
+    """Marker that writes and gets its value to and from a file in the job directory."""
+    def __init__(self, dirname, *args, **kwargs):
+        Marker.__init__(self, *args, **kwargs)
+        self._path = os.path.join(dirname, MARKER_NAME)
 
-    This makes use of the hashed representation of the status message, since
-    those are unlikely to be found in output files.
-    """
     def store(self):
-        pass
+        with open(self._path, 'a') as outfile:
+            outfile.write("\t".join(self.get_fields()) + "\n")
+
+    def load(self):
+        """Read the last valid record, return False if there is none."""
+        found = False
+        try:
+            with open(self._path, 'r') as infile:
+                for line in infile:
+                    found = self.parse(line.rstrip("\n").split("\t")) or found
+        except (IOError, OSError):
+            pass
+        return found
+
+    @staticmethod
+    def get_script(root):
+        """Return the bash lines that set the marker from a job."""
+        return get_script_block('"${{ssubmit_marker_dir}}/{}"'.format(MARKER_NAME), "")
 
 class DatabaseMarker(Marker):
-    """Marker that stores and gets its value to and from a global database."""
-    pass
+    """Marker that stores and gets its value to and from a database shared by all jobs of a campaign."""
+    def __init__(self, root, dirname, *args, **kwargs):
+        Marker.__init__(self, *args, **kwargs)
+        self._path = os.path.join(root, DATABASE_NAME)
+        self._dirname = os.path.normpath(dirname)
+
+    def store(self):
+        with open(self._path, 'a') as outfile:
+            outfile.write("\t".join([self._dirname] + self.get_fields()) + "\n")
+
+    def load(self):
+        """Read the last valid record of the directory, return False if there is none."""
+        marker = load_database(os.path.dirname(self._path)).get(self._dirname)
+        if marker is None:
+            return False
+        return self.parse(marker.get_fields())
+
+    @staticmethod
+    def get_script(root):
+        """Return the bash lines that set the marker from a job."""
+        root = os.path.realpath(root)
+        return get_script_block('"{}"'.format(os.path.join(root, DATABASE_NAME)),
+                                '"${{ssubmit_marker_dir#{}/}}" '.format(root))
+
+
+# Functions
+################################################################################################################
+
+def get_script_block(path, prefix):
+    """
+    Return the bash lines that append records to `path`, each starting with
+    the fields `prefix` (a shell word followed by a space, or empty).
+    """
+    fmt = "%s\\t" * (4 if prefix else 3) + "%s\\n"
+    return "\n".join([
+        "# >>> job status markers added by ssubmit",
+        "ssubmit_marker_dir=\"$(pwd -P)\"",
+        "ssubmit_marker_path={}".format(path),
+        "ssubmit_marker() {{ printf '{fmt}' {prefix}\"${{SLURM_JOB_ID:-}}\" "
+        "\"${{SLURM_ARRAY_JOB_ID:+${{SLURM_ARRAY_JOB_ID}}_${{SLURM_ARRAY_TASK_ID}}}}\" \"$1\" \"${{2:-}}\" "
+        ">> \"$ssubmit_marker_path\"; }}".format(fmt=fmt, prefix=prefix),
+        "trap 'ssubmit_rc=$?; if [ -n \"${ssubmit_term:-}\" ]; then ssubmit_marker terminated; "
+        "elif [ $ssubmit_rc -eq 0 ]; then ssubmit_marker completed; "
+        "else ssubmit_marker failed $ssubmit_rc; fi' EXIT",
+        "trap 'ssubmit_term=1; exit 143' TERM",
+        "ssubmit_marker running",
+        "# <<< job status markers",
+        "",
+    ])
+
+def get_marker_class(mode):
+    """Return the marker class for the setting `markers`, None if markers are disabled."""
+    if mode == 'none':
+        return None
+    elif mode == 'file':
+        return FileMarker
+    elif mode == 'database':
+        return DatabaseMarker
+    raise RuntimeError("Invalid markers setting: {}".format(mode))
+
+def inject(text, block):
+    """
+    Insert `block` into the script `text` after the leading lines that are
+    empty or comments (shebang and `#SBATCH` options), since sbatch stops
+    reading options at the first command.
+    """
+    lines = text.splitlines(True)
+    i = 0
+    while i < len(lines) and (lines[i].strip() == "" or lines[i].lstrip().startswith('#')):
+        i += 1
+    head = "".join(lines[:i])
+    if len(head) > 0 and not head.endswith("\n"):
+        head += "\n"
+    return head + block + "".join(lines[i:])
+
+def load_database(root):
+    """Return a dict dirname -> Marker with the last record of each directory in the database of `root`."""
+    markers = dict()
+    try:
+        with open(os.path.join(root, DATABASE_NAME), 'r') as infile:
+            for line in infile:
+                fields = line.rstrip("\n").split("\t")
+                marker = Marker()
+                if len(fields) == 5 and marker.parse(fields[1:]):
+                    markers[os.path.normpath(fields[0])] = marker
+    except (IOError, OSError):
+        pass
+    return markers
+
+def load_files(root, dirnames, max_workers=READ_WORKERS):
+    """Read the marker files of all `dirnames` below `root` concurrently, return a dict dirname -> Marker."""
+    def load(dirname):
+        marker = FileMarker(os.path.join(root, dirname))
+        return marker if marker.load() else None
+
+    if len(dirnames) == 0:
+        return dict()
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        loaded = list(executor.map(load, dirnames))
+    return dict((os.path.normpath(d), m) for d, m in zip(dirnames, loaded) if m is not None)
+
+def load(mode, root, dirnames):
+    """Return a dict dirname -> Marker for the setting `markers`."""
+    marker_class = get_marker_class(mode)
+    if marker_class is FileMarker:
+        return load_files(root, dirnames)
+    elif marker_class is DatabaseMarker:
+        return load_database(root)
+    return dict()
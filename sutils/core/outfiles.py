@@ -0,0 +1,99 @@
+"""Index of the SLURM output files of a campaign.
+
+The job directories are scanned once (see `sutils.utils.scan`), and for every
+directory the most recent output file `slurm-<job ID>.out` is kept, together
+with its size and modification time. Job IDs are compared as numbers, such that
+`slurm-10.out` is more recent than `slurm-9.out`. Output files of array tasks
+named `slurm-<array ID>_<task ID>.out` are ordered by array and task ID.
+"""
+import os
+import re
+from collections import namedtuple
+
+from sutils.utils import scan
+
+OUTFILE_PATTERN = re.compile(r"^slurm-(\d+)(?:_(\d+))?\.out$")
+
+Outfile = namedtuple('Outfile', ['job_id', 'size', 'mtime'])
+
+
+def parse_outfile_name(name):
+    """Return the sort key and job ID of an output file, None for other files."""
+    match = OUTFILE_PATTERN.match(name)
+    if match is None:
+        return None
+    job_id, task_id = match.groups()
+    if task_id is None:
+        return (int(job_id), -1), int(job_id)
+    return (int(job_id), int(task_id)), "{}_{}".format(job_id, task_id)
+
+
+def is_outfile(name):
+    return OUTFILE_PATTERN.match(name) is not None
+
+
+def find_latest(listing):
+    """Return the most recent output file in the DirListing `listing` as an Outfile, None if there is none."""
+    latest_key = None
+    latest = None
+    for i, name in enumerate(listing.names):
+        parsed = parse_outfile_name(name)
+        if parsed is None:
+            continue
+        key, job_id = parsed
+        if latest_key is None or key > latest_key:
+            latest_key = key
+            latest = (job_id, i)
+
+    if latest is None:
+        return None
+    job_id, i = latest
+    return Outfile(job_id, int(listing.size[i]), float(listing.mtime[i]))
+
+
+class OutfileIndex(object):
+    """
+    Maps the subdirectories of `root` to their most recent output file.
+    The scan happens on first use, directories that are nested deeper than
+    one level are scanned when they are looked up.
+    """
+    def __init__(self, root='.'):
+        self._root = root
+        self._entries = None    # dirname -> Outfile or None
+
+    def scan(self):
+        dirnames = scan.scan_dir(self._root).get_dirnames()
+        paths = [os.path.join(self._root, d) for d in dirnames]
+        listings = scan.scan_many(paths, stat=is_outfile)
+        self._entries = dict((d, find_latest(listings[p])) for d, p in zip(dirnames, paths))
+
+    def _get_entries(self):
+        if self._entries is None:
+            self.scan()
+        return self._entries
+
+    def get_dirnames(self):
+        """Return the sorted names of the subdirectories."""
+        return sorted(self._get_entries().keys())
+
+    def has_dir(self, dirname):
+        dirname = os.path.normpath(dirname)
+        entries = self._get_entries()
+        if dirname not in entries and os.sep in dirname:
+            self._scan_nested(dirname)
+        return dirname in entries
+
+    def _scan_nested(self, dirname):
+        path = os.path.join(self._root, dirname)
+        if os.path.isdir(path):
+            self._entries[dirname] = find_latest(scan.scan_dir(path, stat=is_outfile))
+
+    def get(self, dirname):
+        """Return the Outfile of `dirname`, None if the directory has no output file."""
+        if not self.has_dir(dirname):
+            return None
+        return self._entries[os.path.normpath(dirname)]
+
+    def get_job_id(self, dirname):
+        outfile = self.get(dirname)
+        return outfile.job_id if outfile is not None else None
@@ -0,0 +1,74 @@
+"""Cache of jobs in a terminal state.
+
+Once a job has finished (completed, failed, cancelled, ...) its SLURM state
+does not change any more. sstatus keeps the accounting data of such jobs in
+the file `sstatus.cache` in the campaign directory, one JSON record per line:
+
+    {"job_id": "123456", "state": "COMPLETED", "exitcode": "0:0",
+     "elapsed": "00:10:00", "maxrss": 2621440.0, "end": "2024-01-01T12:10:00"}
+
+Jobs found in the cache are neither looked up in squeue nor in sacct.
+"""
+import json
+import os
+
+CACHE_NAME = "sstatus.cache"
+
+TERMINAL_STATES = ['COMPLETED', 'FAILED', 'CANCELLED', 'TIMEOUT', 'OUT_OF_MEMORY',
+                   'NODE_FAIL', 'BOOT_FAIL', 'DEADLINE']
+
+
+def is_terminal(state):
+    """Check if a job in `state` can not change its state any more."""
+    return state in TERMINAL_STATES
+
+
+class StateCache(object):
+    """
+    Reads and appends to the cache file.
+    """
+    def __init__(self, path=CACHE_NAME):
+        self._path = path
+        self._entries = dict()      # job ID -> record
+        self._new = []
+
+        if os.access(self._path, os.F_OK):
+            self.load()
+
+    def load(self):
+        with open(self._path, 'r') as infile:
+            for line in infile:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # incomplete last line
+                    continue
+                self._entries[record['job_id']] = record
+
+    def get(self, job_id):
+        """Return the accounting data of a finished job, None if it is not cached."""
+        return self._entries.get(str(job_id))
+
+    def add(self, job_id, data):
+        """Cache the accounting data of a job if it is in a terminal state."""
+        job_id = str(job_id)
+        if job_id in self._entries or not is_terminal(data['state']):
+            return
+        record = dict(data)
+        record['job_id'] = job_id
+        self._entries[job_id] = record
+        self._new.append(record)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        """Append the new records to the cache file."""
+        if len(self._new) == 0:
+            return
+        with open(self._path, 'a') as outfile:
+            outfile.write("".join([json.dumps(r) + "\n" for r in self._new]))
+        self._new = []
@@ -0,0 +1,80 @@
+"""Machine-readable output of sstatus.
+
+With `sstatus --format json|csv|tsv`, one record per job is written to stdout
+as soon as the status of the job is known, instead of the formatted table:
+
+    {"index": 3, "indices": [0, 1, 1], "parameters": {"L": 4, "U": 0.5, "x": 1.0},
+     "dirname": "L0_U1", "job_id": "123456", "state": "COMPLETED",
+     "exitcode": "0:0", "elapsed": "00:10:00"}
+
+JSON records are written one per line, such that they can be piped into `jq`.
+CSV and TSV output starts with a header line, the per-axis indices and the
+parameter values are flattened into the columns `<name>_index` and `<name>`.
+Fields that are unknown are empty (CSV, TSV) or null (JSON).
+
+Jobs are collected in chunks of `CHUNK_SIZE`, for which sacct is called once,
+so the memory used does not grow with the number of jobs.
+"""
+import csv
+import json
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+FORMATS = ['json', 'csv', 'tsv']
+
+CHUNK_SIZE = 500    # jobs that are looked up in sacct and written at once
+
+
+def to_plain(value):
+    """Convert numpy scalars and arrays to Python types for the output."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+class StatusWriter(object):
+    """
+    Writes status records of jobs in one of the `FORMATS` to `stream`.
+    `names` are the parameter names, in the order of the axes.
+    """
+    def __init__(self, fmt, names, stream=None):
+        if fmt not in FORMATS:
+            raise RuntimeError("Invalid format: {} (use one of {})".format(fmt, ", ".join(FORMATS)))
+        self._fmt = fmt
+        self._names = list(names)
+        self._stream = sys.stdout if stream is None else stream
+        self._csv = None
+
+        if fmt != 'json':
+            self._csv = csv.writer(self._stream, delimiter=',' if fmt == 'csv' else '\t', lineterminator='\n')
+            self._csv.writerow(['index'] + [name + "_index" for name in self._names] + self._names + \
+                               ['dirname', 'job_id', 'state', 'exitcode', 'elapsed'])
+
+    def write(self, index, indices, values, dirname, job_id, state, exitcode=None, elapsed=None):
+        """Write the record of a single job."""
+        indices = [int(i) for i in indices]
+        values = [to_plain(v) for v in values]
+        job_id = None if job_id is None else str(job_id)
+
+        if self._csv is None:
+            record = OrderedDict([
+                ('index', int(index)),
+                ('indices', indices),
+                ('parameters', OrderedDict(zip(self._names, values))),
+                ('dirname', dirname),
+                ('job_id', job_id),
+                ('state', state),
+                ('exitcode', exitcode),
+                ('elapsed', elapsed),
+            ])
+            self._stream.write(json.dumps(record) + "\n")
+        else:
+            fields = [int(index)] + indices + values + [dirname, job_id, state, exitcode, elapsed]
+            self._csv.writerow(["" if f is None else f for f in fields])
+
+    def flush(self):
+        self._stream.flush()
@@ -0,0 +1,117 @@
+"""Status of all jobs on the parameter grid.
+
+In summary mode, sstatus stores one int8 per parameter point in an array with
+one axis per parameter. The value of a point is the JobStatusMessage value of
+its job, `other` for SLURM states without a message (e.g. `CG`) and
+`UNCHECKED` for points that have not been checked. Counts per status, per
+value of a parameter, or per pair of values of two parameters are reductions
+over the remaining axes of this array.
+"""
+from __future__ import division
+
+import numpy as np
+
+UNCHECKED = -1
+
+
+class StatusGrid(object):
+    """
+    Holds the status of every point of a square parameter grid.
+
+    `names` and `values` are the names and values per axis, `labels` the
+    names of the status values. The value `other = len(labels)` is used for
+    SLURM states without a label.
+    """
+    def __init__(self, names, values, labels):
+        self._names = list(names)
+        self._values = [np.asarray(v) for v in values]
+        self._labels = list(labels) + ["other"]
+        self.other = len(labels)
+
+        shape = tuple(len(v) for v in self._values)
+        self.states = np.full(shape, UNCHECKED, dtype=np.int8)
+
+    def set(self, job_idx, value):
+        """Set the status of the point with linear (row-major) index `job_idx`."""
+        self.states.flat[job_idx] = value
+
+    def get_axis(self, name):
+        try:
+            return self._names.index(name)
+        except ValueError:
+            raise RuntimeError("Unknown parameter {} in status summary".format(name))
+
+    def get_labels(self):
+        return self._labels
+
+    def counts(self):
+        """Return the number of points per status value."""
+        checked = self.states[self.states != UNCHECKED]
+        return np.bincount(checked.astype(int), minlength=len(self._labels))
+
+    def histogram(self, name):
+        """
+        Return the number of points per value of parameter `name` and status,
+        as an array of shape (number of values, number of status values).
+        """
+        num_labels = len(self._labels)
+        states = np.moveaxis(self.states, self.get_axis(name), 0)
+        num_values = states.shape[0]
+        states = states.reshape(num_values, -1)
+
+        # one bincount over (value index, status) pairs
+        keys = states.astype(int) + num_labels*np.arange(num_values)[:, None]
+        keys = keys[states != UNCHECKED]
+        return np.bincount(keys, minlength=num_values*num_labels).reshape(num_values, num_labels)
+
+    def fraction(self, value, row_name, col_name):
+        """
+        Return the fraction of checked points with status `value` per pair of
+        values of `row_name` and `col_name`, NaN where no point was checked.
+        """
+        row_axis = self.get_axis(row_name)
+        col_axis = self.get_axis(col_name)
+        if row_axis == col_axis:
+            raise RuntimeError("Status summary needs two different parameters")
+
+        other_axes = tuple(i for i in range(self.states.ndim) if i not in (row_axis, col_axis))
+        hits = np.sum(self.states == value, axis=other_axes)
+        checked = np.sum(self.states != UNCHECKED, axis=other_axes)
+        if row_axis > col_axis:
+            hits, checked = hits.T, checked.T
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(checked > 0, hits / np.maximum(checked, 1), np.nan)
+
+    def format_histogram(self, name):
+        """Return a table with the counts per status for every value of `name`."""
+        hist = self.histogram(name)
+        cols = np.flatnonzero(hist.sum(axis=0) > 0)
+        values = self._values[self.get_axis(name)]
+
+        width = max([len(name)] + [len(str(v)) for v in values])
+        widths = [max(len(self._labels[c]), 5) for c in cols]
+        lines = ["{:>{w}}".format(name, w=width) + "".join("  {:>{w}}".format(self._labels[c], w=w) for c, w in zip(cols, widths))]
+        for v, counts in zip(values, hist):
+            lines.append("{:>{w}}".format(str(v), w=width) + "".join("  {:>{w}}".format(counts[c], w=w) for c, w in zip(cols, widths)))
+        return "\n".join(lines)
+
+    def format_fraction(self, value, row_name, col_name):
+        """Return a table with the fraction of points with status `value` per pair of values."""
+        frac = self.fraction(value, row_name, col_name)
+        row_values = self._values[self.get_axis(row_name)]
+        col_values = self._values[self.get_axis(col_name)]
+
+        corner = "{} \\ {}".format(row_name, col_name)
+        width = max([len(corner)] + [len(str(v)) for v in row_values])
+        widths = [max(len(str(v)), 5) for v in col_values]
+        lines = ["{} (fraction of checked jobs)".format(self._labels[value])]
+        lines.append("{:>{w}}".format(corner, w=width) + "".join("  {:>{w}}".format(str(v), w=w) for v, w in zip(col_values, widths)))
+        for v, row in zip(row_values, frac):
+            cells = ["  {:>{w}}".format("-" if np.isnan(f) else "{:.2f}".format(f), w=w) for f, w in zip(row, widths)]
+            lines.append("{:>{w}}".format(str(v), w=width) + "".join(cells))
+        return "\n".join(lines)
+
+    def format_counts(self):
+        counts = self.counts()
+        return ", ".join(["{}: {}".format(self._labels[i], c) for i, c in enumerate(counts) if c > 0])
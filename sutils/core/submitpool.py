@@ -0,0 +1,146 @@
+"""Concurrent submission of jobs.
+
+Submitting a job is dominated by the round-trip latency of `sbatch`, so several
+submissions are run at the same time by a bounded pool of worker threads.
+
+The number of concurrent calls adapts to the state of the SLURM controller
+(additive increase, multiplicative decrease): whenever sbatch fails with a
+transient error, e.g. "Socket timed out", the limit is halved and the
+submission is retried after a back-off delay. Every `limit` successful calls
+raise the limit by one, until the configured maximum is reached again.
+
+Results are handed out in the order in which the submissions were added, so
+that the caller can log and count them in job-index order.
+"""
+import collections
+import threading
+import time
+from concurrent import futures
+
+# substrings of sbatch error messages that indicate an overloaded controller
+TRANSIENT_ERRORS = [
+    "socket timed out",
+    "resource temporarily unavailable",
+    "slurm_receive_msg",
+    "unable to contact slurm controller",
+    "connection refused",
+]
+
+MAX_RETRIES = 5         # number of retries after a transient error
+BACKOFF_DELAY = 1.0     # delay before the first retry in seconds, doubled for each retry
+
+
+def is_transient_error(message):
+    """Check if an sbatch error message indicates a temporary problem."""
+    message = message.lower()
+    return any([err in message for err in TRANSIENT_ERRORS])
+
+
+class AdaptiveLimiter(object):
+    """
+    Limits the number of concurrent calls. The limit is halved by `failure`
+    and increased by one after `limit` calls to `success`.
+    """
+    def __init__(self, max_limit, min_limit=1):
+        self._max_limit = max(max_limit, min_limit)
+        self._min_limit = min_limit
+        self._limit = self._max_limit
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until the number of active calls is below the limit."""
+        with self._cond:
+            while self._active >= self._limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self):
+        """Finish an active call."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def success(self):
+        """Register a successful call."""
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self._limit:
+                self._successes = 0
+                self._limit = min(self._limit + 1, self._max_limit)
+                self._cond.notify_all()
+
+    def failure(self):
+        """Register a call that failed because of an overloaded controller."""
+        with self._cond:
+            self._successes = 0
+            self._limit = max(self._limit // 2, self._min_limit)
+
+    def get_limit(self):
+        return self._limit
+
+
+class SubmitPool(object):
+    """
+    Runs `func(*args)` in a bounded pool of worker threads. `func` must return
+    a SubmitResult.
+
+    Every call is identified by a key. `completed` and `drain` return the
+    (key, result) pairs in the order of the calls to `submit` and `add_result`.
+    """
+    def __init__(self, func, max_workers, max_retries=MAX_RETRIES, backoff_delay=BACKOFF_DELAY):
+        self._func = func
+        self._limiter = AdaptiveLimiter(max_workers)
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._max_retries = max_retries
+        self._backoff_delay = backoff_delay
+        self._queue = collections.deque()
+
+    def _run(self, args):
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            try:
+                result = self._func(*args)
+            finally:
+                self._limiter.release()
+
+            if result.is_success() or not is_transient_error(result.error):
+                self._limiter.success()
+                return result
+
+            self._limiter.failure()
+            if attempt >= self._max_retries:
+                return result
+
+            time.sleep(self._backoff_delay * 2**attempt)
+            attempt += 1
+
+    def submit(self, key, *args):
+        """Schedule `func(*args)`."""
+        self._queue.append((key, self._executor.submit(self._run, args)))
+
+    def add_result(self, key, result):
+        """Add a result that does not need to be computed, e.g. for skipped jobs."""
+        future = futures.Future()
+        future.set_result(result)
+        self._queue.append((key, future))
+
+    def completed(self):
+        """Yield the finished results at the front of the queue without blocking."""
+        while len(self._queue) > 0 and self._queue[0][1].done():
+            key, future = self._queue.popleft()
+            yield key, future.result()
+
+    def drain(self):
+        """Yield all remaining results, wait for them if necessary."""
+        while len(self._queue) > 0:
+            key, future = self._queue.popleft()
+            yield key, future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def get_limit(self):
+        return self._limiter.get_limit()
@@ -0,0 +1,95 @@
+"""Templates for the files that are copied to each job directory.
+
+A template file is read and parsed once per run. Its text is split into
+literal parts and wildcards, so that rendering a job only joins the parts
+with the current parameter values, without touching the original file again.
+
+Wildcards are matched longest first, i.e. if one wildcard is contained in
+another one (e.g. `U_VAL` in `JU_VAL`), the longer wildcard wins and the
+shorter one cannot corrupt it.
+
+Files that do not contain any wildcard are copied byte-for-byte, unless a
+block of lines is inserted into the script (see `markers.inject`).
+"""
+import re
+import shutil
+
+from . import markers
+
+
+def compile_pattern(wildcards):
+    """Return a regular expression that matches any of the wildcards, longest first."""
+    ordered = sorted(set(wildcards), key=len, reverse=True)
+    return re.compile("(" + "|".join([re.escape(w) for w in ordered]) + ")")
+
+
+class Template(object):
+    """
+    A file that is parsed into a list of literal strings and wildcards.
+    If `insert` is given, it is inserted after the header of the file.
+    """
+    def __init__(self, path, wildcards, insert=None):
+        self._path = path
+        self._modified = insert is not None
+
+        with open(path, 'r', newline='') as infile:
+            text = infile.read()
+        if insert is not None:
+            text = markers.inject(text, insert)
+
+        if len(wildcards) > 0:
+            # the capturing group puts the wildcards at the odd positions
+            self._parts = compile_pattern(wildcards).split(text)
+        else:
+            self._parts = [text]
+
+    def get_path(self):
+        return self._path
+
+    def is_static(self):
+        """Check if the file contains no wildcards."""
+        return len(self._parts) == 1
+
+    def get_wildcards(self):
+        """Return the wildcards in the order of their occurrence."""
+        return self._parts[1::2]
+
+    def render(self, values):
+        """Return the text with each wildcard replaced by `values[wildcard]`."""
+        if self.is_static():
+            return self._parts[0]
+
+        parts = list(self._parts)
+        parts[1::2] = [values[w] for w in parts[1::2]]
+        return "".join(parts)
+
+    def write(self, path, values):
+        """Render the template to `path` and return the written text."""
+        text = self.render(values)
+        if self.is_static() and not self._modified:
+            shutil.copyfile(self._path, path)
+        else:
+            with open(path, 'w', newline='') as outfile:
+                outfile.write(text)
+        return text
+
+
+class TemplateSet(object):
+    """
+    The script file and the other files of a job, compiled once for all jobs.
+    `script_insert` is inserted after the header of the script file.
+    """
+    def __init__(self, script_path, other_files, wildcards, script_insert=None):
+        self._wildcards = list(wildcards)
+        self._script = Template(script_path, self._wildcards, script_insert)
+        self._others = [Template(p, self._wildcards) for p in other_files]
+
+    def get_values(self, replace_items):
+        """Map the wildcards to the replacement strings (in the same order)."""
+        return dict(zip(self._wildcards, replace_items))
+
+    def get_script(self):
+        return self._script
+
+    def get_others(self):
+        return self._others
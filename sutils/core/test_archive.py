@@ -0,0 +1,87 @@
+import unittest
+import gzip
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from . import archive
+
+
+class TestScriptArchive(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, archive.ARCHIVE_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_add_and_read(self):
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "#!/bin/bash\necho 0\n")
+        a.add('U1/slurm.sh', "#!/bin/bash\necho 1\n")
+        a.close()
+        self.assertEqual(archive.read_script(self._path, 'U1/slurm.sh'), "#!/bin/bash\necho 1\n")
+
+    def test_append_to_existing_archive(self):
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "first")
+        a.close()
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "second")
+        a.close()
+        self.assertEqual(archive.read_script(self._path, 'U0/slurm.sh'), "second")
+
+    def test_missing_entry(self):
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "first")
+        a.close()
+        self.assertRaises(KeyError, archive.read_script, self._path, 'U1/slurm.sh')
+
+    def test_nothing_written_without_scripts(self):
+        archive.ScriptArchive(self._path).close()
+        self.assertFalse(os.path.exists(self._path))
+
+    def test_readable_without_close(self):
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "first")
+        a.add('U1/slurm.sh', "second")
+        # no close, e.g. ssubmit was killed
+        self.assertEqual(archive.read_script(self._path, 'U1/slurm.sh'), "second")
+        a.close()
+
+    def test_truncated_entry_is_skipped(self):
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "first")
+        a.add('U1/slurm.sh', "second")
+        a.close()
+        with open(self._path, 'rb+') as f:
+            f.truncate(os.path.getsize(self._path) - 5)
+        self.assertEqual(archive.read_script(self._path, 'U0/slurm.sh'), "first")
+        self.assertRaises(KeyError, archive.read_script, self._path, 'U1/slurm.sh')
+
+    def test_gzip_compatible(self):
+        a = archive.ScriptArchive(self._path)
+        a.add('U0/slurm.sh', "first")
+        a.add('U1/slurm.sh', "second")
+        a.close()
+        with gzip.open(self._path, 'rt') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_concurrent_writers(self):
+        procs = [multiprocessing.Process(target=add_scripts, args=(self._path, i)) for i in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+        names = sorted(entry['name'] for entry in archive.read_entries(self._path))
+        self.assertEqual(names, sorted("U{}/slurm.sh".format(i) for i in range(200)))
+
+
+def add_scripts(path, part):
+    """Add 50 scripts as a separate ssubmit process would."""
+    a = archive.ScriptArchive(path)
+    for i in range(50*part, 50*(part + 1)):
+        a.add("U{}/slurm.sh".format(i), "#!/bin/bash\necho {}\n".format(i)*20)
+    a.close()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import arrayjob
+
+
+class TestSplitChunks(unittest.TestCase):
+    def test_single_chunk(self):
+        self.assertEqual(arrayjob.split_chunks([1, 2, 3], 10), [[1, 2, 3]])
+
+    def test_exact_multiple(self):
+        self.assertEqual(arrayjob.split_chunks([1, 2, 3, 4], 2), [[1, 2], [3, 4]])
+
+    def test_remainder(self):
+        self.assertEqual(arrayjob.split_chunks([1, 2, 3], 2), [[1, 2], [3]])
+
+    def test_empty(self):
+        self.assertEqual(arrayjob.split_chunks([], 2), [])
+
+    def test_invalid_size_raises(self):
+        self.assertRaises(ValueError, arrayjob.split_chunks, [1], 0)
+
+
+class TestGetArraySpec(unittest.TestCase):
+    def test_without_throttle(self):
+        self.assertEqual(arrayjob.get_array_spec(10), "0-9")
+
+    def test_zero_throttle_is_ignored(self):
+        self.assertEqual(arrayjob.get_array_spec(10, 0), "0-9")
+
+    def test_with_throttle(self):
+        self.assertEqual(arrayjob.get_array_spec(10, 4), "0-9%4")
+
+
+class TestGetSbatchHeader(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._script = os.path.join(self._dir, 'slurm.sh')
+        with open(self._script, 'w') as outfile:
+            outfile.write("#!/bin/bash\n")
+            outfile.write("#SBATCH --job-name=JOBNAME\n")
+            outfile.write("#SBATCH --time=00:05:00\n")
+            outfile.write("#SBATCH --output=out.txt\n")
+            outfile.write("#SBATCH --comment=U_VAL\n")
+            outfile.write("#SBATCH -p test\n")
+            outfile.write("echo U_VAL\n")
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_keeps_common_options(self):
+        header = arrayjob.get_sbatch_header(self._script, ['U_VAL', 'JOBNAME'])
+        self.assertEqual(header, ["#SBATCH --time=00:05:00", "#SBATCH -p test"])
+
+
+class TestGetTaskId(unittest.TestCase):
+    def test_format(self):
+        self.assertEqual(arrayjob.get_task_id("1234", 5), "1234_5")
@@ -0,0 +1,44 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import campaign
+
+
+class TestCampaign(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, campaign.CAMPAIGN_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_create_once(self):
+        self.assertIsNone(campaign.load(self._path))
+        first = campaign.create(self._path)
+        second = campaign.create(self._path)
+        self.assertEqual(first.get_id(), second.get_id())
+        self.assertEqual(campaign.load(self._path).get_created(), first.get_created())
+
+    def test_comment(self):
+        cur = campaign.Campaign("abc", "2024-01-01T00:00:00")
+        self.assertEqual(cur.get_comment(5), "ssubmit:abc:5")
+        self.assertEqual(cur.parse_comment(cur.get_comment(5), 100), 5)
+        self.assertEqual(cur.parse_comment(cur.get_comment(5, array=True), "100_3"), 8)
+        self.assertIsNone(cur.parse_comment("ssubmit:other:5", 100))
+        self.assertIsNone(cur.parse_comment("(null)", 100))
+        self.assertIsNone(cur.parse_comment("ssubmit:abc:5+", 100))
+
+
+class TestJobMap(unittest.TestCase):
+    def test_most_recent_job(self):
+        cur = campaign.Campaign("abc", "2024-01-01T00:00:00")
+        job_map = campaign.JobMap(cur)
+        job_map.add([100, 98, "90_1"], ["ssubmit:abc:0", "ssubmit:abc:0", "ssubmit:abc:1+"])
+        job_map.add(["99", "7"], ["ssubmit:abc:3", "ssubmit:xyz:4"])
+        self.assertEqual(job_map.get(0), "100")
+        self.assertEqual(job_map.get(2), "90_1")
+        self.assertEqual(job_map.get(3), "99")
+        self.assertIsNone(job_map.get(4))
+        self.assertEqual(len(job_map), 3)
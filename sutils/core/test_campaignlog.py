@@ -0,0 +1,68 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from . import campaignlog
+
+
+class TestCampaignLogger(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, "ssubmit.log")
+        self._records_path = os.path.join(self._dir, campaignlog.RECORDS_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def read(self, path):
+        with open(path, 'r') as infile:
+            return infile.read()
+
+    def test_lines_are_buffered_until_close(self):
+        logger = campaignlog.CampaignLogger(self._path, to_screen=False, flush_interval=3600)
+        logger.write("first")
+        logger.write("second")
+        self.assertFalse(os.path.exists(self._path))
+        logger.close()
+        self.assertEqual(self.read(self._path), "first\nsecond\n")
+
+    def test_flush_on_size(self):
+        logger = campaignlog.CampaignLogger(self._path, to_screen=False, flush_bytes=10, flush_interval=3600)
+        logger.write("0123456789")
+        self.assertEqual(self.read(self._path), "0123456789\n")
+        logger.close()
+
+    def test_separator_for_existing_log(self):
+        with open(self._path, 'w') as outfile:
+            outfile.write("old\n")
+        logger = campaignlog.CampaignLogger(self._path, to_screen=False)
+        logger.write("new", new=True)
+        logger.close()
+        self.assertEqual(self.read(self._path), "old\n\n" + "-"*80 + "\n\nnew\n")
+
+    def test_no_separator_for_new_log(self):
+        logger = campaignlog.CampaignLogger(self._path, to_screen=False)
+        logger.write("new", new=True)
+        logger.close()
+        self.assertEqual(self.read(self._path), "new\n")
+
+    def test_records(self):
+        logger = campaignlog.CampaignLogger(self._path, self._records_path, to_screen=False)
+        logger.record(index=0, job_id="123")
+        logger.record(index=1, job_id=None)
+        logger.close()
+        with open(self._records_path, 'r') as infile:
+            records = [json.loads(line) for line in infile]
+        self.assertEqual(records, [{'index': 0, 'job_id': "123"}, {'index': 1, 'job_id': None}])
+
+    def test_screen_only(self):
+        logger = campaignlog.CampaignLogger()
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            logger.write("line")
+            logger.write("hidden", to_screen=False)
+            logger.close()
+            self.assertEqual(stdout.getvalue(), "line\n")
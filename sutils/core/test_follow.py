@@ -0,0 +1,49 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import follow
+
+
+class TestFollowState(unittest.TestCase):
+    def test_free_is_limited_by_queue(self):
+        state = follow.FollowState(1, 100, active=[1, 2, 3])
+        self.assertEqual(state.get_free(5), 2)
+
+    def test_free_is_limited_by_range(self):
+        state = follow.FollowState(99, 100)
+        self.assertEqual(state.get_free(5), 2)
+
+    def test_free_is_not_negative(self):
+        state = follow.FollowState(1, 100, active=[1, 2, 3])
+        self.assertEqual(state.get_free(2), 0)
+
+    def test_update_active_drops_finished_jobs(self):
+        state = follow.FollowState(1, 100, active=[1, "2_1", 3])
+        state.update_active([3, "2_1", 4])
+        self.assertEqual(state.active, ["2_1", "3"])
+
+    def test_is_done(self):
+        self.assertTrue(follow.FollowState(101, 100).is_done())
+        self.assertFalse(follow.FollowState(101, 100, active=[1]).is_done())
+        self.assertFalse(follow.FollowState(100, 100).is_done())
+        self.assertFalse(follow.FollowState(101, 100, retry=[7]).is_done())
+
+    def test_take_retries_first(self):
+        state = follow.FollowState(5, 6, retry=[2, 3])
+        self.assertEqual(state.get_free(10), 4)
+        self.assertEqual(state.take(3), [2, 3, 5])
+        self.assertEqual(state.take(3), [6])
+        self.assertEqual((state.next, state.retry), (7, []))
+
+    def test_save_and_load(self):
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, follow.STATE_NAME)
+        follow.FollowState(5, 10, active=[1, 2], retry=[3]).save(path)
+        state = follow.FollowState.load(path)
+        self.assertEqual((state.next, state.last, state.active, state.retry), (5, 10, ["1", "2"], [3]))
+        shutil.rmtree(tmpdir)
+
+    def test_load_without_file(self):
+        self.assertIsNone(follow.FollowState.load(os.path.join(tempfile.gettempdir(), "doesnotexist.follow")))
@@ -0,0 +1,160 @@
+import unittest
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import jobdb
+
+
+class TestJobDatabase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._db = jobdb.JobDatabase(os.path.join(self._dir, "jobs.sqlite"), batch_size=3)
+
+    def tearDown(self):
+        self._db.close()
+        shutil.rmtree(self._dir)
+
+    def test_find_latest_job(self):
+        self._db.add_job("/campaign", 0, "/campaign/L0", 100, [np.int64(8), 0.5])
+        self._db.add_job("/campaign", 1, "/campaign/L1", 101)
+        self._db.add_job("/campaign", 0, "/campaign/L0", "102_3")
+        self._db.add_job("/other", 0, "/other/L0", 200)
+        entry = self._db.find_job("/campaign", 0)
+        self.assertEqual(entry['job_id'], "102_3")
+        self.assertEqual(entry['state'], jobdb.SUBMITTED)
+        self.assertEqual(self._db.find_job("/other", 0)['job_id'], "200")
+        self.assertIsNone(self._db.find_job("/campaign", 2))
+        self.assertIsNone(self._db.find_job("/unknown", 0))
+        self.assertIsNone(self._db.find_job("/campaign", 0, "/campaign/L5"))
+
+    def test_find_job_id(self):
+        self._db.add_job("/campaign", 4, "/campaign/L4", 100)
+        self.assertEqual(tuple(self._db.find_job_id(100)), (os.path.realpath("/campaign"), 4, "/campaign/L4"))
+        self.assertIsNone(self._db.find_job_id(999))
+
+    def test_batches(self):
+        for i in range(7):
+            self._db.add_job("/campaign", i, "/campaign/L{}".format(i), 100 + i)
+        # two full batches are written, the last job is still pending
+        other = jobdb.JobDatabase(self._db._path)
+        self.assertEqual(other.count_jobs(), 6)
+        self._db.close()
+        self.assertEqual(other.count_jobs("/campaign"), 7)
+        other.close()
+
+    def test_states(self):
+        self._db.add_job("/campaign", 0, "/campaign/L0", 100)
+        self._db.add_job("/campaign", 1, "/campaign/L1", 101)
+        self._db.set_states([(100, "COMPLETED")])
+        self.assertEqual(self._db.find_job("/campaign", 0)['state'], "COMPLETED")
+        self.assertEqual(self._db.count_jobs(state=jobdb.SUBMITTED), 1)
+
+    def test_drop_superseded(self):
+        self._db.add_job("/campaign", 0, "/campaign/L0", 100, submit_time=10.)
+        self._db.add_job("/campaign", 1, "/campaign/L1", 101, submit_time=10.)
+        self._db.add_job("/campaign", 0, "/campaign/L0", 102, submit_time=20.)
+        self._db.add_job("/campaign", 0, "/campaign/L0", 103, submit_time=30.)
+        self.assertEqual(self._db.drop_superseded(before=15.), 1)
+        self.assertEqual(self._db.drop_superseded(), 1)
+        self.assertEqual(self._db.count_jobs(), 2)
+        self.assertEqual(self._db.find_job("/campaign", 0)['job_id'], "103")
+
+
+class TestJobLookup(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._db = jobdb.JobDatabase(os.path.join(self._dir, "jobs.sqlite"))
+        self._db.add_job("/campaign", 0, "/campaign/L0", 100, [np.float64(0.1) + 0.2, 8])
+        self._db.add_job("/campaign", 1, "/campaign/L1", 101, [0.5, 8])
+        self._db.add_job("/campaign", 0, "/campaign/L0", 102, [0.3, 8])
+        self._db.add_job("/other", 2, "/other/L2", 200, [1., 8])
+
+    def tearDown(self):
+        self._db.close()
+        shutil.rmtree(self._dir)
+
+    def test_get(self):
+        lookup = self._db.load_campaign("/campaign")
+        self.assertEqual(len(lookup), 2)
+        self.assertEqual(lookup.get(0), "102")
+        self.assertEqual(lookup.get(1, "/campaign/L1"), "101")
+        self.assertIsNone(lookup.get(2))
+        self.assertIsNone(lookup.get(1, "/campaign/other"))
+        # the index changed, e.g. after editing the config file
+        self.assertEqual(lookup.get(5, "/campaign/X", [0.30000000001, np.int64(8)]), "102")
+        self.assertIsNone(lookup.get(5, None, [1., 8]))
+
+    def test_lookup_many(self):
+        lookup = self._db.load_campaign("/campaign")
+        self.assertEqual(lookup.lookup_many([0, 1, 2]), {0: "102", 1: "101"})
+        self.assertEqual(len(self._db.load_campaign("/unknown")), 0)
+
+    def test_canonical_parameters(self):
+        self.assertEqual(jobdb.canonical_parameters([0.1 + 0.2, -0., np.int64(3), "a"]), (0.3, 0., 3., "a"))
+
+
+def submit_range(db_dir, config_path, first, last):
+    """Record the jobs first...last-1 as a separate ssubmit process would."""
+    db = jobdb.open_shard(db_dir, config_path, db_dir)
+    db._batch_size = 5
+    for i in range(first, last):
+        db.add_job(db_dir, i, "L{}".format(i), 1000 + i)
+    db.close()
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._config = os.path.join(self._dir, "config.ini")
+        open(self._config, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def add_jobs(self, config_path, job_ids):
+        db = jobdb.open_shard(self._dir, config_path, self._dir)
+        for job_id in job_ids:
+            db.add_job(self._dir, 0, "L0", job_id)
+        db.close()
+
+    def test_shard_per_config(self):
+        other = os.path.join(self._dir, "other.ini")
+        self.add_jobs(self._config, [100, 101])
+        self.add_jobs(other, [200])
+        index = jobdb.ShardIndex(os.path.join(self._dir, jobdb.SHARD_DIR))
+        names = [name for name, entry in index.items()]
+        self.assertEqual(sorted(names), sorted([jobdb.get_shard_name(self._config), jobdb.get_shard_name(other)]))
+        db = jobdb.open_shard(self._dir, self._config, self._dir)
+        self.assertEqual(db.count_jobs(), 2)
+        db.close()
+
+    def test_compact_and_prune(self):
+        other = os.path.join(self._dir, "other.ini")
+        self.add_jobs(self._config, [100, 101, 102])
+        self.add_jobs(other, [200])
+        # recent jobs are kept, the shard of `other` is kept although its config file does not exist
+        self.assertEqual([n for campaign, n in jobdb.prune(self._dir, 1.)], [0, 0])
+        self.assertEqual(sorted(n for campaign, n in jobdb.compact(self._dir)), [0, 2])
+        self.assertTrue(os.path.exists(os.path.join(self._dir, jobdb.SHARD_DIR, jobdb.get_shard_name(other))))
+        self.assertEqual(len(jobdb.ShardIndex(os.path.join(self._dir, jobdb.SHARD_DIR)).items()), 2)
+
+    def test_concurrent_writers(self):
+        configs = [self._config] * 4 + [os.path.join(self._dir, "c{}.ini".format(i)) for i in range(4)]
+        procs = [multiprocessing.Process(target=submit_range, args=(self._dir, config, 50*i, 50*(i + 1))) \
+                 for i, config in enumerate(configs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+        # no job and no campaign of the index is lost
+        self.assertEqual(len(jobdb.ShardIndex(os.path.join(self._dir, jobdb.SHARD_DIR)).items()), 5)
+        db = jobdb.open_shard(self._dir, self._config, self._dir)
+        self.assertEqual(db.count_jobs(), 200)
+        self.assertEqual(db.find_job(self._dir, 199)['job_id'], "1199")
+        db.close()
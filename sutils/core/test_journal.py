@@ -0,0 +1,66 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import journal
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, journal.JOURNAL_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_last_record_determines_state(self):
+        j = journal.Journal(self._path)
+        j.add_rendered(0, 'U0')
+        self.assertEqual(j.get_state(0, 'U0'), journal.RENDERED)
+        j.add_submitted(0, 'U0', 1234)
+        self.assertEqual(j.get_state(0, 'U0'), journal.SUBMITTED)
+        self.assertEqual(j.get_job_id(0), '1234')
+        j.close()
+
+    def test_unknown_job(self):
+        j = journal.Journal(self._path)
+        self.assertIsNone(j.get_state(0, 'U0'))
+        self.assertIsNone(j.get_job_id(0))
+
+    def test_other_directory_is_ignored(self):
+        j = journal.Journal(self._path)
+        j.add_submitted(0, 'U0', 1234)
+        self.assertIsNone(j.get_state(0, 'U1'))
+        j.close()
+
+    def test_replay(self):
+        j = journal.Journal(self._path)
+        j.add_rendered(0, 'U0')
+        j.add_submitted(0, 'U0', 1234)
+        j.add_rendered(1, 'U1')
+        j.add_failed(2, 'U2', 'sbatch: error')
+        j.close()
+
+        j = journal.Journal(self._path)
+        self.assertEqual(j.get_state(0, 'U0'), journal.SUBMITTED)
+        self.assertEqual(j.get_state(1, 'U1'), journal.RENDERED)
+        self.assertEqual(j.get_state(2, 'U2'), journal.FAILED)
+
+    def test_submitted_records_survive_without_close(self):
+        j = journal.Journal(self._path)
+        j.add_submitted(0, 'U0', 1234)
+        # the record has been handed to the OS, a second reader sees it
+        self.assertEqual(journal.Journal(self._path).get_state(0, 'U0'), journal.SUBMITTED)
+        j.close()
+
+    def test_incomplete_last_line_is_ignored(self):
+        j = journal.Journal(self._path)
+        j.add_submitted(0, 'U0', 1234)
+        j.close()
+        with open(self._path, 'a') as outfile:
+            outfile.write('{"index": 1, "dirn')
+
+        j = journal.Journal(self._path)
+        self.assertEqual(j.get_state(0, 'U0'), journal.SUBMITTED)
+        self.assertIsNone(j.get_job_id(1))
@@ -0,0 +1,64 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import manifest
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, manifest.MANIFEST_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_staged_jobs_are_pending(self):
+        m = manifest.Manifest(self._path)
+        m.add_staged(1, 'U1', [1.0], 'abc')
+        m.add_staged(0, 'U0', [0.0], 'def')
+        self.assertEqual([e['staged'] for e in m.get_pending()], [0, 1])
+        m.close()
+
+    def test_launched_jobs_are_not_pending(self):
+        m = manifest.Manifest(self._path)
+        m.add_staged(0, 'U0', [0.0], 'abc')
+        m.add_staged(1, 'U1', [1.0], 'def')
+        m.add_launched(0, '1234')
+        self.assertEqual([e['staged'] for e in m.get_pending()], [1])
+        m.close()
+
+    def test_restaged_job_is_pending_again(self):
+        m = manifest.Manifest(self._path)
+        m.add_staged(0, 'U0', [0.0], 'abc')
+        m.add_launched(0, '1234')
+        m.add_staged(0, 'U0', [0.0], 'abd')
+        self.assertEqual(len(m.get_pending()), 1)
+        m.close()
+
+    def test_state_is_restored_from_file(self):
+        m = manifest.Manifest(self._path)
+        m.add_staged(0, 'U0', np.array([0.5, 2]), 'abc')
+        m.add_staged(1, 'U1', [1.0, 2], 'def')
+        m.add_launched(1, 1234)
+        m.close()
+
+        m = manifest.Manifest(self._path)
+        pending = m.get_pending()
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(pending[0]['dirname'], 'U0')
+        self.assertEqual(pending[0]['params'], [0.5, 2.])
+        self.assertEqual(m.get_job_id(1), '1234')
+
+    def test_incomplete_last_line_is_ignored(self):
+        m = manifest.Manifest(self._path)
+        m.add_staged(0, 'U0', [0.0], 'abc')
+        m.close()
+        with open(self._path, 'a') as outfile:
+            outfile.write('{"launched": 0, "jo')
+
+        m = manifest.Manifest(self._path)
+        self.assertEqual(len(m.get_pending()), 1)
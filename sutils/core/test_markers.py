@@ -0,0 +1,73 @@
+import unittest
+import os
+import shutil
+import subprocess
+import tempfile
+
+from . import markers
+
+
+class TestInject(unittest.TestCase):
+    def test_after_header(self):
+        text = "#!/bin/bash\n#SBATCH --time=1\n\necho a\n# comment\necho b\n"
+        self.assertEqual(markers.inject(text, "X\n"), "#!/bin/bash\n#SBATCH --time=1\n\nX\necho a\n# comment\necho b\n")
+
+    def test_header_only(self):
+        self.assertEqual(markers.inject("#!/bin/bash", "X\n"), "#!/bin/bash\nX\n")
+
+    def test_invalid_mode(self):
+        self.assertIsNone(markers.get_marker_class('none'))
+        with self.assertRaises(RuntimeError):
+            markers.get_marker_class('slurm')
+
+
+class TestMarkers(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._jobdir = os.path.join(self._dir, 'a')
+        os.mkdir(self._jobdir)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def run_script(self, marker_class, body, env):
+        script = os.path.join(self._dir, 'job.sh')
+        with open(script, 'w') as outfile:
+            outfile.write(markers.inject("#!/bin/bash\n" + body, marker_class.get_script(self._dir)))
+        job_env = dict(os.environ)
+        job_env.update(env)
+        subprocess.call(['bash', script], cwd=self._jobdir, env=job_env)
+
+    def test_file_marker(self):
+        self.run_script(markers.FileMarker, "true\n", {'SLURM_JOB_ID': '12'})
+        loaded = markers.load_files(self._dir, ['a', 'b'])
+        self.assertEqual(list(loaded.keys()), ['a'])
+        self.assertEqual(loaded['a'].get_value(), markers.Status.completed)
+        self.assertTrue(loaded['a'].matches(12))
+        self.assertFalse(loaded['a'].matches(13))
+
+    def test_database_marker(self):
+        self.run_script(markers.DatabaseMarker, "exit 3\n",
+                        {'SLURM_JOB_ID': '20', 'SLURM_ARRAY_JOB_ID': '19', 'SLURM_ARRAY_TASK_ID': '1'})
+        marker = markers.DatabaseMarker(self._dir, 'a')
+        self.assertTrue(marker.load())
+        self.assertEqual(marker.get_value(), markers.Status.failed)
+        self.assertEqual(marker.get_exitcode(), '3')
+        self.assertTrue(marker.matches('19_1'))
+
+    def test_terminated(self):
+        self.run_script(markers.FileMarker, "kill -TERM $$\nsleep 1\n", {'SLURM_JOB_ID': '5'})
+        marker = markers.FileMarker(self._jobdir)
+        self.assertTrue(marker.load())
+        self.assertEqual(marker.get_value(), markers.Status.terminated)
+
+    def test_store(self):
+        marker = markers.FileMarker(self._jobdir, markers.Status.running, job_id=7)
+        marker.store()
+        marker.set_value(markers.Status.completed)
+        marker.store()
+        loaded = markers.FileMarker(self._jobdir)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.get_fields(), ['7', '', 'completed', ''])
+        with self.assertRaises(ValueError):
+            loaded.set_value('queued')
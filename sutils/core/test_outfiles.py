@@ -0,0 +1,51 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import outfiles
+
+
+class TestOutfileIndex(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def touch(self, *path, **kwargs):
+        path = os.path.join(self._dir, *path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as outfile:
+            outfile.write(kwargs.get('text', ''))
+
+    def test_numeric_order(self):
+        self.touch('a', 'slurm-9.out')
+        self.touch('a', 'slurm-10.out', text='done\n')
+        index = outfiles.OutfileIndex(self._dir)
+        outfile = index.get('a')
+        self.assertEqual(outfile.job_id, 10)
+        self.assertEqual(outfile.size, 5)
+
+    def test_array_tasks(self):
+        self.touch('a', 'slurm-12_2.out')
+        self.touch('a', 'slurm-12_10.out')
+        index = outfiles.OutfileIndex(self._dir)
+        self.assertEqual(index.get_job_id('a'), "12_10")
+
+    def test_missing(self):
+        self.touch('a', 'other.out')
+        self.touch('b', 'slurm-1.out')
+        index = outfiles.OutfileIndex(self._dir)
+        self.assertEqual(index.get_dirnames(), ['a', 'b'])
+        self.assertTrue(index.has_dir('a'))
+        self.assertIsNone(index.get_job_id('a'))
+        self.assertFalse(index.has_dir('c'))
+        self.assertIsNone(index.get('c'))
+
+    def test_nested(self):
+        self.touch('a', 'b', 'slurm-3.out')
+        index = outfiles.OutfileIndex(self._dir)
+        self.assertEqual(index.get_job_id(os.path.join('a', 'b')), 3)
+        self.assertIsNone(index.get_job_id('a'))
@@ -0,0 +1,48 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import statecache
+
+
+def get_data(state):
+    return {'state': state, 'exitcode': '0:0', 'elapsed': '00:10:00', 'maxrss': 0., 'end': '2024-01-01T12:10:00'}
+
+
+class TestStateCache(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, statecache.CACHE_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_only_terminal_states_are_cached(self):
+        cache = statecache.StateCache(self._path)
+        cache.add(1, get_data('COMPLETED'))
+        cache.add(2, get_data('RUNNING'))
+        self.assertEqual(cache.get('1')['state'], 'COMPLETED')
+        self.assertIsNone(cache.get(2))
+
+    def test_reload(self):
+        cache = statecache.StateCache(self._path)
+        cache.add("3_1", get_data('TIMEOUT'))
+        cache.close()
+        cache = statecache.StateCache(self._path)
+        self.assertEqual(cache.get("3_1")['state'], 'TIMEOUT')
+        self.assertEqual(len(cache), 1)
+
+    def test_records_are_written_once(self):
+        cache = statecache.StateCache(self._path)
+        cache.add(1, get_data('FAILED'))
+        cache.close()
+        cache = statecache.StateCache(self._path)
+        cache.add(1, get_data('FAILED'))
+        cache.close()
+        with open(self._path, 'r') as infile:
+            self.assertEqual(len(infile.readlines()), 1)
+
+    def test_no_file_without_records(self):
+        statecache.StateCache(self._path).close()
+        self.assertFalse(os.path.exists(self._path))
@@ -0,0 +1,176 @@
+import unittest
+import os
+import subprocess
+from unittest.mock import Mock, patch
+
+from . import arrayjob
+from . import campaign
+from . import core
+from . import jobdb
+from . import statecache
+from .test_submitter import SubmitterTestCase
+from ..slurm_interface import api
+
+
+def squeue_output(states):
+    """Return the output of squeue for the jobs in `states`, a dict job ID -> compact state."""
+    return api.SqueueResult("".join("{} part job user {} 0:10 1 node1\n".format(job_id, state)
+                                    for job_id, state in sorted(states.items())))
+
+
+def sacct_completed(job_ids):
+    """sacct that lists all jobs `job_ids` as completed."""
+    return api.SacctResult("".join("{}|COMPLETED|0:0|00:01:00||Unknown\n".format(j) for j in job_ids))
+
+
+class TestQueueSnapshot(SubmitterTestCase):
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        self.run_ssubmit("4")
+
+    def test_single_squeue_call(self):
+        squeue = Mock(return_value=squeue_output({100: "R", 101: "PD", 102: "R"}))
+        with patch.object(core.slurm, "squeue_user", squeue), \
+             patch.object(core.slurm, "sacct", Mock(side_effect=sacct_completed)):
+            output = self.run_sstatus("-f")
+        # all jobs are looked up in one snapshot of the queue
+        squeue.assert_called_once_with(array=True, fresh=False)
+        self.assertEqual(output.count("running"), 2)
+        self.assertEqual(output.count("pending"), 1)
+        self.assertEqual(output.count("completed"), 1)
+
+    def test_fresh(self):
+        squeue = Mock(return_value=squeue_output({}))
+        with patch.object(core.slurm, "squeue_user", squeue), \
+             patch.object(core.slurm, "sacct", Mock(side_effect=sacct_completed)):
+            self.run_sstatus("-f", "--fresh")
+        squeue.assert_called_once_with(array=True, fresh=True)
+
+
+class TestWatch(SubmitterTestCase):
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        self.run_ssubmit("2")
+
+    def run_watch(self, snapshots):
+        squeue = Mock(side_effect=[squeue_output(states) for states in snapshots])
+        sleep = Mock(side_effect=[None]*(len(snapshots) - 1) + [KeyboardInterrupt])
+        with patch.object(core.slurm, "squeue_user", squeue), \
+             patch.object(core.slurm, "sacct", Mock(side_effect=sacct_completed)), \
+             patch.object(core.time, "sleep", sleep):
+            output = self.run_sstatus("-f", "--watch", "5")
+        return output, squeue, sleep
+
+    def test_refresh_until_finished(self):
+        output, squeue, sleep = self.run_watch([{100: "R", 101: "PD"}, {101: "R"}, {}])
+        # one squeue call per poll
+        self.assertEqual(squeue.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        sleep.assert_called_with(5.)
+        self.assertIn("All jobs finished.", output)
+
+    def test_only_changed_rows_are_printed(self):
+        output, squeue, sleep = self.run_watch([{100: "R", 101: "PD"}, {100: "R", 101: "R"}, {}])
+        lines = output.splitlines()
+        # 100 is printed once while running, then once completed
+        self.assertEqual(len([l for l in lines if l.strip().startswith("100") and "running" in l]), 1)
+        self.assertEqual(len([l for l in lines if l.strip().startswith("101") and "running" in l]), 1)
+        self.assertEqual(len([l for l in lines if l.strip().startswith("100") and "completed" in l]), 1)
+
+
+class TestCampaignAccounting(SubmitterTestCase):
+    extra_config = "job_comment = True"
+
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        self.run_ssubmit("2")
+        campaign_id = campaign.load().get_id()
+        self._running = "100|RUNNING|0:0|00:01:00||Unknown|ssubmit:{0}:0\n" \
+                        "101|RUNNING|0:0|00:01:00||Unknown|ssubmit:{0}:1\n".format(campaign_id)
+        self._completed = self._running.replace("RUNNING", "COMPLETED")
+
+    def run_with_slurm(self, sacct_user, *args):
+        with patch.object(core.slurm, "squeue_comments", return_value=api.SqueueCommentResult("")), \
+             patch.object(core.slurm, "sacct_user", sacct_user), \
+             patch.object(core.slurm, "sacct", return_value=api.SacctResult("")), \
+             patch.object(core.time, "sleep", Mock(side_effect=[None]*5 + [KeyboardInterrupt])):
+            return self.run_sstatus(*args)
+
+    def test_watch_refreshes_accounting(self):
+        sacct_user = Mock(side_effect=[api.SacctResult(self._running)]*2 + [api.SacctResult(self._completed)])
+        output = self.run_with_slurm(sacct_user, "-f", "--watch", "1")
+        self.assertEqual(sacct_user.call_count, 3)
+        self.assertIn("All jobs finished.", output)
+
+    def test_cached_jobs_skip_sacct(self):
+        self.run_with_slurm(Mock(return_value=api.SacctResult(self._completed)), "-f")
+        self.assertEqual(len(statecache.StateCache()), 2)
+
+        sacct_user = Mock(return_value=api.SacctResult(""))
+        output = self.run_with_slurm(sacct_user, "-f")
+        sacct_user.assert_not_called()
+        self.assertEqual(output.count("completed"), 2)
+
+
+class TestCancelledBeforeStart(SubmitterTestCase):
+    extra_config = "markers = file"
+
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        self.run_ssubmit("2")
+
+    def run_with_slurm(self, squeue, sacct):
+        with patch.object(core.slurm, "squeue_user", squeue), patch.object(core.slurm, "sacct", sacct):
+            return self.run_sstatus("-f")
+
+    def get_states(self):
+        db = jobdb.open_shard(core.db_dir, "config.ini", ".")
+        try:
+            return [db.find_job(self._dir, i)['state'] for i in range(2)]
+        finally:
+            db.close()
+
+    def test_not_in_queue_and_sacct(self):
+        output = self.run_with_slurm(Mock(return_value=api.SqueueResult("")), Mock(return_value=api.SacctResult("")))
+        self.assertEqual(output.count("(before start)"), 2)
+        self.assertEqual(self.get_states(), [jobdb.SUBMITTED]*2)
+
+    def test_squeue_failed(self):
+        output = self.run_with_slurm(Mock(side_effect=RuntimeError("squeue failed")), Mock(return_value=api.SacctResult("")))
+        self.assertNotIn("(before start)", output)
+
+    def test_sacct_failed(self):
+        output = self.run_with_slurm(Mock(return_value=api.SqueueResult("")), Mock(side_effect=RuntimeError("sacct failed")))
+        self.assertNotIn("(before start)", output)
+
+    def test_sacct_record(self):
+        sacct = Mock(return_value=api.SacctResult("100|PENDING|0:0|00:00:00||Unknown\n"
+                                                  "101|CANCELLED|0:0|00:00:00||Unknown\n"))
+        output = self.run_with_slurm(Mock(return_value=api.SqueueResult("")), sacct)
+        self.assertNotIn("(before start)", output)
+        self.assertEqual(self.get_states(), ["PENDING", "CANCELLED"])
+
+
+class TestArrayOutfile(SubmitterTestCase):
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        self.run_ssubmit("stage", "2")
+        arrayjob.write_task_table("tasks.tbl", ["x0", "x1"])
+        arrayjob.write_dispatcher(arrayjob.DISPATCHER_NAME, "slurm.sh")
+        # run the tasks of array 1234 as SLURM would, the raw job IDs differ
+        for task in range(2):
+            env = dict(os.environ, SLURM_JOB_ID=str(1240 + task), SLURM_ARRAY_JOB_ID="1234",
+                       SLURM_ARRAY_TASK_ID=str(task))
+            subprocess.check_call(["bash", arrayjob.DISPATCHER_NAME, "tasks.tbl"], env=env)
+
+    def test_output_named_by_task_id(self):
+        self.assertEqual(sorted(os.listdir("x1")), ["slurm-1234_1.out", "slurm.sh"])
+
+    def test_status_from_outfile(self):
+        squeue = api.SqueueResult("1234_0 part job user R 0:10 1 node1\n")
+        sacct = api.SacctResult("1234_1|COMPLETED|0:0|00:00:05||Unknown\n")
+        with patch.object(core.slurm, "squeue_user", return_value=squeue), \
+             patch.object(core.slurm, "sacct", return_value=sacct):
+            output = self.run_sstatus("-f")
+        self.assertIn("running", output)
+        self.assertIn("completed", output)
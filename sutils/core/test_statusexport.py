@@ -0,0 +1,44 @@
+import unittest
+import json
+
+import numpy as np
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from . import statusexport
+
+
+class TestStatusWriter(unittest.TestCase):
+    def write(self, fmt):
+        stream = StringIO()
+        writer = statusexport.StatusWriter(fmt, ['L', 'U'], stream)
+        writer.write(3, [1, 0], [np.int64(8), np.float64(0.5)], "L1_U0", 123, "COMPLETED", "0:0", "00:01:00")
+        writer.write(4, [1, 1], [8, 1.], "L1_U1", None, "NO_OUTFILE")
+        return stream.getvalue().splitlines()
+
+    def test_json(self):
+        lines = self.write('json')
+        self.assertEqual(len(lines), 2)
+        record = json.loads(lines[0])
+        self.assertEqual(record['index'], 3)
+        self.assertEqual(record['indices'], [1, 0])
+        self.assertEqual(record['parameters'], {'L': 8, 'U': 0.5})
+        self.assertEqual(record['job_id'], "123")
+        self.assertIsNone(json.loads(lines[1])['exitcode'])
+
+    def test_csv(self):
+        lines = self.write('csv')
+        self.assertEqual(lines[0], "index,L_index,U_index,L,U,dirname,job_id,state,exitcode,elapsed")
+        self.assertEqual(lines[1], "3,1,0,8,0.5,L1_U0,123,COMPLETED,0:0,00:01:00")
+        self.assertEqual(lines[2], "4,1,1,8,1.0,L1_U1,,NO_OUTFILE,,")
+
+    def test_tsv(self):
+        lines = self.write('tsv')
+        self.assertEqual(lines[1].split("\t")[5:8], ["L1_U0", "123", "COMPLETED"])
+
+    def test_invalid_format(self):
+        with self.assertRaises(RuntimeError):
+            statusexport.StatusWriter('xml', ['L'], StringIO())
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from . import statusgrid
+
+
+class TestStatusGrid(unittest.TestCase):
+    def setUp(self):
+        # statuses: 0 = done, 1 = failed
+        self._grid = statusgrid.StatusGrid(['L', 'U', 'x'], [[4, 8], [0., 1., 2.], [1.]], ['done', 'failed'])
+
+    def test_row_major_index(self):
+        self._grid.set(4, 1)
+        self.assertEqual(self._grid.states.dtype, np.int8)
+        self.assertEqual(self._grid.states[1, 1, 0], 1)
+
+    def test_counts(self):
+        for idx in range(5):
+            self._grid.set(idx, 0)
+        self._grid.set(5, self._grid.other)
+        self.assertEqual(list(self._grid.counts()), [5, 0, 1])
+
+    def test_histogram(self):
+        self._grid.set(0, 0)
+        self._grid.set(1, 1)
+        self._grid.set(4, 1)
+        hist = self._grid.histogram('U')
+        self.assertEqual(hist.shape, (3, 3))
+        self.assertEqual(list(hist[:, 1]), [0, 2, 0])
+        self.assertEqual(list(hist[:, 0]), [1, 0, 0])
+
+    def test_fraction(self):
+        self._grid.set(0, 0)
+        self._grid.set(3, 1)
+        frac = self._grid.fraction(0, 'U', 'L')
+        self.assertEqual(frac.shape, (3, 2))
+        self.assertEqual(frac[0, 0], 1.)
+        self.assertEqual(frac[0, 1], 0.)
+        self.assertTrue(np.isnan(frac[1, 0]))
+
+    def test_unknown_parameter(self):
+        with self.assertRaises(RuntimeError):
+            self._grid.histogram('y')
+        with self.assertRaises(RuntimeError):
+            self._grid.fraction(0, 'U', 'U')
@@ -0,0 +1,115 @@
+import unittest
+import threading
+import time
+
+from . import submitpool
+from ..slurm_interface.api import SubmitResult
+
+
+def ok(job_id):
+    return SubmitResult(job_id=job_id)
+
+def error(message):
+    return SubmitResult(error=message)
+
+
+class TestIsTransientError(unittest.TestCase):
+    def test_socket_timeout(self):
+        msg = "sbatch: error: Batch job submission failed: Socket timed out on send/recv operation"
+        self.assertTrue(submitpool.is_transient_error(msg))
+
+    def test_resource_unavailable(self):
+        msg = "sbatch: error: Resource temporarily unavailable"
+        self.assertTrue(submitpool.is_transient_error(msg))
+
+    def test_invalid_partition_is_permanent(self):
+        msg = "sbatch: error: Batch job submission failed: Invalid partition name specified"
+        self.assertFalse(submitpool.is_transient_error(msg))
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_starts_at_maximum(self):
+        self.assertEqual(submitpool.AdaptiveLimiter(8).get_limit(), 8)
+
+    def test_failure_halves_limit(self):
+        limiter = submitpool.AdaptiveLimiter(8)
+        limiter.failure()
+        self.assertEqual(limiter.get_limit(), 4)
+
+    def test_limit_stays_above_minimum(self):
+        limiter = submitpool.AdaptiveLimiter(2)
+        for i in range(5):
+            limiter.failure()
+        self.assertEqual(limiter.get_limit(), 1)
+
+    def test_successes_increase_limit(self):
+        limiter = submitpool.AdaptiveLimiter(8)
+        limiter.failure()
+        for i in range(4):
+            limiter.success()
+        self.assertEqual(limiter.get_limit(), 5)
+
+    def test_limit_stays_below_maximum(self):
+        limiter = submitpool.AdaptiveLimiter(2)
+        for i in range(10):
+            limiter.success()
+        self.assertEqual(limiter.get_limit(), 2)
+
+
+class TestSubmitPool(unittest.TestCase):
+    def test_results_are_ordered(self):
+        def func(i):
+            time.sleep(0.01 * (5 - i))
+            return ok(str(i))
+
+        pool = submitpool.SubmitPool(func, 4)
+        for i in range(5):
+            pool.submit(i, i)
+        keys = [key for key, result in pool.drain()]
+        pool.shutdown()
+        self.assertEqual(keys, list(range(5)))
+
+    def test_added_results_keep_their_place(self):
+        pool = submitpool.SubmitPool(lambda i: ok(str(i)), 2)
+        pool.submit(0, 0)
+        pool.add_result(1, None)
+        pool.submit(2, 2)
+        res = [(key, None if result is None else result.job_id) for key, result in pool.drain()]
+        pool.shutdown()
+        self.assertEqual(res, [(0, '0'), (1, None), (2, '2')])
+
+    def test_transient_errors_are_retried(self):
+        calls = []
+        def func():
+            calls.append(1)
+            if len(calls) < 3:
+                return error("Socket timed out")
+            return ok("1")
+
+        pool = submitpool.SubmitPool(func, 4, backoff_delay=0.)
+        pool.submit(0)
+        res = [(key, result.job_id) for key, result in pool.drain()]
+        pool.shutdown()
+        self.assertEqual(res, [(0, "1")])
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(pool.get_limit(), 2)   # 4 -> 2 -> 1, then +1 after the success
+
+    def test_permanent_errors_are_not_retried(self):
+        calls = []
+        def func():
+            calls.append(1)
+            return error("Invalid partition name specified")
+
+        pool = submitpool.SubmitPool(func, 4, backoff_delay=0.)
+        pool.submit(0)
+        res = [(key, result.error) for key, result in pool.drain()]
+        pool.shutdown()
+        self.assertEqual(res, [(0, "Invalid partition name specified")])
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        pool = submitpool.SubmitPool(lambda: error("Socket timed out"), 1, max_retries=2, backoff_delay=0.)
+        pool.submit(0)
+        res = [(key, result.error) for key, result in pool.drain()]
+        pool.shutdown()
+        self.assertEqual(res, [(0, "Socket timed out")])
@@ -0,0 +1,296 @@
+import unittest
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import Mock, patch
+
+from . import archive
+from . import campaign
+from . import core
+from . import follow
+from . import jobdb
+from . import manifest
+from ..slurm_interface import api
+
+CONFIG = """[general]
+script_path = ./slurm.sh
+par_in_dirname = x
+use_index = True
+test_mode = False
+job_comment = False
+{extra}
+
+[pconfig]
+mode = square
+maxdecimals = 3
+
+[par-x]
+values = 1, 2, 3, 4
+"""
+
+
+class FakeSubmitter(core.Submitter):
+    """Submitter with sbatch replaced by consecutive job IDs."""
+    job_ids = itertools.count(100)
+
+    def run_sbatch(self, args, script=None):
+        return api.parse_sbatch_parsable(0, str(next(self.job_ids)), "")
+
+
+class SubmitterTestCase(unittest.TestCase):
+    extra_config = ""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._dir = tempfile.mkdtemp()
+        os.chdir(self._dir)
+        with open("config.ini", 'w') as outfile:
+            outfile.write(CONFIG.format(extra=self.extra_config))
+        with open("slurm.sh", 'w') as outfile:
+            outfile.write("#!/bin/bash\necho $x\n")
+
+        FakeSubmitter.job_ids = itertools.count(100)
+        self._db_dir = core.db_dir
+        core.db_dir = os.path.join(self._dir, "db")
+        os.makedirs(core.db_dir)
+
+    def tearDown(self):
+        core.db_dir = self._db_dir
+        os.chdir(self._cwd)
+        shutil.rmtree(self._dir)
+
+    def set_test_mode(self, test_mode):
+        with open("config.ini", 'w') as outfile:
+            outfile.write(CONFIG.format(extra=self.extra_config).replace("test_mode = False",
+                                                                         "test_mode = {}".format(test_mode)))
+
+    def run_ssubmit(self, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = FakeSubmitter(("ssubmit",) + args)
+            submitter.iterate()
+            submitter.finalize()
+        return submitter
+
+    def run_sstatus(self, *args):
+        argv = ("sstatus",) + args
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), patch.object(sys, "argv", list(argv)):
+            checker = core.StatusChecker(argv)
+            checker.iterate()
+            checker.finalize()
+        return out.getvalue()
+
+    def count_jobs(self):
+        db = jobdb.open_shard(core.db_dir, "config.ini", ".")
+        try:
+            return db.count_jobs()
+        finally:
+            db.close()
+
+
+class TestLaunch(SubmitterTestCase):
+    def test_launch_writes_job_db(self):
+        self.run_ssubmit("stage", "4")
+        self.assertEqual(self.count_jobs(), 0)
+        self.run_ssubmit("launch")
+        self.assertEqual(self.count_jobs(), 4)
+
+    def test_launch_in_test_mode_keeps_jobs_pending(self):
+        self.run_ssubmit("stage", "4")
+        self.set_test_mode(True)
+        self.run_ssubmit("launch")
+        self.assertEqual(len(manifest.Manifest().get_pending()), 4)
+
+        self.set_test_mode(False)
+        self.run_ssubmit("launch")
+        self.assertEqual(len(manifest.Manifest().get_pending()), 0)
+        self.assertEqual(self.count_jobs(), 4)
+
+
+class TestLaunchStdin(SubmitterTestCase):
+    extra_config = "render_mode = stdin"
+
+    def test_launch_closes_archive(self):
+        self.run_ssubmit("stage", "2")
+        self.run_ssubmit("launch")
+        self.assertEqual(self.count_jobs(), 2)
+        self.assertIn("echo $x", archive.read_script(archive.ARCHIVE_NAME, os.path.join("x1", "slurm.sh")))
+
+
+class RecordingSubmitter(FakeSubmitter):
+    """Submitter that keeps the arguments and the stdin of every sbatch call."""
+    calls = []
+
+    def run_sbatch(self, args, script=None):
+        self.calls.append((args, script))
+        return FakeSubmitter.run_sbatch(self, args, script)
+
+
+class TestRenderModeEnv(SubmitterTestCase):
+    extra_config = "render_mode = env"
+
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        RecordingSubmitter.calls = []
+
+    def run_ssubmit(self, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = RecordingSubmitter(("ssubmit",) + args)
+            submitter.iterate()
+            submitter.finalize()
+        return submitter
+
+    def test_sbatch_args(self):
+        self.run_ssubmit("1", "2")
+        self.assertEqual(RecordingSubmitter.calls[1],
+                         (['--chdir', 'x1', '--job-name', 'x1', '--export', 'ALL,X_VAL=2.000,JOBNAME=x1',
+                           os.path.realpath("slurm.sh")], None))
+        self.assertEqual(self.count_jobs(), 2)
+
+    def test_no_script_in_job_directory(self):
+        self.run_ssubmit("1", "2")
+        self.assertEqual(os.listdir("x0"), [])
+
+    def test_comma_in_value_is_rejected(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = RecordingSubmitter(("ssubmit", "1", "1"))
+        with patch.object(submitter, "get_pformat_values", return_value=["1,5"]):
+            self.assertRaises(RuntimeError, submitter.get_sbatch_args, "x0", [1])
+
+
+class TestLaunchArray(SubmitterTestCase):
+    extra_config = "submit_as = array\nmax_array_size = 100"
+
+    def test_launch_submits_array(self):
+        self.run_ssubmit("stage", "4")
+        submitter = self.run_ssubmit("launch")
+        # one sbatch call for all staged jobs
+        self.assertEqual(next(FakeSubmitter.job_ids), 101)
+        self.assertEqual(self.count_jobs(), 4)
+        self.assertEqual(submitter._manifest.get_pending(), [])
+        self.assertEqual(manifest.Manifest().get_job_id(3), "100_3")
+
+    def test_launch_in_test_mode_keeps_jobs_pending(self):
+        self.run_ssubmit("stage", "4")
+        self.set_test_mode(True)
+        self.run_ssubmit("launch")
+        self.assertEqual(len(manifest.Manifest().get_pending()), 4)
+
+
+class TestJobComment(SubmitterTestCase):
+    extra_config = "job_comment = True"
+
+    def setUp(self):
+        SubmitterTestCase.setUp(self)
+        RecordingSubmitter.calls = []
+
+    def test_comment_args(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = RecordingSubmitter(("ssubmit", "1", "1"))
+            submitter.iterate()
+            submitter.finalize()
+        args, script = RecordingSubmitter.calls[0]
+        self.assertEqual(args[:2], ['--comment', campaign.load().get_comment(0)])
+
+    def test_test_mode(self):
+        self.set_test_mode(True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = RecordingSubmitter(("ssubmit", "1", "1"))
+            submitter.iterate()
+            submitter.finalize()
+        self.assertNotIn('--comment', RecordingSubmitter.calls[0][0])
+        self.assertIsNone(campaign.load())
+
+    def test_disabled_by_default(self):
+        with open("config.ini", 'w') as outfile:
+            outfile.write(CONFIG.format(extra="").replace("job_comment = False\n", ""))
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = RecordingSubmitter(("ssubmit", "1", "1"))
+            submitter.iterate()
+            submitter.finalize()
+        self.assertNotIn('--comment', RecordingSubmitter.calls[0][0])
+        self.assertIsNone(campaign.load())
+
+
+class TestInvalidateSnapshots(SubmitterTestCase):
+    @patch("sutils.core.core.slurm.invalidate_snapshots")
+    def test_once_per_submission(self, invalidate):
+        self.run_ssubmit("1", "4")
+        invalidate.assert_called_once_with()
+
+    @patch("sutils.core.core.slurm.invalidate_snapshots")
+    def test_once_per_launch(self, invalidate):
+        self.run_ssubmit("stage", "4")
+        invalidate.assert_not_called()
+        self.run_ssubmit("launch")
+        invalidate.assert_called_once_with()
+
+    @patch("sutils.core.core.slurm.invalidate_snapshots")
+    def test_not_without_submitted_jobs(self, invalidate):
+        with contextlib.redirect_stdout(io.StringIO()):
+            submitter = RejectingSubmitter(("ssubmit", "1", "4"))
+            submitter.iterate()
+            submitter.finalize()
+        invalidate.assert_not_called()
+
+
+class RejectingSubmitter(FakeSubmitter):
+    """Submitter whose jobs are rejected by SLURM."""
+    def run_sbatch(self, args, script=None):
+        return api.parse_sbatch_parsable(1, "", "QOSMaxSubmitJobPerUser")
+
+
+class TestFollow(SubmitterTestCase):
+    def run_follow(self, submitter_class, polls):
+        with contextlib.redirect_stdout(io.StringIO()), \
+             patch.object(core.slurm, "squeue_user", return_value=api.SqueueResult("")), \
+             patch.object(core.time, "sleep", Mock(side_effect=[None]*(polls - 1) + [KeyboardInterrupt])):
+            submitter = submitter_class(("ssubmit", "--follow", "2"))
+            submitter.iterate()
+            submitter.finalize()
+        return follow.FollowState.load()
+
+    def test_failed_jobs_are_retried(self):
+        state = self.run_follow(RejectingSubmitter, 2)
+        self.assertEqual((state.next, sorted(state.retry)), (3, [1, 2]))
+        self.assertEqual(self.count_jobs(), 0)
+
+        state = self.run_follow(FakeSubmitter, 2)
+        self.assertEqual((state.next, state.retry, len(state.active)), (5, [], 2))
+        self.assertEqual(self.count_jobs(), 4)
+
+    def test_output_is_flushed_before_sleep(self):
+        out = io.StringIO()
+
+        def sleep(seconds):
+            # the progress of the poll is on the screen while ssubmit waits
+            self.assertIn("Submission succeeded", out.getvalue())
+            raise KeyboardInterrupt
+
+        with contextlib.redirect_stdout(out), \
+             patch.object(core.slurm, "squeue_user", return_value=api.SqueueResult("")), \
+             patch.object(core.time, "sleep", sleep):
+            submitter = FakeSubmitter(("ssubmit", "--follow", "2"))
+            submitter.iterate()
+            submitter.finalize()
+
+
+class TestFollowTestMode(SubmitterTestCase):
+    # the directories created by the test run are reused
+    extra_config = "overwrite_dir = True"
+
+    run_follow = TestFollow.run_follow
+
+    def test_state_is_not_saved(self):
+        self.set_test_mode(True)
+        self.assertIsNone(self.run_follow(FakeSubmitter, 1))
+
+        # a real run afterwards submits all jobs
+        self.set_test_mode(False)
+        state = self.run_follow(FakeSubmitter, 2)
+        self.assertEqual((state.next, len(state.active)), (5, 2))
+        self.assertEqual(self.count_jobs(), 4)
@@ -0,0 +1,74 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from . import template
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def make_file(self, text, name='in.sh'):
+        path = os.path.join(self._dir, name)
+        with open(path, 'w') as outfile:
+            outfile.write(text)
+        return path
+
+    def test_render_replaces_wildcards(self):
+        path = self.make_file("run -U U_VAL -L L_VAL\necho U_VAL\n")
+        tmpl = template.Template(path, ['U_VAL', 'L_VAL'])
+        self.assertEqual(tmpl.render({'U_VAL': '1.0', 'L_VAL': '2'}), "run -U 1.0 -L 2\necho 1.0\n")
+
+    def test_longer_wildcard_wins(self):
+        path = self.make_file("JU_VAL U_VAL")
+        tmpl = template.Template(path, ['U_VAL', 'JU_VAL'])
+        self.assertEqual(tmpl.render({'U_VAL': 'a', 'JU_VAL': 'b'}), "b a")
+
+    def test_values_are_not_replaced_again(self):
+        path = self.make_file("A_VAL B_VAL")
+        tmpl = template.Template(path, ['A_VAL', 'B_VAL'])
+        self.assertEqual(tmpl.render({'A_VAL': 'B_VAL', 'B_VAL': 'x'}), "B_VAL x")
+
+    def test_file_without_wildcards_is_static(self):
+        path = self.make_file("nothing to replace\n")
+        self.assertTrue(template.Template(path, ['U_VAL']).is_static())
+
+    def test_file_with_wildcards_is_not_static(self):
+        path = self.make_file("U_VAL\n")
+        self.assertFalse(template.Template(path, ['U_VAL']).is_static())
+
+    def test_get_wildcards(self):
+        path = self.make_file("U_VAL JOBNAME U_VAL")
+        tmpl = template.Template(path, ['U_VAL', 'JOBNAME'])
+        self.assertEqual(tmpl.get_wildcards(), ['U_VAL', 'JOBNAME', 'U_VAL'])
+
+    def test_write_copies_static_file(self):
+        path = self.make_file("a\r\nb\n")
+        out = os.path.join(self._dir, 'out.sh')
+        self.assertEqual(template.Template(path, ['U_VAL']).write(out, {}), "a\r\nb\n")
+        with open(out, 'rb') as infile:
+            self.assertEqual(infile.read(), b"a\r\nb\n")
+
+    def test_write_renders_file(self):
+        path = self.make_file("x=U_VAL\r\n")
+        out = os.path.join(self._dir, 'out.sh')
+        self.assertEqual(template.Template(path, ['U_VAL']).write(out, {'U_VAL': '3'}), "x=3\r\n")
+        with open(out, 'rb') as infile:
+            self.assertEqual(infile.read(), b"x=3\r\n")
+
+
+class TestTemplateSet(unittest.TestCase):
+    def test_get_values(self):
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'slurm.sh')
+        with open(path, 'w') as outfile:
+            outfile.write("U_VAL JOBNAME")
+        tset = template.TemplateSet(path, [], ['U_VAL', 'JOBNAME'])
+        values = tset.get_values(['1', 'j1'])
+        self.assertEqual(tset.get_script().render(values), "1 j1")
+        shutil.rmtree(tmpdir)
@@ -4,6 +4,9 @@ import os
 import getpass
 import subprocess
 import copy
+import glob
+import json
+import time
 
 import numpy as np
 
@@ -31,6 +34,18 @@ SQUEUE_FORMAT = "jobid:.8,"\
               + "numnodes:.5,"\
               + "nodelist:.30"
 
+DEFAULT_MAX_ARRAY_SIZE = 1001   # SLURM default of the MaxArraySize setting
+
+# squeue output of a user is shared by all sutils commands for SNAPSHOT_TTL seconds
+SNAPSHOT_DIR = os.path.expanduser(os.path.join('~', '.ssubmit'))
+SNAPSHOT_TTL = 10
+
+SACCT_FORMAT = "jobid,state,exitcode,elapsed,maxrss,end"
+SACCT_CHUNK_SIZE = 500          # number of job IDs per call to sacct
+
+# job ID, comment and compact state; the comment is last since it may contain `|`
+SQUEUE_COMMENT_FORMAT = "%i|%t|%k"
+
 
 def run_command(cmd, args):
     sargs = stringify_list(args)
@@ -86,12 +101,18 @@ def sbatch(script, cpus_per_task=None, mem=None, nodes=None, ntasks=None,
                      work_dir=work_dir, exclusive=exclusive, test_only=test_only,
                      ignore_error=ignore_error)
 
+    # the queue has changed
+    invalidate_snapshots()
+
     return SbatchResult(stdout)
 
 def scancel(job_id):
     #args = config.Scancel_Options(job_id=job_id).to_list()
     args = to_list(job_id)
     retval, stdout, stderr = run_command('scancel', args)
+
+    # the queue has changed
+    invalidate_snapshots()
     return 0
 
 def _squeue(args):
@@ -108,17 +129,157 @@ def squeue(args):
 
     return SqueueResult(res)
 
-def squeue_user():
+def squeue_user(array=False, fresh=False):
     """Call squeue once to check for jobs of the current user.
     
     Returns an SqueueResult object containing the job data.
+    If `array` is True, every array task is listed in its own line.
+
+    The output is shared with other calls for SNAPSHOT_TTL seconds, see
+    `read_snapshot`. With `fresh`, squeue is always called.
     """
     #args.append('--noheader')   # this is to make parsing easier
     #args.append('--user', getpass.getuser())
-    args = config.Squeue_Options(userid=getpass.getuser(), noheader=True).to_list()
+    args = config.Squeue_Options(userid=getpass.getuser(), noheader=True, array=array).to_list()
+
+    path = get_snapshot_path('squeue', array)
+    res = None if fresh else read_snapshot(path, args)
+    if res is None:
+        res = _squeue(args)
+        write_snapshot(path, args, res)
+
+    return SqueueResult(res)
+
+def squeue_comments(fresh=False):
+    """Call squeue once for the job IDs, states and comments of all jobs (and
+    array tasks) of the current user.
+
+    Returns an SqueueCommentResult object. The output is shared like in
+    `squeue_user`.
+    """
+    args = config.Squeue_Options(userid=getpass.getuser(), noheader=True, array=True,
+                                 format=SQUEUE_COMMENT_FORMAT).to_list()
+
+    path = get_snapshot_path('squeue-comment', True)
+    res = None if fresh else read_snapshot(path, args)
+    if res is None:
+        res = _squeue(args)
+        write_snapshot(path, args, res)
+
+    return SqueueCommentResult(res)
+
+def get_snapshot_path(cmd, array=False):
+    """Return the path of the snapshot file of `cmd` for the current user."""
+    name = "{}-{}{}.snapshot".format(cmd, getpass.getuser(), "-array" if array else "")
+    return os.path.join(SNAPSHOT_DIR, name)
+
+def read_snapshot(path, args, ttl=None):
+    """Return the output stored in the snapshot file `path`.
+
+    Returns None if there is no snapshot, if it is older than `ttl` seconds
+    (default SNAPSHOT_TTL) or if it was taken with different arguments.
+    """
+    if ttl is None:
+        ttl = SNAPSHOT_TTL
+    try:
+        with open(path, 'r') as infile:
+            snapshot = json.load(infile)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if snapshot.get('args') != list(args) or not 0 <= time.time() - snapshot.get('timestamp', 0) < ttl:
+        return None
+    return snapshot.get('stdout')
+
+def write_snapshot(path, args, stdout):
+    """Replace the snapshot file `path` atomically. Errors are ignored, the snapshot is only a cache."""
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp_path, 'w') as outfile:
+            json.dump({'timestamp': time.time(), 'args': list(args), 'stdout': stdout}, outfile)
+        os.replace(tmp_path, path)
+    except (IOError, OSError):
+        pass
+
+def invalidate_snapshots():
+    """Remove all snapshots of the current user, e.g. after jobs have been cancelled."""
+    user = getpass.getuser()
+    paths = glob.glob(os.path.join(SNAPSHOT_DIR, "*-{}.snapshot".format(user))) \
+          + glob.glob(os.path.join(SNAPSHOT_DIR, "*-{}-array.snapshot".format(user)))
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+
+def _scontrol(args):
+    retval, stdout, stderr = run_command('scontrol', args)
+
+    if retval != 0:
+        raise RuntimeError("Call to `scontrol` failed: \n" + stderr)
+
+    return stdout
+
+def scontrol_show_config():
+    """Call `scontrol show config` and return the settings as a dict of strings."""
+    res = _scontrol(['show', 'config'])
+
+    settings = dict()
+    for line in res.split('\n'):
+        if '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        settings[key.strip()] = value.strip()
+
+    return settings
+
+def get_max_array_size(default=DEFAULT_MAX_ARRAY_SIZE):
+    """Return the cluster's MaxArraySize.
+
+    Array task IDs must be strictly smaller than this value. Falls back to
+    `default` if the setting cannot be determined.
+    """
+    try:
+        return int(scontrol_show_config()['MaxArraySize'])
+    except (RuntimeError, OSError, KeyError, ValueError):
+        return default
+
+
+def _sacct(args):
+    retval, stdout, stderr = run_command('sacct', args)
 
-    return squeue(args)
+    if retval != 0:
+        raise RuntimeError("Call to `sacct` failed: \n" + stderr)
+
+    return stdout
+
+def sacct(job_ids, chunk_size=SACCT_CHUNK_SIZE):
+    """Call sacct for the jobs `job_ids`, at most `chunk_size` jobs per call.
+    
+    Returns an SacctResult object containing the accounting data.
+    """
+    job_ids = [str(j) for j in job_ids]
+
+    res = []
+    for i in range(0, len(job_ids), chunk_size):
+        args = ['-j', ",".join(job_ids[i:i+chunk_size]), '--parsable2', '--noheader', '--format', SACCT_FORMAT]
+        res.append(_sacct(args))
+
+    return SacctResult("".join(res))
+
+def sacct_user(starttime):
+    """Call sacct once for all jobs of the current user since `starttime`.
 
+    Returns an SacctResult object, which also holds the job comments.
+    """
+    args = ['--user', getpass.getuser(), '--starttime', starttime, '--parsable2', '--noheader',
+            '--format', SACCT_FORMAT + ",comment"]
+
+    return SacctResult(_sacct(args))
 
 
 def _sinfo(format=None, node=False, noheader=False):
@@ -145,6 +306,24 @@ def sinfo_detail():
     """
     return SinfoData(sinfo(format=SINFO_DETAIL_FORMAT, node=True, noheader=True))
 
+def parse_job_id(job_id):
+    """Convert a job ID to int. IDs of array tasks (e.g. 1234_5) are kept as strings."""
+    job_id = str(job_id).strip()
+    # int() would accept "1234_5" as 12345
+    if job_id.isdigit():
+        return int(job_id)
+    return job_id
+
+def parse_memory(mem):
+    """Convert a memory size of SLURM (e.g. 1234K, 2.5G) to bytes."""
+    mem = mem.strip()
+    if len(mem) == 0:
+        return 0.
+    units = {'K': 1024., 'M': 1024.**2, 'G': 1024.**3, 'T': 1024.**4}
+    if mem[-1].upper() in units:
+        return float(mem[:-1]) * units[mem[-1].upper()]
+    return float(mem)
+
 class Result(object):
     def __init__(self, data):
         self._data = data.strip().split('\n')
@@ -158,6 +337,116 @@ class SbatchResult(Result):
     def stdout(self):
         return self._data[0]
 
+class SubmitResult(object):
+    """
+    Result of a call to `sbatch --parsable`.
+
+    The submission succeeded if `job_id` is set. Messages of sbatch on stderr
+    are kept in `warnings` for successful submissions and in `error` otherwise.
+    """
+    def __init__(self, job_id=None, cluster=None, array_range=None, warnings=(), elapsed=0.0, error=''):
+        self.job_id = job_id
+        self.cluster = cluster
+        self.array_range = array_range
+        self.warnings = list(warnings)
+        self.elapsed = elapsed
+        self.error = error
+
+    def is_success(self):
+        return self.job_id is not None
+
+    def __str__(self):
+        if not self.is_success():
+            return self.error
+
+        msg = "Submitted batch job {}".format(self.job_id)
+        if self.cluster:
+            msg += " on cluster {}".format(self.cluster)
+        if self.array_range:
+            msg += ", array {}".format(self.array_range)
+        for warning in self.warnings:
+            msg += "; " + warning
+        return msg
+
+def parse_sbatch_parsable(returncode, stdout, stderr, elapsed=0.0, array_range=None):
+    """Create the SubmitResult from the output of `sbatch --parsable`.
+
+    On success sbatch prints `<job id>[;<cluster>]` to stdout, everything
+    printed to stderr is either a warning or the error message.
+    """
+    messages = [l.strip() for l in stderr.split('\n') if len(l.strip()) > 0]
+    lines = [l.strip() for l in stdout.split('\n') if len(l.strip()) > 0]
+
+    if returncode == 0 and len(lines) > 0:
+        fields = lines[-1].split(';')
+        if fields[0].isdigit():
+            cluster = fields[1] if len(fields) > 1 else None
+            return SubmitResult(fields[0], cluster, array_range, messages, elapsed)
+
+    error = " ".join(messages + lines)
+    if len(error) == 0:
+        error = "sbatch exited with code {}".format(returncode)
+    return SubmitResult(array_range=array_range, elapsed=elapsed, error=error)
+
+class SacctResult(object):
+    """
+    Accounting data of `sacct --parsable2` in columns, one entry per job.
+
+    State, exit code, elapsed and end time are those of the job allocation,
+    MaxRSS (in bytes) is the maximum over all steps of the job.
+    """
+    def __init__(self, data):
+        self._index = dict()    # job ID -> row
+        ids, states, exitcodes, elapsed, maxrss, end, comments = [], [], [], [], [], [], []
+
+        for line in data.split('\n'):
+            fields = line.strip().split('|')
+            if len(fields) < 5:
+                continue
+
+            # steps (e.g. 1234.batch) belong to the job 1234
+            job_id = fields[0].split('.')[0]
+            if job_id not in self._index:
+                self._index[job_id] = len(ids)
+                ids.append(job_id)
+                states.append('')
+                exitcodes.append('')
+                elapsed.append('')
+                maxrss.append(0.)
+                end.append('')
+                comments.append('')
+
+            row = self._index[job_id]
+            if '.' not in fields[0]:
+                # e.g. "CANCELLED by 1234"
+                states[row] = fields[1].split()[0] if len(fields[1].strip()) > 0 else ''
+                exitcodes[row] = fields[2]
+                elapsed[row] = fields[3]
+                end[row] = fields[5] if len(fields) > 5 else ''
+                # only with `sacct_user`, may contain `|`
+                comments[row] = "|".join(fields[6:])
+            maxrss[row] = max(maxrss[row], parse_memory(fields[4]))
+
+        self.jobid = np.array(ids, dtype=str)
+        self.state = np.array(states, dtype=str)
+        self.exitcode = np.array(exitcodes, dtype=str)
+        self.elapsed = np.array(elapsed, dtype=str)
+        self.maxrss = np.array(maxrss, dtype=float)
+        self.end = np.array(end, dtype=str)
+        self.comment = np.array(comments, dtype=str)
+
+    def __len__(self):
+        return len(self.jobid)
+
+    def get(self, job_id):
+        """Return the data of a job as dict, None if sacct did not list it."""
+        row = self._index.get(str(job_id))
+        if row is None:
+            return None
+        return {'state': str(self.state[row]), 'exitcode': str(self.exitcode[row]),
+                'elapsed': str(self.elapsed[row]), 'maxrss': float(self.maxrss[row]),
+                'end': str(self.end[row])}
+
 class SqueueResult(Result):
     def __init__(self, data):
         # convert to numpy array and use slices?
@@ -168,7 +457,7 @@ class SqueueResult(Result):
         self._data = np.array(tmp_data)
         self._njobs = len(tmp_data)
         if self._njobs > 0:
-            self.jobid = [int(d) for d in self._data[:, 0]]
+            self.jobid = [parse_job_id(d) for d in self._data[:, 0]]
             self.status = [d for d in self._data[:, 4]]
         else:
             self.jobid = []
@@ -192,6 +481,28 @@ class SqueueResult(Result):
     def __eq__(self, obj):
         return np.all(self._data == obj._data)
 
+class SqueueCommentResult(object):
+    """
+    Output of `squeue --format SQUEUE_COMMENT_FORMAT` in columns.
+    """
+    def __init__(self, data):
+        self.jobid = []
+        self.status = []
+        self.comment = []
+        for line in data.split('\n'):
+            fields = line.strip().split('|', 2)
+            if len(fields) < 3:
+                continue
+            self.jobid.append(parse_job_id(fields[0]))
+            self.status.append(fields[1])
+            self.comment.append(fields[2])
+
+    def __len__(self):
+        return len(self.jobid)
+
+    def get_ids(self):
+        return self.jobid
+
 class SinfoResult(Result):
     def __init__(self, data):
         super(SinfoResult, self).__init__(data)
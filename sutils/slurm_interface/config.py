@@ -219,16 +219,26 @@ class Squeue_user(ArgOption):
 class Squeue_noheader(ToggleOption):
     _option = "--noheader"
 
+class Squeue_array(ToggleOption):
+    _option = "--array"
+
+class Squeue_format(ArgOption):
+    _option = "--format"
+
 class Squeue_Options(ArgumentList):
     settings = {
         'username'  : '--user',
         'noheader'  : '--noheader',
+        'array'     : '--array',
+        'format'    : '--format',
     }
 
-    def __init__(self, userid=None, noheader=False):
+    def __init__(self, userid=None, noheader=False, array=False, format=None):
         self._args = []
         self._args += Squeue_user(userid).parse()
         self._args += Squeue_noheader(noheader).parse()
+        self._args += Squeue_array(array).parse()
+        self._args += Squeue_format(format).parse()
 
 #squeue_options = ArgumentList().add_argument('username', '--user', str) \
 #                               .add_argument('noheader', '--noheader', bool)
@@ -1,6 +1,10 @@
 import unittest
 from unittest.mock import Mock, patch
 import subprocess
+import os
+import shutil
+import tempfile
+import time
 
 import numpy as np
 
@@ -433,6 +437,16 @@ class TestRunCommand(unittest.TestCase):
         popen.assert_called_once_with(['command', 'arg1'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 class TestSqueueUser(unittest.TestCase):
+    def setUp(self):
+        # keep the snapshots of the tests away from the real ones
+        self._dir = tempfile.mkdtemp()
+        self._patcher = patch("sutils.slurm_interface.api.SNAPSHOT_DIR", self._dir)
+        self._patcher.start()
+
+    def tearDown(self):
+        self._patcher.stop()
+        shutil.rmtree(self._dir)
+
     @patch("sutils.slurm_interface.api._squeue")
     def test_calls_squeue_once(self, squeue):
         squeue.return_value = ''
@@ -441,6 +455,54 @@ class TestSqueueUser(unittest.TestCase):
         user = getpass.getuser()
         squeue.assert_called_once_with(['--user', user, '--noheader'])
 
+    @patch("sutils.slurm_interface.api._squeue")
+    def test_array_lists_tasks(self, squeue):
+        squeue.return_value = ''
+        slurm.squeue_user(array=True)
+        import getpass
+        user = getpass.getuser()
+        squeue.assert_called_once_with(['--user', user, '--noheader', '--array'])
+
+    @patch("sutils.slurm_interface.api._squeue")
+    def test_snapshot_is_shared(self, squeue):
+        squeue.return_value = "123456  partition1  jobname1   username1  PENDING  0:00  2  (Priority)\n"
+        first = slurm.squeue_user()
+        second = slurm.squeue_user()
+        self.assertEqual(squeue.call_count, 1)
+        self.assertEqual(first, second)
+
+    @patch("sutils.slurm_interface.api._squeue")
+    def test_fresh_bypasses_snapshot(self, squeue):
+        squeue.return_value = ''
+        slurm.squeue_user()
+        slurm.squeue_user(fresh=True)
+        self.assertEqual(squeue.call_count, 2)
+
+    @patch("sutils.slurm_interface.api._squeue")
+    def test_array_has_own_snapshot(self, squeue):
+        squeue.return_value = ''
+        slurm.squeue_user()
+        slurm.squeue_user(array=True)
+        self.assertEqual(squeue.call_count, 2)
+
+    @patch("sutils.slurm_interface.api._squeue")
+    def test_expired_snapshot(self, squeue):
+        squeue.return_value = ''
+        slurm.squeue_user()
+        with patch("sutils.slurm_interface.api.time.time", return_value=time.time() + slurm.SNAPSHOT_TTL + 1):
+            slurm.squeue_user()
+        self.assertEqual(squeue.call_count, 2)
+
+    @patch("sutils.slurm_interface.api.run_command", return_value=(0, '', ''))
+    @patch("sutils.slurm_interface.api._squeue")
+    def test_scancel_invalidates_snapshot(self, squeue, run_command):
+        squeue.return_value = ''
+        slurm.squeue_user()
+        slurm.scancel(123)
+        slurm.squeue_user()
+        self.assertEqual(squeue.call_count, 2)
+        self.assertEqual(os.listdir(self._dir), [os.path.basename(slurm.get_snapshot_path('squeue'))])
+
 
 class TestSqueue(unittest.TestCase):
     def setUp(self):
@@ -488,6 +550,29 @@ class TestSqueueResult(unittest.TestCase):
         self.assertTrue(hasattr(res1.get_ids(), '__iter__'))
 
 
+class TestScontrolShowConfig(unittest.TestCase):
+    @patch("sutils.slurm_interface.api._scontrol")
+    def test_parses_settings(self, scontrol):
+        scontrol.return_value = "Configuration data as of 2018-01-01T00:00:00\n"\
+                              + "MaxArraySize            = 1001\n"\
+                              + "SlurmctldParameters     = enable_configless,idle_on_node_suspend\n"
+        res = slurm.scontrol_show_config()
+        self.assertEqual(res['MaxArraySize'], '1001')
+        self.assertEqual(res['SlurmctldParameters'], 'enable_configless,idle_on_node_suspend')
+
+
+class TestGetMaxArraySize(unittest.TestCase):
+    @patch("sutils.slurm_interface.api.scontrol_show_config")
+    def test_returns_int(self, scontrol_show_config):
+        scontrol_show_config.return_value = {'MaxArraySize': '40001'}
+        self.assertEqual(slurm.get_max_array_size(), 40001)
+
+    @patch("sutils.slurm_interface.api.scontrol_show_config")
+    def test_returns_default_on_failure(self, scontrol_show_config):
+        scontrol_show_config.side_effect = RuntimeError
+        self.assertEqual(slurm.get_max_array_size(default=5), 5)
+
+
 class TestSbatchResult(unittest.TestCase):
     
     def test_stdout(self):
@@ -496,6 +581,103 @@ class TestSbatchResult(unittest.TestCase):
         self.assertEqual(slurm.SbatchResult(stdout_str).stdout(), stdout_str)
 
 
+class TestSacct(unittest.TestCase):
+    @patch("sutils.slurm_interface.api._sacct")
+    def test_chunks(self, _sacct):
+        _sacct.return_value = ""
+        slurm.sacct([1, 2, 3, "4_1", 5], chunk_size=2)
+        self.assertEqual([c[0][0][1] for c in _sacct.call_args_list], ["1,2", "3,4_1", "5"])
+
+    @patch("sutils.slurm_interface.api._sacct")
+    def test_parsable_output(self, _sacct):
+        _sacct.return_value = ""
+        slurm.sacct([1])
+        args = _sacct.call_args[0][0]
+        self.assertIn('--parsable2', args)
+        self.assertIn('--noheader', args)
+
+    @patch("sutils.slurm_interface.api._sacct")
+    def test_user(self, _sacct):
+        _sacct.return_value = "5|COMPLETED|0:0|00:01:00|||ssubmit:abc:3\n5.batch|COMPLETED|0:0|00:01:00|1M||\n" \
+                              "6|FAILED|1:0|00:01:00|||a|b\n"
+        res = slurm.sacct_user("2024-01-01T00:00:00")
+        args = _sacct.call_args[0][0]
+        self.assertEqual(args[args.index('--starttime') + 1], "2024-01-01T00:00:00")
+        np.testing.assert_array_equal(res.comment, ['ssubmit:abc:3', 'a|b'])
+        self.assertEqual(res.get(5)['maxrss'], 1024.**2)
+
+
+class TestSqueueCommentResult(unittest.TestCase):
+    def test_columns(self):
+        res = slurm.SqueueCommentResult("12|R|ssubmit:abc:0\n13_2|PD|x|y\n\n")
+        self.assertEqual(res.get_ids(), [12, "13_2"])
+        self.assertEqual(res.status, ['R', 'PD'])
+        self.assertEqual(res.comment, ['ssubmit:abc:0', 'x|y'])
+
+
+class TestSacctResult(unittest.TestCase):
+    data = "1234|COMPLETED|0:0|00:10:00||2024-01-01T12:10:00\n" \
+           "1234.batch|COMPLETED|0:0|00:10:00|2M|2024-01-01T12:10:00\n" \
+           "1234.extern|COMPLETED|0:0|00:10:00|1024K|2024-01-01T12:10:00\n" \
+           "1300_4|CANCELLED by 0|0:15|00:00:05||2024-01-01T12:00:05\n"
+
+    def test_columns(self):
+        res = slurm.SacctResult(self.data)
+        np.testing.assert_array_equal(res.jobid, ['1234', '1300_4'])
+        np.testing.assert_array_equal(res.state, ['COMPLETED', 'CANCELLED'])
+        np.testing.assert_array_equal(res.exitcode, ['0:0', '0:15'])
+        np.testing.assert_array_equal(res.maxrss, [2*1024.**2, 0.])
+
+    def test_get(self):
+        res = slurm.SacctResult(self.data)
+        self.assertEqual(res.get(1234)['elapsed'], '00:10:00')
+        self.assertEqual(res.get(1234)['end'], '2024-01-01T12:10:00')
+        self.assertIsNone(res.get(999))
+
+    def test_empty(self):
+        self.assertEqual(len(slurm.SacctResult("")), 0)
+
+
+class TestParseMemory(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(slurm.parse_memory("2K"), 2048.)
+        self.assertEqual(slurm.parse_memory("1.5G"), 1.5*1024.**3)
+        self.assertEqual(slurm.parse_memory("100"), 100.)
+        self.assertEqual(slurm.parse_memory(""), 0.)
+
+
+class TestParseSbatchParsable(unittest.TestCase):
+
+    def test_job_id(self):
+        res = slurm.parse_sbatch_parsable(0, "1234\n", "", elapsed=0.5)
+        self.assertTrue(res.is_success())
+        self.assertEqual(res.job_id, "1234")
+        self.assertIsNone(res.cluster)
+        self.assertEqual(res.elapsed, 0.5)
+
+    def test_cluster(self):
+        res = slurm.parse_sbatch_parsable(0, "1234;cluster1\n", "")
+        self.assertEqual((res.job_id, res.cluster), ("1234", "cluster1"))
+
+    def test_warning_is_not_a_failure(self):
+        res = slurm.parse_sbatch_parsable(0, "1234\n", "sbatch: warning: time limit not set\n")
+        self.assertTrue(res.is_success())
+        self.assertEqual(res.warnings, ["sbatch: warning: time limit not set"])
+
+    def test_error(self):
+        res = slurm.parse_sbatch_parsable(1, "", "sbatch: error: Batch job submission failed: Socket timed out\n")
+        self.assertFalse(res.is_success())
+        self.assertEqual(res.error, "sbatch: error: Batch job submission failed: Socket timed out")
+
+    def test_unexpected_output(self):
+        res = slurm.parse_sbatch_parsable(0, "Submitted batch job 1234\n", "")
+        self.assertFalse(res.is_success())
+
+    def test_array_range(self):
+        res = slurm.parse_sbatch_parsable(0, "1234\n", "", array_range="0-9%2")
+        self.assertEqual(str(res), "Submitted batch job 1234, array 0-9%2")
+
+
 class Test_sbatch(unittest.TestCase):
     @patch("sutils.slurm_interface.api.run_command")
     @patch("sutils.slurm_interface.config.SbatchConfig")
@@ -607,3 +789,15 @@ class TestGetBeginPrediction(unittest.TestCase):
         slurm.get_begin_prediction('script')
         mock_sbatch.assert_called_once_with('script', '--test_only')
 """
+
+
+class TestParseJobId(unittest.TestCase):
+    def test_plain_id_is_int(self):
+        self.assertEqual(slurm.parse_job_id("1234"), 1234)
+
+    def test_array_task_is_str(self):
+        self.assertEqual(slurm.parse_job_id("1234_5"), "1234_5")
+
+    def test_squeue_result_with_array_task(self):
+        res = slurm.SqueueResult("1234_5  partition1  jobname1   username1  PENDING  0:00  2  (Priority)\n")
+        self.assertEqual(res.get_ids(), ["1234_5"])
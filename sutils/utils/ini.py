@@ -233,6 +233,18 @@ def parameters_from_ini(path):
                 d['overwrite_dir'] = str2bool(d['overwrite_dir'])
             if 'write_parameter_info' in d:
                 d['write_parameter_info'] = str2bool(d['write_parameter_info'])
+            if 'array_throttle' in d:
+                d['array_throttle'] = int(d['array_throttle'])
+            if 'max_array_size' in d:
+                d['max_array_size'] = int(d['max_array_size'])
+            if 'max_parallel_submits' in d:
+                d['max_parallel_submits'] = int(d['max_parallel_submits'])
+            if 'stage_workers' in d:
+                d['stage_workers'] = int(d['stage_workers'])
+            if 'follow_interval' in d:
+                d['follow_interval'] = int(d['follow_interval'])
+            if 'job_comment' in d:
+                d['job_comment'] = str2bool(d['job_comment'])
         elif d['name'].lower() == 'pconfig':
             pcfg = d # create a local copy of the parameter settings dictionary
             pcfg.pop('name') # remove name key
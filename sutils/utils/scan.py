@@ -0,0 +1,111 @@
+"""Directory scanning for large campaign trees.
+
+Directories are listed with `os.scandir`, whose entries carry the file type
+from the directory itself, so no extra system call is needed to tell
+directories from files. On parallel filesystems like Lustre or GPFS every
+metadata request is a round trip over the network, hence several directories
+(and the `stat` calls for modification time and size) are handled concurrently
+by a thread pool.
+
+A listing is stored column-wise:
+
+    names   : list of entry names
+    is_dir  : bool array
+    mtime   : float array, NaN if the entry has not been stat'ed
+    size    : int array, -1 if the entry has not been stat'ed
+"""
+from __future__ import division
+import os
+from concurrent import futures
+
+import numpy as np
+
+SCAN_WORKERS = 16   # number of threads issuing metadata requests
+
+
+class DirListing(object):
+    """
+    Columnar listing of the entries of a single directory.
+    """
+    def __init__(self, path, names, is_dir, mtime, size):
+        self.path = path
+        self.names = names
+        self.is_dir = np.asarray(is_dir, dtype=bool)
+        self.mtime = np.asarray(mtime, dtype=float)
+        self.size = np.asarray(size, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_dirnames(self):
+        """Return the names of the subdirectories in the order of the listing."""
+        return [self.names[i] for i in np.flatnonzero(self.is_dir)]
+
+    def get_filenames(self):
+        return [self.names[i] for i in np.flatnonzero(~self.is_dir)]
+
+    def get_paths(self, names):
+        return [os.path.join(self.path, name) for name in names]
+
+
+def _entry_is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def scan_dir(path, stat=False):
+    """
+    List the directory `path` as a DirListing.
+
+    With `stat` True, modification time and size of all entries are read, if
+    `stat` is a function, only of the entries whose name it accepts.
+    """
+    names = []
+    is_dir = []
+    mtime = []
+    size = []
+    for entry in os.scandir(path):
+        names.append(entry.name)
+        is_dir.append(_entry_is_dir(entry))
+        if stat is True or (callable(stat) and stat(entry.name)):
+            try:
+                info = entry.stat()
+                mtime.append(info.st_mtime)
+                size.append(info.st_size)
+                continue
+            except OSError:
+                pass
+        mtime.append(np.nan)
+        size.append(-1)
+
+    return DirListing(path, names, is_dir, mtime, size)
+
+
+def scan_many(paths, stat=False, max_workers=SCAN_WORKERS):
+    """Scan all directories in `paths` concurrently, return a dict path -> DirListing."""
+    if len(paths) == 0:
+        return dict()
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        listings = executor.map(lambda p: scan_dir(p, stat), paths)
+        return dict(zip(paths, listings))
+
+
+def scan_tree(path, stat=False, max_workers=SCAN_WORKERS):
+    """
+    Scan `path` and all directories below it, return a dict path -> DirListing.
+    Each level of the tree is scanned concurrently.
+    """
+    tree = dict()
+    level = [path]
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(level) > 0:
+            listings = list(executor.map(lambda p: scan_dir(p, stat), level))
+            next_level = []
+            for cur_path, listing in zip(level, listings):
+                tree[cur_path] = listing
+                next_level += listing.get_paths(listing.get_dirnames())
+            level = next_level
+
+    return tree
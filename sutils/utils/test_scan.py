@@ -0,0 +1,48 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import scan
+from . import util
+
+
+class TestScan(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        for d in ['a', 'b', os.path.join('a', 'c'), os.path.join('a', 'd')]:
+            os.mkdir(os.path.join(self._dir, d))
+        with open(os.path.join(self._dir, 'f.txt'), 'w') as outfile:
+            outfile.write('abc')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_scan_dir(self):
+        listing = scan.scan_dir(self._dir)
+        self.assertEqual(len(listing), 3)
+        self.assertEqual(sorted(listing.get_dirnames()), ['a', 'b'])
+        self.assertEqual(listing.get_filenames(), ['f.txt'])
+        self.assertTrue(np.all(np.isnan(listing.mtime)))
+        self.assertTrue(np.all(listing.size == -1))
+
+    def test_scan_dir_stat(self):
+        listing = scan.scan_dir(self._dir, stat=lambda name: name.endswith('.txt'))
+        i = listing.names.index('f.txt')
+        self.assertEqual(listing.size[i], 3)
+        self.assertFalse(np.isnan(listing.mtime[i]))
+        self.assertEqual(np.sum(listing.size >= 0), 1)
+
+    def test_scan_tree(self):
+        tree = scan.scan_tree(self._dir, max_workers=2)
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(sorted(tree[os.path.join(self._dir, 'a')].get_dirnames()), ['c', 'd'])
+
+    def test_listdirs(self):
+        self.assertEqual(sorted(util.listdirs(self._dir)), ['a', 'b'])
+        expected = [os.path.join(self._dir, *d) for d in [('a',), ('b',), ('a', 'c'), ('a', 'd')]]
+        self.assertEqual(sorted(util.listdirs_rec(self._dir)), sorted(expected))
+        expected = [os.path.join(self._dir, *d) for d in [('b',), ('a', 'c'), ('a', 'd')]]
+        self.assertEqual(sorted(util.listdirs_rec_base(self._dir)), sorted(expected))
@@ -4,6 +4,7 @@ import math
 import os
 import sys
 import shutil
+from . import scan
 
 def assert_dir(path):
     """
@@ -61,27 +62,13 @@ def isdirectory(path):
     """
     Check if input path is a directory.
     """
-    try:
-        cwd = os.getcwd()
-        os.chdir(path)
-        os.chdir(cwd)
-    except OSError:
-        return False
-
-    return True
+    return os.path.isdir(path)
 
 def listdirs(path):
     """
     List only directories one level lower than path in the directory tree.
     """
-    filelist = os.listdir(path)
-
-    dirlist = []
-    for fname in filelist:
-        if isdirectory(os.path.join(path, fname)):
-            dirlist.append(fname)
-
-    return dirlist
+    return scan.scan_dir(path).get_dirnames()
 
 def listdirs_rec(path):
     """
@@ -94,18 +81,17 @@ def listdirs_rec(path):
     listdirs_rec(`dir0`) = [`dir0/dir00`, ..., `dir0/dir0n`, `dir0/dir00/dir000`, 
     ..., `dir0/dirn/dir0nm`].
     """
+    tree = scan.scan_tree(path)
 
-    dirlist = []
-    cur_dirlist = [os.path.join(path, d) for d in listdirs(path)]
-    dirlist += cur_dirlist
-
-    if len(cur_dirlist) == 0:
-        pass
-    else:
+    def collect(cur_path):
+        listing = tree[cur_path]
+        cur_dirlist = listing.get_paths(listing.get_dirnames())
+        dirlist = list(cur_dirlist)
         for newpath in cur_dirlist:
-            dirlist += listdirs_rec(newpath)
+            dirlist += collect(newpath)
+        return dirlist
 
-    return dirlist
+    return collect(path)
 
 def listdirs_rec_base(path):
     """
@@ -117,17 +103,19 @@ def listdirs_rec_base(path):
     
     listdirs_rec_base(`dir0`) = [`dir0/dir00/dir000`, ..., `dir0/dir0n/dir0nm`].
     """
+    tree = scan.scan_tree(path)
 
-    dirlist = []
-    cur_dirlist = [os.path.join(path, d) for d in listdirs(path)]
-    
-    if len(cur_dirlist) == 0:
-        dirlist.append(path)
-    else:
+    def collect(cur_path):
+        listing = tree[cur_path]
+        cur_dirlist = listing.get_paths(listing.get_dirnames())
+        if len(cur_dirlist) == 0:
+            return [cur_path]
+        dirlist = []
         for newpath in cur_dirlist:
-            dirlist += listdirs_rec_base(newpath)
+            dirlist += collect(newpath)
+        return dirlist
 
-    return dirlist
+    return collect(path)
 
 
 
@@ -406,7 +394,7 @@ def get_cmd_args(argv):
 
 def is_python3():
     """Check if interpreter runs Python 3 or higher."""
-    return sys.version_info > 2
+    return sys.version_info[0] > 2
 
 def to_list(val):
     """Convert anything to a list.